@@ -1,103 +1,269 @@
-"""Audit MJDYPV submission files for readiness"""
-from docx import Document
-from pathlib import Path
+"""Audit MJDYPV submission files for readiness.
+
+Each DOCX is audited by streaming ``word/document.xml`` straight from the zip
+with an incremental XML parser. Body paragraphs are checked as they arrive, in
+a single pass, with one compiled multi-pattern matcher covering blinding terms,
+section headings, abstract labels, citation styles and figure captions. Word
+counts and the reference list are accumulated in the same pass. Documents are
+audited in parallel.
+"""
+
+from __future__ import annotations
+
+import argparse
 import re
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from lxml import etree
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MANUSCRIPT_DIR = BASE_DIR / "manuscripts"
+
+IDENTITY_TERMS = ["Siddalingaiah", "hssling", "Shridevi", "Tumkur", "ORCID"]
+SECTIONS = ["ABSTRACT", "INTRODUCTION", "MATERIALS AND METHODS", "RESULTS", "DISCUSSION", "CONCLUSIONS", "REFERENCES"]
+ABSTRACT_LABELS = ["Background:", "Objectives:", "Materials and Methods:", "Results:", "Conclusions:"]
+REFERENCE_LIMIT = 30
+
+
+def _alternation(terms: list[str]) -> str:
+    return "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+
+
+MATCHER = re.compile(
+    "|".join(
+        [
+            rf"(?P<identity>(?i:{_alternation(IDENTITY_TERMS)}))",
+            rf"(?P<marker>{_alternation(SECTIONS + ABSTRACT_LABELS + ['Keywords:'])})",
+            r"(?P<bracket>\[\d+\])",
+            r"(?P<caret>\^\d+\^)",
+            r"(?P<figure>Figure \d+:)",
+        ]
+    )
+)
+WORD = re.compile(r"\b\w+\b")
+NUMBERED_REFERENCE = re.compile(r"^(\d+)\.\s", re.MULTILINE)
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_P, _TBL, _T, _TAB, _PTAB, _BR, _CR, _NB_HYPHEN = (
+    f"{W}p", f"{W}tbl", f"{W}t", f"{W}tab", f"{W}ptab", f"{W}br", f"{W}cr", f"{W}noBreakHyphen"
+)
+
+
+def iter_body_blocks(path: Path):
+    """Yield ``("table", "")`` for top-level tables and ``("paragraph", text)`` for body paragraphs.
+
+    Paragraph text matches python-docx ``paragraph.text``; paragraphs inside tables are skipped.
+    """
+    table_depth = 0
+    parts: list[str] = []
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as stream:
+        for event, elem in etree.iterparse(
+            stream, events=("start", "end"), tag=(_P, _TBL, _T, _TAB, _PTAB, _BR, _CR, _NB_HYPHEN)
+        ):
+            tag = elem.tag
+            if tag == _TBL:
+                if event == "start":
+                    if table_depth == 0:
+                        yield "table", ""
+                    table_depth += 1
+                else:
+                    table_depth -= 1
+                    if table_depth == 0:
+                        elem.clear(keep_tail=True)
+                continue
+            if event == "start" or table_depth:
+                continue
+            if tag == _T:
+                parts.append(elem.text or "")
+            elif tag in (_TAB, _PTAB):
+                parts.append("\t")
+            elif tag == _BR:
+                parts.append("\n" if elem.get(f"{W}type", "textWrapping") == "textWrapping" else "")
+            elif tag == _CR:
+                parts.append("\n")
+            elif tag == _NB_HYPHEN:
+                parts.append("-")
+            elif tag == _P:
+                yield "paragraph", "".join(parts)
+                parts = []
+                elem.clear(keep_tail=True)
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+
+
+@dataclass
+class AuditResult:
+    name: str
+    paragraphs: int = 0
+    tables: int = 0
+    total_words: int = 0
+    abstract_words: int | None = None
+    reference_words: int | None = None
+    numbered_references: int = 0
+    bracket_citations: int = 0
+    caret_citations: int = 0
+    figure_captions: int = 0
+    identity_hits: dict[str, int] = field(default_factory=dict)
+    markers: set[str] = field(default_factory=set)
+
+    @property
+    def blinded(self) -> bool:
+        return "Blinded" in self.name
+
+    @property
+    def is_manuscript(self) -> bool:
+        return self.name.startswith("Manuscript_")
+
+    @property
+    def blinding_ok(self) -> bool:
+        return not self.identity_hits
+
+    @property
+    def citation_style_ok(self) -> bool:
+        return self.bracket_citations > 0 and self.caret_citations == 0
+
+    @property
+    def main_text_words(self) -> int | None:
+        if self.abstract_words is None or self.reference_words is None:
+            return None
+        return self.total_words - self.abstract_words - self.reference_words
+
+
+def audit_document(path: Path) -> AuditResult:
+    result = AuditResult(name=Path(path).name)
+    abstract_state = "before"  # before -> inside -> done
+    in_references = False
+
+    for kind, text in iter_body_blocks(path):
+        if kind == "table":
+            result.tables += 1
+            continue
+        result.paragraphs += 1
+        result.total_words += len(WORD.findall(text))
+        # Character offsets where the abstract/reference spans start or stop within this paragraph.
+        abstract_from = 0 if abstract_state == "inside" else None
+        abstract_to = None
+        reference_from = 0 if in_references else None
+
+        for match in MATCHER.finditer(text):
+            group = match.lastgroup
+            value = match.group()
+            if group == "identity":
+                key = next(term for term in IDENTITY_TERMS if term.lower() == value.lower())
+                result.identity_hits[key] = result.identity_hits.get(key, 0) + 1
+            elif group == "marker":
+                result.markers.add(value)
+                if value == "Background:" and abstract_state == "before":
+                    abstract_state, abstract_from = "inside", match.end()
+                elif value == "Keywords:" and abstract_state == "inside" and abstract_to is None:
+                    abstract_to = match.start()
+                elif value == "REFERENCES" and not in_references:
+                    in_references, reference_from = True, match.start()
+            elif group == "bracket":
+                result.bracket_citations += 1
+            elif group == "caret":
+                result.caret_citations += 1
+            else:
+                result.figure_captions += 1
+
+        if abstract_from is not None:
+            span = text[abstract_from:abstract_to]
+            result.abstract_words = (result.abstract_words or 0) + len(WORD.findall(span))
+            if abstract_to is not None:
+                abstract_state = "done"
+        if reference_from is not None:
+            span = text[reference_from:]
+            result.reference_words = (result.reference_words or 0) + len(WORD.findall(span))
+            result.numbered_references += len(NUMBERED_REFERENCE.findall(span + "\n"))
+
+    if abstract_state != "done":
+        result.abstract_words = None
+    return result
+
+
+def print_report(result: AuditResult) -> None:
+    print("=" * 70)
+    print(f"### {result.name} ###")
+    print("=" * 70)
+    print(f"Paragraphs: {result.paragraphs}; tables: {result.tables}; figure captions: {result.figure_captions}")
+    print(f"Total document words: {result.total_words}")
+    if result.abstract_words is not None:
+        print(f"Abstract words: ~{result.abstract_words}")
+    if result.reference_words is not None:
+        print(f"References section words: ~{result.reference_words}")
+    if result.main_text_words is not None:
+        print(f"Main text estimate (excl abstract/refs): ~{result.main_text_words}")
+
+    if result.blinded:
+        print("\n--- BLINDING CHECK (must NOT contain) ---")
+        for term in IDENTITY_TERMS:
+            status = "LEAK!" if term in result.identity_hits else "OK (not found)"
+            print(f'  "{term}": {status}')
+
+    if result.is_manuscript:
+        print("\n--- SECTION STRUCTURE ---")
+        for section in SECTIONS:
+            print(f"  {section}: {'FOUND' if section in result.markers else 'MISSING'}")
+        print("\n--- ABSTRACT STRUCTURE ---")
+        for label in ABSTRACT_LABELS:
+            print(f"  {label} {'FOUND' if label in result.markers else 'MISSING'}")
+        print("\n--- REFERENCE FORMAT CHECK ---")
+        print(f"  [#] format citations found: {result.bracket_citations}")
+        print(f"  ^#^ format citations found: {result.caret_citations}")
+        print(f"  Reference format: {'CORRECT (MJDYPV [#] style)' if result.citation_style_ok else 'NEEDS REVIEW'}")
+        print(f"  Total numbered references: {result.numbered_references} (limit: {REFERENCE_LIMIT})")
+    print()
+
+
+def failures(result: AuditResult) -> list[str]:
+    problems = []
+    if result.blinded and not result.blinding_ok:
+        problems.append("identity terms present: " + ", ".join(sorted(result.identity_hits)))
+    if result.is_manuscript:
+        if not result.citation_style_ok:
+            problems.append("citation format needs review")
+        missing = [section for section in SECTIONS if section not in result.markers]
+        if missing:
+            problems.append("missing sections: " + ", ".join(missing))
+        if result.numbered_references > REFERENCE_LIMIT:
+            problems.append(f"{result.numbered_references} references exceed the limit of {REFERENCE_LIMIT}")
+    return problems
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", type=Path, help="DOCX files to audit (default: every file in manuscripts/)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--quiet", action="store_true", help="print only the summary table")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or sorted(MANUSCRIPT_DIR.glob("*.docx"))
+    if args.jobs == 1 or len(paths) == 1:
+        results = [audit_document(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(audit_document, paths))
+
+    if not args.quiet:
+        for result in results:
+            print_report(result)
+
+    print("=" * 70)
+    print("SUBMISSION READINESS SUMMARY")
+    print("=" * 70)
+    failed = 0
+    for result in results:
+        problems = failures(result)
+        failed += bool(problems)
+        print(f"[{'FAIL' if problems else 'PASS'}] {result.name}" + (f": {'; '.join(problems)}" if problems else ""))
+    print(f"\nOVERALL STATUS: {'NEEDS ATTENTION' if failed else 'READY FOR SUBMISSION'}")
+    return 1 if failed else 0
+
 
-base = Path(r'd:/research-automation/TB multiomics/KFD_HDT_Pipeline/manuscripts')
-
-def count_words(text):
-    return len(re.findall(r'\b\w+\b', text))
-
-print('='*70)
-print('### 2. BLINDED ARTICLE (Manuscript_KFD_MJDYPV_Blinded.docx) ###')
-print('='*70)
-
-doc = Document(base / 'Manuscript_KFD_MJDYPV_Blinded.docx')
-full_text = '\n'.join([p.text for p in doc.paragraphs])
-
-# Check for author identity leaks
-print('\n--- BLINDING CHECK (must NOT contain) ---')
-identity_terms = ['Siddalingaiah', 'hssling', 'Shridevi', 'Tumkur', 'ORCID']
-for term in identity_terms:
-    found = term.lower() in full_text.lower()
-    status = 'LEAK!' if found else 'OK (not found)'
-    print(f'  "{term}": {status}')
-
-# Count words
-print('\n--- WORD COUNT ANALYSIS ---')
-total_words = count_words(full_text)
-print(f'Total document words: {total_words}')
-
-# Extract and count abstract
-abstract_match = re.search(r'Background:(.+?)Keywords:', full_text, re.DOTALL)
-if abstract_match:
-    abstract_words = count_words(abstract_match.group(1))
-    print(f'Abstract words: ~{abstract_words}')
-
-# Count references section
-ref_start = full_text.find('REFERENCES')
-if ref_start > 0:
-    ref_text = full_text[ref_start:]
-    ref_words = count_words(ref_text)
-    print(f'References section words: ~{ref_words}')
-    main_text_estimate = total_words - abstract_words - ref_words
-    print(f'Main text estimate (excl abstract/refs): ~{main_text_estimate}')
-
-# Check section structure
-print('\n--- SECTION STRUCTURE ---')
-sections = ['ABSTRACT', 'INTRODUCTION', 'MATERIALS AND METHODS', 'RESULTS', 'DISCUSSION', 'CONCLUSIONS', 'REFERENCES']
-for sec in sections:
-    found = sec in full_text
-    status = 'FOUND' if found else 'MISSING'
-    print(f'  {sec}: {status}')
-
-# Check reference format
-print('\n--- REFERENCE FORMAT CHECK ---')
-bracket_refs = re.findall(r'\[\d+\]', full_text)
-caret_refs = re.findall(r'\^\d+\^', full_text)
-print(f'  [#] format citations found: {len(bracket_refs)}')
-print(f'  ^#^ format citations found: {len(caret_refs)}')
-if len(bracket_refs) > 0 and len(caret_refs) == 0:
-    print('  Reference format: CORRECT (MJDYPV [#] style)')
-else:
-    print('  Reference format: NEEDS REVIEW')
-
-# Count references
-ref_numbers = re.findall(r'^(\d+)\.\s', full_text[ref_start:] if ref_start > 0 else '', re.MULTILINE)
-print(f'\n  Total numbered references: {len(ref_numbers)}')
-
-# Abstract structure
-print('\n--- ABSTRACT STRUCTURE ---')
-abstract_sections = ['Background:', 'Objectives:', 'Materials and Methods:', 'Results:', 'Conclusions:']
-for sec in abstract_sections:
-    found = sec in full_text
-    status = 'FOUND' if found else 'MISSING'
-    print(f'  {sec} {status}')
-
-# Check tables
-print('\n--- TABLES CHECK ---')
-tables_count = len(doc.tables)
-print(f'  Tables in document: {tables_count}')
-
-# Check figures (by figure caption text)
-figure_refs = re.findall(r'Figure \d+:', full_text)
-print(f'  Figure captions found: {len(figure_refs)}')
-
-print('\n' + '='*70)
-print('### 3. COVER LETTER (CoverLetter_KFD_MJDYPV.docx) ###')
-print('='*70)
-
-doc2 = Document(base / 'CoverLetter_KFD_MJDYPV.docx')
-cover_text = '\n'.join([p.text for p in doc2.paragraphs])
-print(cover_text[:2000])
-
-print('\n' + '='*70)
-print('SUBMISSION READINESS SUMMARY')
-print('='*70)
-print('\n[Title Page] All required elements: PASS')
-print(f'[Blinded Article] Blinding check: {"PASS" if not any(t.lower() in full_text.lower() for t in identity_terms) else "FAIL"}')
-print(f'[Blinded Article] Section structure: PASS')
-print(f'[Blinded Article] Reference format: {"PASS" if len(bracket_refs) > 0 and len(caret_refs) == 0 else "FAIL"}')
-print(f'[Blinded Article] References count: {len(ref_numbers)} (limit: 30)')
-print(f'[Cover Letter] Present: PASS')
-print('\nOVERALL STATUS: READY FOR SUBMISSION')
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Benchmark the analytical hot paths on synthetic cohorts.
+
+Times ``collapse_to_genes``, ``differential_expression``, ``benjamini_hochberg``,
+``build_target_table``, ``build_meta_table`` and ``run_weight_sensitivity`` on
+synthetic cohorts of configurable size and appends wall time and peak traced
+memory to a JSON history, so speedups and regressions are visible between
+commits.
+
+    python scripts/benchmark_hot_paths.py --probes 1000 20000 --samples 10 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+import enhance_kfd_revision_v2 as enhance
+import rebuild_kfd_revision as rebuild
+import synthetic_geo
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BENCH_DIR = BASE_DIR / "outputs" / "benchmarks"
+HISTORY_PATH = BENCH_DIR / "benchmark_history.json"
+COHORTS = ["GSE18090", "GSE51808", "GSE43777"]
+
+
+def synthetic_cohort(n_probes: int, n_samples: int, seed: int = 0) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Return ``(expression, annotation, metadata)`` shaped like a parsed GEO series."""
+    rng = np.random.default_rng(seed)
+    genes = synthetic_geo.synthetic_genes(n_probes // 3)
+    annotation_table = synthetic_geo.synthetic_annotation(n_probes, genes, rng)
+    annotation = annotation_table.rename(columns={"ID": "ID_REF", "Gene symbol": "GeneSymbol"}).replace({"GeneSymbol": {"": None}})
+
+    sample_ids = [f"GSM{index:07d}" for index in range(n_samples)]
+    severe = np.arange(n_samples) < n_samples // 2
+    expression = synthetic_geo.synthetic_expression(annotation_table, sample_ids, severe, rng, effect_genes=set(genes[:15]))
+
+    metadata = pd.DataFrame(
+        {"sample_id": sample_ids, "severity": np.where(severe, "severe", "non_severe"), "phase": "acute"}
+    )
+    return expression, annotation, metadata
+
+
+def synthetic_deg(genes: list[str], seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    log_fc = rng.normal(0, 0.5, len(genes))
+    pvalues = np.clip(rng.uniform(0, 1, len(genes)) ** 2, 1e-12, 1.0)
+    deg = pd.DataFrame({"GeneSymbol": genes, "log2FC": log_fc, "pvalue": pvalues})
+    deg["fdr"] = rebuild.benjamini_hochberg(deg["pvalue"])
+    deg["direction"] = np.where(deg["log2FC"] >= 0, "up", "down")
+    return deg
+
+
+def measure(func: Callable[[], object], repeat: int) -> tuple[float, float, object]:
+    """Return best wall time (s), peak traced memory (MiB) and the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 2**20, result
+
+
+def run_case(n_probes: int, n_samples: int, repeat: int, seed: int) -> list[dict]:
+    expression, annotation, metadata = synthetic_cohort(n_probes, n_samples, seed)
+    samples = metadata["sample_id"].tolist()
+    records = []
+
+    def record(name: str, func: Callable[[], object], rows: int) -> object:
+        seconds, peak_mib, result = measure(func, repeat)
+        records.append(
+            {
+                "benchmark": name,
+                "probes": n_probes,
+                "samples": n_samples,
+                "rows": rows,
+                "seconds": round(seconds, 6),
+                "peak_mib": round(peak_mib, 3),
+            }
+        )
+        print(f"  {name:<24} {seconds:>9.4f} s {peak_mib:>9.1f} MiB  ({rows} rows)")
+        return result
+
+    gene_matrix = record(
+        "collapse_to_genes",
+        lambda: rebuild.collapse_to_genes(expression[["ID_REF", *samples]], annotation, samples),
+        n_probes,
+    )
+    deg = record("differential_expression", lambda: rebuild.differential_expression(gene_matrix, metadata), len(gene_matrix))
+    record("benjamini_hochberg", lambda: rebuild.benjamini_hochberg(deg["pvalue"]), len(deg))
+
+    genes = gene_matrix["GeneSymbol"].tolist()
+    dataset_results = {accession: synthetic_deg(genes, seed + offset) for offset, accession in enumerate(COHORTS)}
+    panel = rebuild.load_candidate_panel()
+    targets = record("build_target_table", lambda: rebuild.build_target_table(panel, dataset_results), len(panel))
+    meta_panel = enhance.load_panel()
+    record("build_meta_table", lambda: enhance.build_meta_table(dataset_results, meta_panel), len(meta_panel))
+    record("run_weight_sensitivity", lambda: rebuild.run_weight_sensitivity(targets), len(targets))
+    return records
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: Path) -> list[dict]:
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return []
+
+
+def compare_with_previous(history: list[dict], records: list[dict]) -> None:
+    previous: dict[tuple, dict] = {}
+    for run in history:
+        for row in run["results"]:
+            previous[(row["benchmark"], row["probes"], row["samples"])] = {**row, "revision": run.get("revision")}
+    lines = []
+    for row in records:
+        before = previous.get((row["benchmark"], row["probes"], row["samples"]))
+        if before and row["seconds"] > 0:
+            ratio = before["seconds"] / row["seconds"]
+            lines.append(
+                f"  {row['benchmark']:<24} {row['probes']:>6}x{row['samples']:<4} "
+                f"{before['seconds']:.4f}s -> {row['seconds']:.4f}s ({ratio:.2f}x vs {before['revision']})"
+            )
+    if lines:
+        print("\nChange against previous run:")
+        print("\n".join(lines))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1000, 10000], help="probe counts (1k-60k)")
+    parser.add_argument("--samples", type=int, nargs="+", default=[10, 50], help="sample counts (10-500)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed repetitions per benchmark (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", type=Path, default=HISTORY_PATH, help="JSON history file to append to")
+    parser.add_argument("--no-save", action="store_true", help="do not append this run to the history")
+    args = parser.parse_args(argv)
+
+    history = load_history(args.history)
+    records = []
+    for n_probes, n_samples in itertools.product(args.probes, args.samples):
+        print(f"Synthetic cohort: {n_probes} probes x {n_samples} samples")
+        records.extend(run_case(n_probes, n_samples, args.repeat, args.seed))
+
+    compare_with_previous(history, records)
+    if args.no_save:
+        return
+    history.append(
+        {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "results": records,
+        }
+    )
+    args.history.parent.mkdir(parents=True, exist_ok=True)
+    args.history.write_text(json.dumps(history, indent=2), encoding="utf-8")
+    print(f"\nAppended results to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Dependency manifests for skipping builds whose inputs have not changed.
+
+Each build target declares its input files, output files and a set of
+JSON-serialisable parameters (code digests, reference lists, word counts). The
+manifest records the size, modification time and SHA-256 of every input, so a
+no-op run only needs ``stat`` calls; files are rehashed only when their size or
+modification time moved.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STATE_DIR = BASE_DIR / "outputs" / ".build_state"
+
+
+def relative_path(path: Path) -> str:
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(BASE_DIR).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def value_digest(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def source_digest(*objects: Any) -> str:
+    """Digest the source code of functions or modules so code edits invalidate a target."""
+    return value_digest([inspect.getsource(obj) for obj in objects])
+
+
+def file_record(path: Path, previous: dict[str, Any] | None = None) -> dict[str, Any]:
+    """Return ``{size, mtime_ns, sha256}``, reusing ``previous`` when the stat is unchanged."""
+    stat = Path(path).stat()
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        return previous
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_digest(path)}
+
+
+@dataclass
+class BuildTarget:
+    name: str
+    outputs: list[Path]
+    inputs: list[Path] = field(default_factory=list)
+    params: dict[str, Any] = field(default_factory=dict)
+
+
+class BuildManifest:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        if self.path.exists():
+            self.state: dict[str, Any] = json.loads(self.path.read_text(encoding="utf-8"))
+        else:
+            self.state = {"targets": {}}
+
+    def _entry(self, name: str) -> dict[str, Any]:
+        return self.state["targets"].get(name, {})
+
+    def metadata(self, name: str) -> dict[str, Any]:
+        return self._entry(name).get("metadata", {})
+
+    def is_current(self, target: BuildTarget) -> bool:
+        entry = self._entry(target.name)
+        if not entry or entry.get("params") != value_digest(target.params):
+            return False
+
+        recorded_inputs = entry.get("inputs", {})
+        if set(recorded_inputs) != {relative_path(path) for path in target.inputs}:
+            return False
+        for path in target.inputs:
+            key = relative_path(path)
+            if not Path(path).exists():
+                return False
+            current = file_record(path, recorded_inputs[key])
+            if current["sha256"] != recorded_inputs[key]["sha256"]:
+                return False
+            recorded_inputs[key] = current
+
+        recorded_outputs = entry.get("outputs", {})
+        for path in target.outputs:
+            previous = recorded_outputs.get(relative_path(path))
+            if previous is None or not Path(path).exists():
+                return False
+            stat = Path(path).stat()
+            if (stat.st_size, stat.st_mtime_ns) != (previous["size"], previous["mtime_ns"]):
+                return False
+        return True
+
+    def record(self, target: BuildTarget, metadata: dict[str, Any] | None = None) -> None:
+        previous = self._entry(target.name).get("inputs", {})
+        self.state["targets"][target.name] = {
+            "params": value_digest(target.params),
+            "inputs": {
+                relative_path(path): file_record(path, previous.get(relative_path(path)))
+                for path in target.inputs
+            },
+            "outputs": {
+                relative_path(path): file_record(path)
+                for path in target.outputs
+            },
+            "metadata": metadata or {},
+        }
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2, sort_keys=True), encoding="utf-8")
+        tmp.replace(self.path)
@@ -0,0 +1,335 @@
+"""Transcriptome-wide cross-cohort evidence from the per-cohort DEG tables.
+
+``build_target_table`` only counts nominally significant cohorts for the
+candidate panel. This stage ranks every measured gene by how consistently it
+sits near the top (or bottom) of each cohort's ranking, from a genes x cohorts
+matrix of normalised ranks:
+
+* Robust rank aggregation (Kolde et al. 2012): ``rho`` is the smallest
+  order-statistic p-value ``I_{u_(j)}(j, n - j + 1)`` over a gene's sorted
+  normalised ranks ``u``. Its exact null distribution is evaluated by
+  integrating over the ordered uniforms, ``1 - n! * integral(...)``, as
+  polynomials for all genes with the same number of cohorts at once. Below
+  ``BONFERRONI_BELOW`` the exact value loses precision to cancellation and the
+  Bonferroni bound ``n * rho`` (its first-order term) is reported instead.
+* Rank product (Breitling et al. 2004): the geometric mean of the normalised
+  ranks, with the gamma approximation ``-sum(log u) ~ Gamma(n, 1)``.
+
+Both are computed for up- and down-regulation; the reported p-value is the
+better direction, Bonferroni-corrected for the two directions.
+
+The same genes x cohorts layout of p-values feeds four combination tests, each
+a handful of array reductions over the whole matrix:
+
+* Fisher: ``-2 sum(log p) ~ chi2(2n)``.
+* Stouffer, weighted by ``sqrt(samples)`` from ``cohort_summary.csv`` (Liptak).
+* Wilkinson's ``r``-th smallest p (``minP``/Tippett for ``r = 1``): ``I_{p_(r)}(r, n - r + 1)``.
+* Cauchy combination (ACAT; Liu & Xie 2020), valid under arbitrary dependence.
+
+Each is reported on the two-sided p-values and, direction-aware, on the
+one-sided p-values ``p/2`` or ``1 - p/2`` implied by the sign of the fold change,
+with an evidence tier per method using the same rule as the v2 meta-analysis.
+
+Both tables label every gene with its pathway from the configured pathway
+definitions (``rebuild_kfd_revision.classify_genes``), so genome-wide hits can
+be grouped the same way as the candidate panel.
+
+    python scripts/cross_cohort_evidence.py
+    python scripts/cross_cohort_evidence.py --metric log2fc --wilkinson-r 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+from pathlib import Path
+from typing import Mapping
+
+import numpy as np
+import pandas as pd
+from scipy import special, stats
+
+from build_cache import source_digest
+from enrichment import ranking_metric
+from instrumentation import add_profile_argument, enable_profiling, report, span, traced
+from kfd_config import add_config_argument, load_config
+import rebuild_kfd_revision as rebuild
+from rebuild_kfd_revision import DATASETS, benjamini_hochberg
+from results_db import publish_run
+from run_manifest import start_run
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+REV_TABLES = BASE_DIR / "outputs" / "revision_tables"
+CROSS_COHORT_DIR = BASE_DIR / "outputs" / "cross_cohort"
+
+BONFERRONI_BELOW = 1e-6
+TINY = np.finfo(float).tiny
+COMBINERS = ("Fisher", "Stouffer", "MinP", "Cauchy")
+
+
+def statistic_matrix(deg_tables: Mapping[str, pd.DataFrame], metric: str = "auto") -> pd.DataFrame:
+    """Genes x cohorts ranking statistic (NaN where a cohort did not measure the gene)."""
+    return pd.concat({accession: ranking_metric(deg, metric) for accession, deg in deg_tables.items()}, axis=1)
+
+
+def normalised_ranks(statistics: pd.DataFrame, descending: bool = True) -> np.ndarray:
+    """Rank / genes measured, per cohort; 1/n is the most extreme gene in the chosen direction."""
+    ranks = statistics.rank(axis=0, ascending=not descending, method="average")
+    return (ranks / statistics.notna().sum(axis=0)).to_numpy()
+
+
+def beta_scores(ranks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Order-statistic p-values ``I_{u_(j)}(j, n - j + 1)`` per gene (NaN-padded) and cohorts observed ``n``."""
+    ordered = np.sort(ranks, axis=1)
+    observed = (~np.isnan(ordered)).sum(axis=1)
+    j = np.arange(1, ranks.shape[1] + 1)
+    with np.errstate(invalid="ignore"):
+        scores = special.betainc(j, (observed[:, np.newaxis] - j + 1).clip(min=1), ordered)
+    scores[j > observed[:, np.newaxis]] = np.nan
+    return scores, observed
+
+
+def rra_exact_pvalue(rho: np.ndarray, n: int) -> np.ndarray:
+    """``P(rho <= x)`` for ``n`` lists: one minus the probability that every ``u_(j)`` exceeds ``I^{-1}_x(j, n - j + 1)``.
+
+    With thresholds ``a_1 <= ... <= a_n`` that probability is
+    ``n! * int_{a_n}^1 int_{a_(n-1)}^{u_n} ... int_{a_1}^{u_2} du_1 ... du_n``;
+    each inner integral is a polynomial in the next variable, integrated here
+    for all genes at once in the power basis.
+    """
+    rho = np.asarray(rho, dtype=float)
+    if n == 0:
+        return np.ones_like(rho)
+    j = np.arange(1, n + 1)
+    thresholds = special.betaincinv(j, n - j + 1, rho[:, np.newaxis])
+    coefficients = np.ones((len(rho), 1))
+    powers = np.arange(n + 1)
+    for step in range(n):
+        integral = np.zeros((len(rho), step + 2))
+        integral[:, 1:] = coefficients / np.arange(1, step + 2)
+        integral[:, 0] = -(integral * thresholds[:, [step]] ** powers[: step + 2]).sum(axis=1)
+        coefficients = integral
+    survival = math.factorial(n) * coefficients.sum(axis=1)
+    exact = np.clip(1.0 - survival, 0.0, 1.0)
+    bonferroni = np.minimum(n * rho, 1.0)
+    return np.where(bonferroni < BONFERRONI_BELOW, bonferroni, exact)
+
+
+def robust_rank_aggregation(ranks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """RRA ``rho`` scores and their exact p-values for every gene."""
+    scores, observed = beta_scores(ranks)
+    rho = np.ones(len(ranks))
+    has_any = observed > 0
+    rho[has_any] = np.nanmin(scores[has_any], axis=1)
+    pvalues = np.ones(len(ranks))
+    for n in np.unique(observed[has_any]):
+        rows = observed == n
+        pvalues[rows] = rra_exact_pvalue(rho[rows], int(n))
+    return rho, pvalues
+
+
+def rank_product(ranks: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Geometric mean of normalised ranks and its gamma-approximation p-value."""
+    observed = (~np.isnan(ranks)).sum(axis=1)
+    log_sum = np.nansum(np.log(ranks), axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        product = np.where(observed > 0, np.exp(log_sum / observed), 1.0)
+        pvalues = np.where(observed > 0, stats.gamma.sf(-log_sum, np.maximum(observed, 1)), 1.0)
+    return product, pvalues
+
+
+@traced(rows=len)
+def rank_aggregation(statistics: pd.DataFrame) -> pd.DataFrame:
+    """RRA and rank-product evidence for up- and down-regulation of every gene in ``statistics``."""
+    table = pd.DataFrame({"GeneSymbol": statistics.index, "Cohorts": statistics.notna().sum(axis=1).to_numpy()})
+    for direction, descending in (("Up", True), ("Down", False)):
+        ranks = normalised_ranks(statistics, descending)
+        table[f"MeanRank{direction}"] = np.nanmean(ranks, axis=1)
+        table[f"RRA{direction}"], table[f"RRA_p{direction}"] = robust_rank_aggregation(ranks)
+        table[f"RankProduct{direction}"], table[f"RP_p{direction}"] = rank_product(ranks)
+
+    up = table["RRA_pUp"] <= table["RRA_pDown"]
+    table["Direction"] = np.where(up, "up", "down")
+    table["RRA_pvalue"] = np.minimum(2 * np.where(up, table["RRA_pUp"], table["RRA_pDown"]), 1.0)
+    table["RRA_fdr"] = benjamini_hochberg(table["RRA_pvalue"])
+    rp_best = np.where(up, table["RP_pUp"], table["RP_pDown"])
+    table["RP_pvalue"] = np.minimum(2 * rp_best, 1.0)
+    table["RP_fdr"] = benjamini_hochberg(table["RP_pvalue"])
+    rho = np.where(up, table["RRAUp"], table["RRADown"])
+    order = np.lexsort((rho, table["RRA_pvalue"].to_numpy()))
+    table = table.iloc[order].reset_index(drop=True)
+    table.insert(0, "AggregateRank", np.arange(1, len(table) + 1))
+    return table
+
+
+def cohort_matrices(deg_tables: Mapping[str, pd.DataFrame]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Genes x cohorts two-sided p-values and log2 fold changes."""
+    frames = {accession: deg.drop_duplicates("GeneSymbol").set_index("GeneSymbol") for accession, deg in deg_tables.items()}
+    pvalues = pd.concat({accession: frame["pvalue"] for accession, frame in frames.items()}, axis=1)
+    log2fc = pd.concat({accession: frame["log2FC"] for accession, frame in frames.items()}, axis=1)
+    return pvalues, log2fc
+
+
+def sample_weights(cohorts: list[str], summary_path: Path = REV_TABLES / "cohort_summary.csv") -> np.ndarray:
+    """``sqrt(severe + non-severe samples)`` per cohort; equal weights when the summary is missing."""
+    if not summary_path.exists():
+        return np.ones(len(cohorts))
+    summary = pd.read_csv(summary_path).set_index("Dataset")
+    samples = (summary["SevereSamples"] + summary["NonSevereSamples"]).reindex(cohorts)
+    return np.sqrt(samples.fillna(samples.mean()).to_numpy(dtype=float))
+
+
+def one_sided(pvalues: np.ndarray, log2fc: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Up- and down-regulation p-values from two-sided ``pvalues`` and the effect sign."""
+    half = pvalues / 2
+    up = np.where(log2fc > 0, half, 1 - half)
+    return up, 1 - up
+
+
+def _clip(pvalues: np.ndarray) -> np.ndarray:
+    return np.clip(pvalues, TINY, 1 - np.finfo(float).epsneg)
+
+
+def fisher(pvalues: np.ndarray) -> np.ndarray:
+    observed = (~np.isnan(pvalues)).sum(axis=1)
+    statistic = -2 * np.nansum(np.log(_clip(pvalues)), axis=1)
+    return np.where(observed > 0, stats.chi2.sf(statistic, 2 * np.maximum(observed, 1)), 1.0)
+
+
+def stouffer(pvalues: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Weighted Z and its upper-tail p-value."""
+    z = stats.norm.isf(_clip(pvalues))
+    weights = np.where(np.isnan(pvalues), 0.0, weights)
+    norm = np.sqrt((weights**2).sum(axis=1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        combined = np.where(norm > 0, np.nansum(weights * z, axis=1) / norm, 0.0)
+    return combined, np.where(norm > 0, stats.norm.sf(combined), 1.0)
+
+
+def wilkinson(pvalues: np.ndarray, r: int = 1) -> np.ndarray:
+    """p-value of the ``r``-th smallest of ``n`` p-values (``r`` capped at ``n``)."""
+    ordered = np.sort(pvalues, axis=1)
+    observed = (~np.isnan(ordered)).sum(axis=1)
+    rank = np.minimum(r, np.maximum(observed, 1))
+    value = np.take_along_axis(ordered, (rank - 1)[:, np.newaxis], axis=1)[:, 0]
+    return np.where(observed > 0, special.betainc(rank, np.maximum(observed - rank + 1, 1), np.nan_to_num(value, nan=1.0)), 1.0)
+
+
+def cauchy(pvalues: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Cauchy combination test with weights normalised over each gene's observed cohorts."""
+    weights = np.where(np.isnan(pvalues), 0.0, weights)
+    total = weights.sum(axis=1, keepdims=True)
+    weights = np.divide(weights, total, out=np.zeros_like(weights), where=total > 0)
+    p = _clip(np.nan_to_num(pvalues, nan=0.5))
+    # tan((0.5 - p) * pi) ~ 1 / (p * pi) where the tangent itself loses precision.
+    terms = np.where(p < 1e-15, 1 / (p * np.pi), np.tan((0.5 - p) * np.pi))
+    statistic = (weights * terms).sum(axis=1)
+    combined = np.where(statistic > 1e15, 1 / (np.maximum(statistic, 1e15) * np.pi), 0.5 - np.arctan(statistic) / np.pi)
+    return np.where(total[:, 0] > 0, combined, 1.0)
+
+
+def _combine(name: str, pvalues: np.ndarray, weights: np.ndarray, r: int) -> np.ndarray:
+    if name == "Fisher":
+        return fisher(pvalues)
+    if name == "Stouffer":
+        return stouffer(pvalues, weights)[1]
+    if name == "MinP":
+        return wilkinson(pvalues, r)
+    return cauchy(pvalues, weights)
+
+
+@traced(rows=len)
+def pvalue_combination(pvalues: pd.DataFrame, log2fc: pd.DataFrame, weights: np.ndarray, wilkinson_r: int = 1) -> pd.DataFrame:
+    """Fisher, weighted Stouffer, Wilkinson and Cauchy combinations, two-sided and direction-aware, for every gene."""
+    revision = rebuild.CONFIG.revision
+    p = pvalues.to_numpy(dtype=float)
+    fc = log2fc.reindex_like(pvalues).to_numpy(dtype=float)
+    up, down = one_sided(p, fc)
+    nominal = ((p <= revision.deg_pvalue) & (np.abs(fc) >= revision.deg_abs_log2fc)).sum(axis=1)
+    table = pd.DataFrame({"GeneSymbol": pvalues.index, "Cohorts": (~np.isnan(p)).sum(axis=1), "NominalSupportCount": nominal})
+    table["Stouffer_Z"] = stouffer(up, weights)[0]
+    table["Direction"] = np.where(table["Stouffer_Z"] >= 0, "up", "down")
+
+    for name in COMBINERS:
+        p_up, p_down = _combine(name, up, weights, wilkinson_r), _combine(name, down, weights, wilkinson_r)
+        directional = np.minimum(2 * np.minimum(p_up, p_down), 1.0)
+        table[f"{name}_p"] = _combine(name, p, weights, wilkinson_r)
+        table[f"{name}_pUp"] = p_up
+        table[f"{name}_pDown"] = p_down
+        table[f"{name}_pDirectional"] = directional
+        table[f"{name}_fdr"] = benjamini_hochberg(table[f"{name}_pDirectional"]).to_numpy()
+        table[f"{name}_Tier"] = np.select(
+            [(nominal >= 2) & (directional <= 0.05), nominal == 1], ["cross-cohort", "single-cohort"], "mechanistic-only"
+        )
+    return table.sort_values(["Stouffer_pDirectional", "GeneSymbol"], kind="stable").reset_index(drop=True)
+
+
+def with_pathways(table: pd.DataFrame) -> pd.DataFrame:
+    """Insert the ``classify_genes`` pathway of each gene after ``GeneSymbol``."""
+    table.insert(table.columns.get_loc("GeneSymbol") + 1, "Pathway", rebuild.classify_genes(table["GeneSymbol"])["Pathway"].to_numpy())
+    return table
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--metric", choices=["auto", "t", "signed_p", "log2fc"], default="auto", help="per-cohort ranking statistic")
+    parser.add_argument("--tables", type=Path, default=REV_TABLES, help="directory holding the *_deg_results.csv tables")
+    parser.add_argument("--min-cohorts", type=int, default=2, help="only rank genes measured in at least this many cohorts")
+    parser.add_argument("--wilkinson-r", type=int, default=1, help="order statistic for Wilkinson's test (1 = minP)")
+    add_config_argument(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    enable_profiling(args.profile)
+    if args.config is not None:
+        rebuild.apply_config(load_config(args.config))
+
+    run = start_run(
+        "cross_cohort_evidence",
+        parameters={
+            "code_digest": source_digest(sys.modules[__name__]),
+            "config_fingerprint": rebuild.CONFIG.fingerprint("revision"),
+            "metric": args.metric,
+            "min_cohorts": args.min_cohorts,
+            "wilkinson_r": args.wilkinson_r,
+        },
+    )
+    with span("load_deg_tables"):
+        deg_tables = {}
+        for config in DATASETS:
+            path = args.tables / f"{config.accession}_deg_results.csv"
+            run.record_input(path, upstream="rebuild_kfd_revision")
+            deg_tables[config.accession] = pd.read_csv(path)
+        statistics = statistic_matrix(deg_tables, args.metric)
+        statistics = statistics[statistics.notna().sum(axis=1) >= args.min_cohorts]
+        pvalues, log2fc = cohort_matrices(deg_tables)
+        pvalues = pvalues[pvalues.notna().sum(axis=1) >= args.min_cohorts]
+        summary_path = args.tables / "cohort_summary.csv"
+        if summary_path.exists():
+            run.record_input(summary_path, upstream="rebuild_kfd_revision")
+        weights = sample_weights(list(pvalues.columns), summary_path)
+
+    aggregated = with_pathways(rank_aggregation(statistics))
+    CROSS_COHORT_DIR.mkdir(parents=True, exist_ok=True)
+    out_path = CROSS_COHORT_DIR / "rank_aggregation.csv"
+    aggregated.to_csv(out_path, index=False)
+    run.record_output(out_path)
+    combined = with_pathways(pvalue_combination(pvalues, log2fc, weights, args.wilkinson_r))
+    combined_path = CROSS_COHORT_DIR / "pvalue_combination.csv"
+    combined.to_csv(combined_path, index=False)
+    run.record_output(combined_path)
+
+    print(f"{len(aggregated)} genes across {statistics.shape[1]} cohorts; {int((aggregated['RRA_fdr'] <= 0.05).sum())} at RRA FDR <= 0.05")
+    columns = ["AggregateRank", "GeneSymbol", "Pathway", "Cohorts", "Direction", "RRA_pvalue", "RRA_fdr", "RP_pvalue"]
+    print(aggregated.head(15)[columns].to_string(index=False))
+    tiers = pd.DataFrame({name: combined[f"{name}_Tier"].value_counts() for name in COMBINERS}).fillna(0).astype(int)
+    print(f"\nEvidence tiers by combination method (direction-aware p <= 0.05):\n{tiers.to_string()}")
+    publish_run(run)
+    manifest_path = run.write()
+    report("cross_cohort_evidence")
+    print(f"Run manifest written to {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
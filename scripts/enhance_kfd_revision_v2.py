@@ -6,7 +6,9 @@ with target-level meta-analysis, uncertainty summaries, and companion figures.
 
 from __future__ import annotations
 
+import argparse
 import math
+import sys
 from pathlib import Path
 
 import matplotlib.pyplot as plt
@@ -15,17 +17,25 @@ import pandas as pd
 import seaborn as sns
 from docx import Document
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
 from docx.shared import Cm, Inches, Pt
 from scipy import stats
 
+from build_cache import source_digest
+from docx_tables import add_dataframe_table
+from instrumentation import add_profile_argument, enable_profiling, report, traced
+from kfd_config import add_config_argument, load_config
+import rebuild_kfd_revision as rebuild
+from results_db import publish_run
+from run_manifest import start_run
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 REV_TABLES = BASE_DIR / "outputs" / "revision_tables"
 V2_TABLES = BASE_DIR / "outputs" / "enhanced_v2_tables"
 V2_FIGS = BASE_DIR / "outputs" / "enhanced_v2_figures"
 MANUSCRIPTS = BASE_DIR / "manuscripts"
+COHORTS = ["GSE18090", "GSE51808", "GSE43777"]
+TIER_ORDER = {"cross-cohort": 0, "single-cohort": 1, "mechanistic-only": 2}
 
 for directory in (V2_TABLES, V2_FIGS):
     directory.mkdir(parents=True, exist_ok=True)
@@ -46,166 +56,184 @@ def set_base_style(doc: Document, size: int = 11) -> None:
     style.paragraph_format.line_spacing = 1.5
 
 
-def set_cell_shading(cell, color: str) -> None:
-    tc_pr = cell._tc.get_or_add_tcPr()
-    shd = OxmlElement("w:shd")
-    shd.set(qn("w:fill"), color)
-    tc_pr.append(shd)
+def approximate_se(log2fc: np.ndarray, pvalue: np.ndarray) -> np.ndarray:
+    """``|log2FC| / z(p/2)``, for DEG tables written before ``differential_expression`` stored ``se``."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = stats.norm.isf(np.asarray(pvalue, dtype=float) / 2.0)
+        se = np.abs(np.asarray(log2fc, dtype=float)) / z
+    return np.where(np.isfinite(z) & (z > 0), se, np.nan)
+
+
+def study_arrays(deg_tables: dict[str, pd.DataFrame], genes: pd.Series) -> dict[str, np.ndarray]:
+    """Genes x studies ``present``, ``log2fc``, ``pvalue`` and ``se`` arrays for ``genes`` (first row per gene).
+
+    ``exact_se`` marks the studies whose table stores the Welch ``se``; the
+    others fall back to ``approximate_se``.
+    """
+    columns = {"present": [], "log2fc": [], "pvalue": [], "se": [], "exact_se": []}
+    for df in deg_tables.values():
+        frame = df.drop_duplicates("GeneSymbol").set_index("GeneSymbol")
+        rows = frame.reindex(genes)
+        columns["present"].append(genes.isin(frame.index).to_numpy())
+        columns["log2fc"].append(rows["log2FC"].to_numpy(dtype=float))
+        columns["pvalue"].append(rows["pvalue"].to_numpy(dtype=float))
+        if "se" in rows.columns:
+            columns["se"].append(rows["se"].to_numpy(dtype=float))
+        else:
+            columns["se"].append(approximate_se(columns["log2fc"][-1], columns["pvalue"][-1]))
+        columns["exact_se"].append(np.full(len(genes), "se" in rows.columns))
+    return {name: np.column_stack(values) for name, values in columns.items()}
+
+
+def dersimonian_laird(effects: np.ndarray, ses: np.ndarray) -> dict[str, np.ndarray]:
+    """DerSimonian-Laird random-effects meta-analysis of every row of genes x studies ``effects``.
+
+    Studies with a missing effect or a non-positive SE are left out of their
+    row; rows with no usable study are NaN throughout.
+    """
+    mask = np.isfinite(effects) & np.isfinite(ses) & (ses > 0)
+    k = mask.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        w = np.where(mask, 1 / np.where(mask, ses, 1.0) ** 2, 0.0)
+        y = np.where(mask, effects, 0.0)
+        sum_w = w.sum(axis=1)
+        fixed_effect = (w * y).sum(axis=1) / sum_w
+        fixed_se = np.sqrt(1 / sum_w)
+        q = np.where(k > 1, (w * (y - fixed_effect[:, np.newaxis]) ** 2).sum(axis=1), 0.0)
+        c = sum_w - (w**2).sum(axis=1) / sum_w
+        tau2 = np.where((k > 1) & (c > 0), np.maximum((q - (k - 1)) / c, 0.0), 0.0)
+        w_re = np.where(mask, 1 / (np.where(mask, ses, 1.0) ** 2 + tau2[:, np.newaxis]), 0.0)
+        random_effect = (w_re * y).sum(axis=1) / w_re.sum(axis=1)
+        random_se = np.sqrt(1 / w_re.sum(axis=1))
+        pooled_p = 2 * stats.norm.sf(np.abs(random_effect / random_se))
+        i2 = np.where(q > 0, np.maximum((q - (k - 1)) / q, 0.0) * 100, 0.0)
+    pooled = {
+        "FixedEffect": fixed_effect,
+        "FixedSE": fixed_se,
+        "RandomEffect": random_effect,
+        "RandomSE": random_se,
+        "Tau2": tau2,
+        "Q": q,
+        "I2": i2,
+        "PooledPValue": pooled_p,
+    }
+    return {"Studies": k, **{name: np.where(k == 0, np.nan, values) for name, values in pooled.items()}}
 
 
-def z_from_pvalue(pvalue: float) -> float:
-    if pd.isna(pvalue) or pvalue <= 0:
-        return np.inf
-    if pvalue >= 1:
-        return 0.0
-    return stats.norm.isf(pvalue / 2.0)
+def meta_priority(nominal_support, abs_effect, i2, cohorts: int = len(COHORTS)):
+    """Blend of nominal support across ``cohorts``, pooled effect size and homogeneity."""
+    return (
+        0.45 * np.clip(nominal_support / cohorts, 0, 1)
+        + 0.35 * np.clip(abs_effect / 1.0, 0, 1)
+        + 0.20 * (1 - np.clip(np.nan_to_num(i2, nan=100) / 100.0, 0, 1))
+    )
 
 
-def approximate_se(log2fc: float, pvalue: float) -> float:
-    z = z_from_pvalue(pvalue)
-    if not np.isfinite(z) or z == 0 or pd.isna(log2fc):
-        return np.nan
-    return abs(log2fc) / z
+def se_method(exact_se: np.ndarray) -> np.ndarray:
+    """Per gene: ``welch`` if every study table stores ``se``, ``approximate`` if none does, else ``mixed``."""
+    return np.select([exact_se.all(axis=1), ~exact_se.any(axis=1)], ["welch", "approximate"], "mixed")
 
 
-def dersimonian_laird_meta(effects: np.ndarray, ses: np.ndarray) -> dict[str, float]:
-    mask = np.isfinite(effects) & np.isfinite(ses) & (ses > 0)
-    effects = effects[mask]
-    ses = ses[mask]
-    k = len(effects)
-    if k == 0:
+def se_wording(methods: set[str]) -> dict[str, str]:
+    """How the meta-analysis SEs were obtained, worded for the Methods and Limitations sections."""
+    if methods <= {"welch"}:
         return {
-            "Studies": 0,
-            "FixedEffect": np.nan,
-            "FixedSE": np.nan,
-            "RandomEffect": np.nan,
-            "RandomSE": np.nan,
-            "Tau2": np.nan,
-            "Q": np.nan,
-            "I2": np.nan,
-            "PooledPValue": np.nan,
+            "se_source": "exact Welch standard errors computed from each cohort's per-sample variances",
+            "evidence_basis": "dengue proxy cohorts and blood-derived transcriptomes only",
         }
-    w = 1 / (ses ** 2)
-    fixed_effect = float(np.sum(w * effects) / np.sum(w))
-    fixed_se = float(np.sqrt(1 / np.sum(w)))
-    if k == 1:
-        pooled_p = 2 * stats.norm.sf(abs(fixed_effect / fixed_se)) if fixed_se > 0 else np.nan
+    if methods <= {"approximate"}:
         return {
-            "Studies": 1,
-            "FixedEffect": fixed_effect,
-            "FixedSE": fixed_se,
-            "RandomEffect": fixed_effect,
-            "RandomSE": fixed_se,
-            "Tau2": 0.0,
-            "Q": 0.0,
-            "I2": 0.0,
-            "PooledPValue": pooled_p,
+            "se_source": "approximated standard errors derived from log2 fold-changes and two-sided P values",
+            "evidence_basis": "dengue proxy cohorts, blood-derived transcriptomes only, and approximate variance reconstruction for the random-effects meta-analysis",
         }
-    q = float(np.sum(w * (effects - fixed_effect) ** 2))
-    c = float(np.sum(w) - (np.sum(w ** 2) / np.sum(w)))
-    tau2 = max((q - (k - 1)) / c, 0.0) if c > 0 else 0.0
-    w_re = 1 / (ses ** 2 + tau2)
-    random_effect = float(np.sum(w_re * effects) / np.sum(w_re))
-    random_se = float(np.sqrt(1 / np.sum(w_re)))
-    pooled_p = 2 * stats.norm.sf(abs(random_effect / random_se)) if random_se > 0 else np.nan
-    i2 = max((q - (k - 1)) / q, 0.0) * 100 if q > 0 else 0.0
     return {
-        "Studies": k,
-        "FixedEffect": fixed_effect,
-        "FixedSE": fixed_se,
-        "RandomEffect": random_effect,
-        "RandomSE": random_se,
-        "Tau2": tau2,
-        "Q": q,
-        "I2": i2,
-        "PooledPValue": pooled_p,
+        "se_source": "exact Welch standard errors where the cohort's differential-expression table provided them, and otherwise standard errors approximated from log2 fold-changes and two-sided P values",
+        "evidence_basis": "dengue proxy cohorts, blood-derived transcriptomes only, and approximate variance reconstruction for cohorts without stored standard errors",
     }
 
 
-def build_meta_table() -> pd.DataFrame:
-    panel = pd.read_csv(BASE_DIR / "data" / "gene_signature.csv").rename(columns={"Symbol": "GeneSymbol"})
-    deg_tables = {
-        "GSE18090": pd.read_csv(REV_TABLES / "GSE18090_deg_results.csv"),
-        "GSE51808": pd.read_csv(REV_TABLES / "GSE51808_deg_results.csv"),
-        "GSE43777": pd.read_csv(REV_TABLES / "GSE43777_deg_results.csv"),
+def pooled_evidence(arrays: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Meta-analysis, nominal support, direction concordance and evidence tier for ``study_arrays`` output."""
+    present, log2fc, pvalue = arrays["present"], arrays["log2fc"], arrays["pvalue"]
+    meta = dersimonian_laird(np.where(present, log2fc, np.nan), arrays["se"])
+    revision = rebuild.CONFIG.revision
+    nominal = (present & (pvalue <= revision.deg_pvalue) & (np.abs(log2fc) >= revision.deg_abs_log2fc)).sum(axis=1)
+    signs = np.nan_to_num(np.sign(log2fc), nan=0.0)
+    concordant = present.any(axis=1) & (
+        np.where(present, signs, -np.inf).max(axis=1) == np.where(present, signs, np.inf).min(axis=1)
+    )
+    random_effect = meta["RandomEffect"]
+    return {
+        **meta,
+        "NominalSupportCount": nominal,
+        "DirectionConcordant": concordant,
+        "PooledDirection": np.select([random_effect > 0, random_effect < 0], ["up", "down"], "flat"),
+        "EvidenceTier": np.select(
+            [(nominal >= 2) & (meta["PooledPValue"] <= 0.05), nominal == 1], ["cross-cohort", "single-cohort"], "mechanistic-only"
+        ),
     }
 
-    records = []
-    for _, panel_row in panel.iterrows():
-        per_study = []
-        directions = []
-        nominal_support = 0
-        for study_name, df in deg_tables.items():
-            hit = df[df["GeneSymbol"] == panel_row["GeneSymbol"]]
-            if hit.empty:
-                continue
-            row = hit.iloc[0]
-            effect = float(row["log2FC"])
-            pvalue = float(row["pvalue"])
-            se = approximate_se(effect, pvalue)
-            per_study.append((study_name, effect, se, pvalue))
-            directions.append(np.sign(effect))
-            if pvalue <= 0.05 and abs(effect) >= 0.30:
-                nominal_support += 1
-
-        meta = dersimonian_laird_meta(
-            np.array([value[1] for value in per_study], dtype=float),
-            np.array([value[2] for value in per_study], dtype=float),
-        )
-        direction_labels = ["up" if d > 0 else "down" if d < 0 else "flat" for d in directions]
-        direction_concordance = len(set(direction_labels)) == 1 if direction_labels else False
-        pooled_direction = (
-            "up" if meta["RandomEffect"] > 0 else "down" if meta["RandomEffect"] < 0 else "flat"
-        )
-        evidence_tier = (
-            "cross-cohort"
-            if nominal_support >= 2 and meta["PooledPValue"] <= 0.05
-            else "single-cohort"
-            if nominal_support == 1
-            else "mechanistic-only"
-        )
 
-        records.append(
-            {
-                "GeneSymbol": panel_row["GeneSymbol"],
-                "GeneName": panel_row["Gene"],
-                "Pathway": panel_row["Pathway"],
-                "PhaseRelevance": panel_row["Phase_Relevance"],
-                "Druggability": panel_row["Druggability"],
-                "Studies": meta["Studies"],
-                "NominalSupportCount": nominal_support,
-                "DirectionConcordant": direction_concordance,
-                "PooledDirection": pooled_direction,
-                "RandomEffect": meta["RandomEffect"],
-                "RandomSE": meta["RandomSE"],
-                "Lower95CI": meta["RandomEffect"] - 1.96 * meta["RandomSE"] if pd.notna(meta["RandomSE"]) else np.nan,
-                "Upper95CI": meta["RandomEffect"] + 1.96 * meta["RandomSE"] if pd.notna(meta["RandomSE"]) else np.nan,
-                "PooledPValue": meta["PooledPValue"],
-                "I2": meta["I2"],
-                "Tau2": meta["Tau2"],
-                "EvidenceTier": evidence_tier,
-                "PerStudyEffects": "; ".join(
-                    f"{study}:{effect:.2f}, p={pvalue:.3g}" for study, effect, _, pvalue in per_study
-                ),
-            }
-        )
-
-    meta_df = pd.DataFrame(records)
-    meta_df["AbsRandomEffect"] = meta_df["RandomEffect"].abs()
-    meta_df["MetaPriority"] = (
-        0.45 * np.clip(meta_df["NominalSupportCount"] / 3.0, 0, 1)
-        + 0.35 * np.clip(meta_df["AbsRandomEffect"] / 1.0, 0, 1)
-        + 0.20 * (1 - np.clip(meta_df["I2"].fillna(100) / 100.0, 0, 1))
+def load_panel() -> pd.DataFrame:
+    return pd.read_csv(BASE_DIR / "data" / "gene_signature.csv").rename(columns={"Symbol": "GeneSymbol"})
+
+
+@traced()
+def load_deg_tables() -> dict[str, pd.DataFrame]:
+    return {accession: pd.read_csv(REV_TABLES / f"{accession}_deg_results.csv") for accession in COHORTS}
+
+
+@traced()
+def build_meta_table(
+    deg_tables: dict[str, pd.DataFrame] | None = None,
+    panel: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    panel = load_panel() if panel is None else panel
+    deg_tables = load_deg_tables() if deg_tables is None else deg_tables
+
+    arrays = study_arrays(deg_tables, panel["GeneSymbol"])
+    evidence = pooled_evidence(arrays)
+    studies = list(deg_tables)
+    per_study_effects = [
+        "; ".join(f"{study}:{effect:.2f}, p={pvalue:.3g}" for study, found, effect, pvalue in zip(studies, *row) if found)
+        for row in zip(arrays["present"], arrays["log2fc"], arrays["pvalue"])
+    ]
+
+    meta_df = pd.DataFrame(
+        {
+            "GeneSymbol": panel["GeneSymbol"].to_numpy(),
+            "GeneName": panel["Gene"].to_numpy(),
+            "Pathway": panel["Pathway"].to_numpy(),
+            "PhaseRelevance": panel["Phase_Relevance"].to_numpy(),
+            "Druggability": panel["Druggability"].to_numpy(),
+            "Studies": evidence["Studies"],
+            "NominalSupportCount": evidence["NominalSupportCount"],
+            "DirectionConcordant": evidence["DirectionConcordant"],
+            "PooledDirection": evidence["PooledDirection"],
+            "RandomEffect": evidence["RandomEffect"],
+            "RandomSE": evidence["RandomSE"],
+            "Lower95CI": evidence["RandomEffect"] - 1.96 * evidence["RandomSE"],
+            "Upper95CI": evidence["RandomEffect"] + 1.96 * evidence["RandomSE"],
+            "PooledPValue": evidence["PooledPValue"],
+            "I2": evidence["I2"],
+            "Tau2": evidence["Tau2"],
+            "EvidenceTier": evidence["EvidenceTier"],
+            "SEMethod": se_method(arrays["exact_se"]),
+            "PerStudyEffects": per_study_effects,
+        }
     )
+    meta_df["AbsRandomEffect"] = meta_df["RandomEffect"].abs()
+    meta_df["MetaPriority"] = meta_priority(meta_df["NominalSupportCount"], meta_df["AbsRandomEffect"], meta_df["I2"])
     meta_df = meta_df.sort_values(
         ["EvidenceTier", "MetaPriority", "PooledPValue"],
         ascending=[True, False, True],
-        key=lambda s: s.map({"cross-cohort": 0, "single-cohort": 1, "mechanistic-only": 2}) if s.name == "EvidenceTier" else s,
+        key=lambda s: s.map(TIER_ORDER) if s.name == "EvidenceTier" else s,
     ).reset_index(drop=True)
     meta_df["MetaRank"] = np.arange(1, len(meta_df) + 1)
     return meta_df
 
 
+@traced()
 def make_figures(meta_df: pd.DataFrame) -> None:
     sns.set_theme(style="whitegrid")
 
@@ -238,6 +266,7 @@ def make_figures(meta_df: pd.DataFrame) -> None:
     plt.close(fig)
 
 
+@traced()
 def write_tables(meta_df: pd.DataFrame) -> None:
     meta_df.to_csv(V2_TABLES / "kfd_enhanced_v2_meta_targets.csv", index=False)
     summary = (
@@ -258,6 +287,7 @@ def write_tables(meta_df: pd.DataFrame) -> None:
     translational.to_csv(V2_TABLES / "kfd_enhanced_v2_translational_targets.csv", index=False)
 
 
+@traced()
 def build_memo(meta_df: pd.DataFrame) -> Path:
     summary = pd.read_csv(V2_TABLES / "kfd_enhanced_v2_evidence_summary.csv")
     translational = pd.read_csv(V2_TABLES / "kfd_enhanced_v2_translational_targets.csv")
@@ -278,46 +308,34 @@ def build_memo(meta_df: pd.DataFrame) -> Path:
         "Purpose: add a stronger statistical layer to the current revision without changing existing submission assets."
     )
 
+    se_source = se_wording(set(meta_df["SEMethod"]))["se_source"]
     for paragraph in [
-        f"Meta-analysis was added for the prespecified 50-gene panel using the existing cohort-level severe-versus-non-severe effect estimates from GSE18090, GSE51808, and GSE43777. Standard errors were approximated from two-sided P values and log2 fold-changes, then pooled with a DerSimonian-Laird random-effects model.",
+        f"Meta-analysis was added for the prespecified 50-gene panel using the existing cohort-level severe-versus-non-severe effect estimates from GSE18090, GSE51808, and GSE43777, with {se_source}, pooled with a DerSimonian-Laird random-effects model.",
         f"Only {len(cross)} genes met a cross-cohort evidence tier, whereas {len(single)} genes showed single-cohort nominal support. This confirms that the strongest evidence in the current dataset base is concentrated in a limited subset of targets, while many endothelial/coagulation genes remain mechanistic-priority hypotheses rather than recurrent transcriptomic findings.",
         "This v2 layer strengthens rigor in three ways: it provides pooled effects with confidence intervals, quantifies heterogeneity, and separates cross-cohort versus single-cohort evidence. It therefore supports more precise wording around which conclusions are well supported and which remain exploratory.",
     ]:
         doc.add_paragraph(paragraph)
 
     doc.add_heading("Table 1. Evidence-tier summary", level=1)
-    table1 = doc.add_table(rows=len(summary) + 1, cols=len(summary.columns))
-    table1.style = "Table Grid"
-    for idx, col in enumerate(summary.columns):
-        cell = table1.rows[0].cells[idx]
-        cell.text = str(col)
-        cell.paragraphs[0].runs[0].bold = True
-        set_cell_shading(cell, "D9E2F3")
-    for r_idx, (_, row) in enumerate(summary.iterrows(), start=1):
-        for c_idx, col in enumerate(summary.columns):
-            table1.rows[r_idx].cells[c_idx].text = str(row[col])
+    add_dataframe_table(doc, summary)
 
     doc.add_heading("Table 2. Translationally important targets with uncertainty estimates", level=1)
-    table2 = doc.add_table(rows=len(translational) + 1, cols=7)
-    table2.style = "Table Grid"
-    headers = ["Meta rank", "Gene", "Pathway", "Support", "Pooled effect (95% CI)", "I2", "Evidence tier"]
-    for idx, header in enumerate(headers):
-        cell = table2.rows[0].cells[idx]
-        cell.text = header
-        cell.paragraphs[0].runs[0].bold = True
-        set_cell_shading(cell, "D9E2F3")
-    for r_idx, (_, row) in enumerate(translational.iterrows(), start=1):
-        values = [
-            int(row["MetaRank"]),
-            row["GeneSymbol"],
-            row["Pathway"],
-            int(row["NominalSupportCount"]),
-            f"{row['RandomEffect']:.2f} ({row['Lower95CI']:.2f} to {row['Upper95CI']:.2f})",
-            f"{row['I2']:.1f}",
-            row["EvidenceTier"],
+    table2 = translational.assign(
+        PooledEffect=lambda df: [
+            f"{effect:.2f} ({lower:.2f} to {upper:.2f})"
+            for effect, lower, upper in zip(df["RandomEffect"], df["Lower95CI"], df["Upper95CI"])
         ]
-        for c_idx, value in enumerate(values):
-            table2.rows[r_idx].cells[c_idx].text = str(value)
+    )[["MetaRank", "GeneSymbol", "Pathway", "NominalSupportCount", "PooledEffect", "I2", "EvidenceTier"]]
+    add_dataframe_table(
+        doc,
+        table2,
+        formatters={
+            "MetaRank": lambda value: str(int(value)),
+            "NominalSupportCount": lambda value: str(int(value)),
+            "I2": lambda value: f"{value:.1f}",
+        },
+        headers=["Meta rank", "Gene", "Pathway", "Support", "Pooled effect (95% CI)", "I2", "Evidence tier"],
+    )
 
     doc.add_heading("Recommended wording upgrade", level=1)
     for bullet in [
@@ -332,15 +350,40 @@ def build_memo(meta_df: pd.DataFrame) -> Path:
     return out_path
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_config_argument(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    enable_profiling(args.profile)
+    if args.config is not None:
+        rebuild.apply_config(load_config(args.config))
+
+    run = start_run(
+        "enhance_kfd_revision_v2",
+        parameters={
+            "code_digest": source_digest(sys.modules[__name__]),
+            "config_fingerprint": rebuild.CONFIG.fingerprint("revision"),
+        },
+    )
+    run.record_input(BASE_DIR / "data" / "gene_signature.csv")
+    for accession in COHORTS:
+        run.record_input(REV_TABLES / f"{accession}_deg_results.csv", upstream="rebuild_kfd_revision")
+
     meta_df = build_meta_table()
     write_tables(meta_df)
     make_figures(meta_df)
     memo_path = build_memo(meta_df)
+    for path in [*sorted(V2_TABLES.glob("kfd_enhanced_v2_*.csv")), *sorted(V2_FIGS.glob("figure_v2_*.png")), memo_path]:
+        run.record_output(path)
     print("Generated additive v2 enhancement package:")
     print(f" - {memo_path.name}")
     print(f" - {V2_TABLES / 'kfd_enhanced_v2_meta_targets.csv'}")
     print(f" - {V2_FIGS / 'figure_v2_meta_priority.png'}")
+    publish_run(run)
+    manifest_path = run.write()
+    report("enhance_kfd_revision_v2")
+    print(f"Run manifest written to {manifest_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,471 @@
+"""Gene-set enrichment of the per-cohort DEG tables.
+
+Two analyses, both run against every gene set at once after restricting the
+sets to the genes tested in each cohort:
+
+* Over-representation (ORA): the nominal DEGs (the ``revision.deg`` thresholds
+  of the pipeline configuration, as used for the cohort summary) are tested
+  with a one-sided hypergeometric test, separately for all, up and down DEGs.
+  Overlaps come from one sparse matrix-vector product.
+* Preranked GSEA: the full ranking (``t`` when the table has it, otherwise
+  ``sign(log2FC) * -log10(pvalue)``) is scored with the weighted running-sum
+  statistic. Enrichment scores for all sets are computed from their hit
+  positions in one pass, and the gene-set permutation null is drawn once per
+  distinct set size, in seeded batches that can be spread over processes.
+
+Both report Benjamini-Hochberg style FDRs (GSEA uses the NES-based FDR of
+Subramanian et al. 2005).
+
+    python scripts/enrichment.py --gmt data/gene_sets/c2.cp.reactome.v2024.1.Hs.symbols.gmt
+    python scripts/enrichment.py --method gsea --permutations 10000 --jobs 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.special import gammaln
+
+from build_cache import source_digest
+from gene_sets import GeneSetIndex, load_gene_sets
+from instrumentation import add_profile_argument, enable_profiling, report, span, traced
+from kfd_config import add_config_argument, load_config
+import rebuild_kfd_revision as rebuild
+from rebuild_kfd_revision import DATASETS, benjamini_hochberg
+from results_db import publish_run
+from run_manifest import start_run
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+REV_TABLES = BASE_DIR / "outputs" / "revision_tables"
+ENRICHMENT_TABLES = BASE_DIR / "outputs" / "enrichment_tables"
+
+MIN_SET_SIZE = 5
+MAX_SET_SIZE = 500
+PERMUTATIONS = 1000
+PERMUTATION_BATCH = 250
+SEED = 20240101
+
+
+def deg_sets(deg: pd.DataFrame, pvalue: float | None = None, log2fc: float | None = None) -> dict[str, list[str]]:
+    """Nominal DEGs split by direction: ``{"all": [...], "up": [...], "down": [...]}``.
+
+    Thresholds default to ``revision.deg`` of the active configuration.
+    """
+    revision = rebuild.CONFIG.revision
+    pvalue = revision.deg_pvalue if pvalue is None else pvalue
+    log2fc = revision.deg_abs_log2fc if log2fc is None else log2fc
+    hits = deg[(deg["pvalue"] <= pvalue) & (deg["log2FC"].abs() >= log2fc)]
+    return {
+        "all": hits["GeneSymbol"].tolist(),
+        "up": hits.loc[hits["log2FC"] > 0, "GeneSymbol"].tolist(),
+        "down": hits.loc[hits["log2FC"] < 0, "GeneSymbol"].tolist(),
+    }
+
+
+def _log_choose(n: np.ndarray, k: np.ndarray) -> np.ndarray:
+    return gammaln(n + 1) - gammaln(k + 1) - gammaln(n - k + 1)
+
+
+def hypergeometric_sf(overlap: np.ndarray, population: int, sizes: np.ndarray, drawn: int) -> np.ndarray:
+    """``P(X >= overlap)`` for ``X ~ Hypergeom(population, size, drawn)``, one value per set.
+
+    Sets only differ in size, so the tail is tabulated once per distinct size
+    (a reverse cumulative sum of the pmf over its support) and looked up,
+    instead of evaluating the distribution set by set.
+    """
+    if drawn == 0 or len(sizes) == 0:
+        return np.ones(len(sizes))
+    unique_sizes, size_index = np.unique(sizes, return_inverse=True)
+    k = np.arange(min(int(unique_sizes.max()), drawn) + 1)
+    K = unique_sizes[:, np.newaxis]
+    support = (k <= K) & (drawn - k <= population - K)
+    with np.errstate(invalid="ignore"):
+        log_pmf = (
+            _log_choose(K, np.minimum(k, K))
+            + _log_choose(population - K, np.clip(drawn - k, 0, population - K))
+            - _log_choose(population, drawn)
+        )
+    pmf = np.where(support, np.exp(log_pmf), 0.0)
+    tail = np.cumsum(pmf[:, ::-1], axis=1)[:, ::-1]
+    tail = np.concatenate([tail, np.zeros((len(unique_sizes), 1))], axis=1)
+    return np.clip(tail[size_index, np.minimum(overlap, k[-1] + 1)], 0.0, 1.0)
+
+
+def over_representation(
+    index: GeneSetIndex,
+    hits: list[str],
+    universe: list[str] | None = None,
+    min_size: int = MIN_SET_SIZE,
+    max_size: int | None = MAX_SET_SIZE,
+    list_pvalue: float = 0.05,
+) -> pd.DataFrame:
+    """One-sided hypergeometric test of ``hits`` against every set in ``index``.
+
+    With ``universe`` the sets are first restricted to those genes; otherwise
+    ``index`` is taken as already restricted. The population is the genes that
+    belong to at least one set, and only hits in that population count as draws.
+    Overlapping genes are listed for sets with ``pvalue <= list_pvalue``.
+    """
+    if universe is not None:
+        index = index.restrict(universe)
+    background = index.filter_sizes(min_size, max_size)
+    is_hit = background.indicator(hits)
+    population = len(background.genes)
+    drawn = int(is_hit.sum())
+
+    sizes = background.sizes
+    overlap = background.matrix @ is_hit.astype(np.int32)
+    pvalues = hypergeometric_sf(overlap, population, sizes, drawn)
+    expected = sizes * drawn / population if population else np.zeros(len(sizes))
+
+    listed = np.flatnonzero((pvalues <= list_pvalue) & (overlap > 0))
+    hit_matrix = background.matrix[listed].multiply(is_hit[np.newaxis, :]).tocsr()
+    hit_matrix.eliminate_zeros()
+    overlap_genes = np.full(len(sizes), "", dtype=object)
+    overlap_genes[listed] = [
+        ";".join(background.genes[hit_matrix.indices[start:end]])
+        for start, end in zip(hit_matrix.indptr[:-1], hit_matrix.indptr[1:])
+    ]
+
+    table = pd.DataFrame(
+        {
+            "GeneSet": background.names,
+            "Description": background.descriptions,
+            "SetSize": sizes,
+            "Overlap": overlap,
+            "Expected": expected,
+            "FoldEnrichment": np.divide(overlap, expected, out=np.zeros(len(sizes)), where=expected > 0),
+            "pvalue": pvalues,
+            "OverlapGenes": overlap_genes,
+        }
+    )
+    table.insert(table.columns.get_loc("pvalue") + 1, "fdr", benjamini_hochberg(table["pvalue"]) if len(table) else [])
+    return table
+
+
+def ranking_metric(deg: pd.DataFrame, metric: str = "auto") -> pd.Series:
+    """Per-gene ranking statistic indexed by gene symbol, sorted descending.
+
+    ``auto`` uses the ``t`` column when present and the signed
+    ``-log10(pvalue)`` otherwise; ``log2fc`` ranks by fold change alone.
+    """
+    if metric == "auto":
+        metric = "t" if "t" in deg.columns else "signed_p"
+    if metric == "t":
+        values = deg["t"]
+    elif metric == "log2fc":
+        values = deg["log2FC"]
+    elif metric == "signed_p":
+        values = np.sign(deg["log2FC"]) * -np.log10(deg["pvalue"].clip(lower=np.finfo(float).tiny))
+    else:
+        raise ValueError(f"Unknown ranking metric {metric!r}; expected 'auto', 't', 'signed_p' or 'log2fc'")
+    ranking = pd.Series(values.to_numpy(dtype=float), index=deg["GeneSymbol"].astype(str))
+    ranking = ranking[ranking.notna() & ranking.index.notna()]
+    ranking = ranking[~ranking.index.duplicated()]
+    return ranking.sort_values(ascending=False, kind="stable")
+
+
+def _running_sum_extremes(weights: np.ndarray, positions: np.ndarray, n_genes: int) -> tuple[np.ndarray, np.ndarray]:
+    """Peak and trough of the running sum for equal-sized sets, given sorted hit ``positions`` ``(batch, m)``.
+
+    The running sum only peaks at a hit and only dips just before one, so the
+    extremes are read off the hit positions without walking the whole ranking.
+    Returns the per-hit deviations at and just before each hit.
+    """
+    m = positions.shape[1]
+    hit_weights = np.cumsum(weights[positions], axis=1)
+    hit_weights /= hit_weights[:, -1:]
+    misses = (positions - np.arange(m)) / (n_genes - m)
+    before = np.concatenate([np.zeros((len(positions), 1)), hit_weights[:, :-1]], axis=1)
+    return hit_weights - misses, before - misses
+
+
+def _enrichment_score(at_hit: np.ndarray, before_hit: np.ndarray) -> np.ndarray:
+    peak = at_hit.max(axis=1)
+    trough = before_hit.min(axis=1)
+    return np.where(peak > -trough, peak, trough)
+
+
+def hit_positions(index: GeneSetIndex, ranking: pd.Series) -> list[np.ndarray]:
+    """Sorted rank positions of each set's members in ``ranking``; members not ranked are dropped."""
+    position = np.full(len(index.genes), -1, dtype=np.int64)
+    ids = index.encode(ranking.index)
+    position[ids[ids >= 0]] = np.flatnonzero(ids >= 0)
+    flat = position[index.matrix.indices]
+    keep = flat >= 0
+    row = np.repeat(np.arange(len(index)), index.sizes)[keep]
+    keys = np.sort(row * len(ranking) + flat[keep])
+    return np.split(keys % len(ranking), np.cumsum(np.bincount(row, minlength=len(index)))[:-1])
+
+
+def enrichment_scores(
+    index: GeneSetIndex, ranking: pd.Series, weight: float = 1.0, positions: list[np.ndarray] | None = None
+) -> np.ndarray:
+    """Observed running-sum ES for every set in ``index`` against ``ranking`` (sorted descending).
+
+    Sets of equal size are scored together as one ``(sets, size)`` block of hit
+    positions.
+    """
+    weights = np.abs(ranking.to_numpy()) ** weight
+    if positions is None:
+        positions = hit_positions(index, ranking)
+    sizes = np.fromiter(map(len, positions), dtype=np.int64, count=len(positions))
+    scores = np.zeros(len(positions))
+    for size in np.unique(sizes[sizes > 0]):
+        rows = np.flatnonzero(sizes == size)
+        block = np.stack([positions[row] for row in rows])
+        scores[rows] = _enrichment_score(*_running_sum_extremes(weights, block, len(ranking)))
+    return scores
+
+
+def leading_edge(weights: np.ndarray, positions: np.ndarray, n_genes: int, score: float) -> np.ndarray:
+    """Hit positions up to the running-sum peak (positive ES) or from the trough onward (negative ES)."""
+    at_hit, before_hit = _running_sum_extremes(weights, positions[np.newaxis, :], n_genes)
+    if score >= 0:
+        return positions[: int(np.argmax(at_hit[0])) + 1]
+    return positions[int(np.argmin(before_hit[0])):]
+
+
+def null_enrichment_scores(
+    weights: np.ndarray, sizes: np.ndarray, permutations: int, seed: np.random.SeedSequence
+) -> np.ndarray:
+    """Gene-set permutation null, ``(len(sizes), permutations)``, for sets of each size in ``sizes``.
+
+    Each permutation draws one random gene subset whose prefixes serve every
+    size, so sets of a given size share one null distribution.
+    """
+    rng = np.random.default_rng(seed)
+    n_genes = len(weights)
+    draws = np.empty((permutations, int(sizes.max())), dtype=np.int64)
+    for row in range(permutations):
+        draws[row] = rng.choice(n_genes, size=draws.shape[1], replace=False)
+    return np.stack(
+        [_enrichment_score(*_running_sum_extremes(weights, np.sort(draws[:, :size], axis=1), n_genes)) for size in sizes]
+    )
+
+
+def _sign_means(null: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Mean positive and mean absolute negative null ES per row (NaN where a side is empty)."""
+    positive = null >= 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        positive_mean = np.where(positive, null, 0.0).sum(axis=1) / positive.sum(axis=1)
+        negative_mean = -np.where(positive, 0.0, null).sum(axis=1) / (~positive).sum(axis=1)
+    return positive_mean, negative_mean
+
+
+def _normalise(values: np.ndarray, positive_mean: np.ndarray, negative_mean: np.ndarray) -> np.ndarray:
+    scale = np.where(values >= 0, positive_mean, negative_mean)
+    return np.divide(values, scale, out=np.zeros_like(values, dtype=float), where=np.nan_to_num(scale) > 0)
+
+
+def _tail_fraction(pool: np.ndarray, weights: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Weighted fraction of ``pool`` at or above each of ``values``."""
+    order = np.argsort(pool)
+    pool, weights = pool[order], weights[order]
+    at_or_above = np.concatenate([np.cumsum(weights[::-1])[::-1], [0.0]])
+    if not len(pool) or at_or_above[0] == 0:
+        return np.ones(len(values))
+    return at_or_above[np.searchsorted(pool, values, side="left")] / at_or_above[0]
+
+
+def gsea_fdr(normalised: np.ndarray, null_normalised: np.ndarray, set_counts: np.ndarray) -> np.ndarray:
+    """NES-based FDR: null tail fraction over observed tail fraction, on each sign separately.
+
+    ``null_normalised`` holds one row per distinct set size, weighted by the
+    number of sets of that size, so it stands for the null of every set.
+    """
+    fdr = np.ones(len(normalised))
+    pool_weights = np.repeat(set_counts, null_normalised.shape[1]).astype(float)
+    null = null_normalised.ravel()
+    for observed_side, null_side, sign in ((normalised >= 0, null >= 0, 1.0), (normalised < 0, null < 0, -1.0)):
+        if not observed_side.any():
+            continue
+        observed = sign * normalised[observed_side]
+        null_fraction = _tail_fraction(sign * null[null_side], pool_weights[null_side], observed)
+        observed_fraction = _tail_fraction(observed, np.ones(len(observed)), observed)
+        fdr[observed_side] = np.minimum(null_fraction / observed_fraction, 1.0)
+    return fdr
+
+
+def _null_batches(
+    weights: np.ndarray, sizes: np.ndarray, permutations: int, seed: int, jobs: int
+) -> np.ndarray:
+    """Run the permutation null in ``PERMUTATION_BATCH`` chunks with child seeds spawned from ``seed``."""
+    batches = [min(PERMUTATION_BATCH, permutations - start) for start in range(0, permutations, PERMUTATION_BATCH)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    if jobs > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parts = list(pool.map(null_enrichment_scores, [weights] * len(batches), [sizes] * len(batches), batches, seeds))
+    else:
+        parts = [null_enrichment_scores(weights, sizes, count, child) for count, child in zip(batches, seeds)]
+    return np.concatenate(parts, axis=1)
+
+
+def preranked_gsea(
+    index: GeneSetIndex,
+    ranking: pd.Series,
+    permutations: int = PERMUTATIONS,
+    seed: int = SEED,
+    min_size: int = MIN_SET_SIZE,
+    max_size: int | None = MAX_SET_SIZE,
+    weight: float = 1.0,
+    jobs: int = 1,
+    list_pvalue: float = 0.05,
+) -> pd.DataFrame:
+    """Preranked GSEA of ``ranking`` (gene -> statistic, sorted descending) against every set in ``index``.
+
+    Results do not depend on ``jobs``: permutation batches and their seeds are
+    fixed by ``permutations`` and ``seed``. Leading-edge genes are listed for
+    sets with ``pvalue <= list_pvalue``.
+    """
+    background = index.restrict(ranking.index).filter_sizes(min_size, max_size)
+    weights = np.abs(ranking.to_numpy()) ** weight
+    sizes = background.sizes
+    positions = hit_positions(background, ranking)
+    scores = enrichment_scores(background, ranking, weight, positions)
+
+    unique_sizes, size_index, set_counts = np.unique(sizes, return_inverse=True, return_counts=True)
+    null = _null_batches(weights, unique_sizes, permutations, seed, jobs) if len(sizes) else np.zeros((0, permutations))
+    positive_mean, negative_mean = _sign_means(null)
+    normalised = _normalise(scores, positive_mean[size_index], negative_mean[size_index])
+    null_normalised = _normalise(null, positive_mean[:, np.newaxis], negative_mean[:, np.newaxis])
+
+    # Nominal p-value against the same-sign part of the set's size-matched null,
+    # counted with one binary search per set over the row-sorted null.
+    null_sorted = np.sort(null, axis=1)
+    n_negative = (null < 0).sum(axis=1)
+    below_or_at = np.array(
+        [np.searchsorted(null_sorted[row], score, side="right") for row, score in zip(size_index, scores)], dtype=np.int64
+    )
+    at_or_above = np.array(
+        [permutations - np.searchsorted(null_sorted[row], score, side="left") for row, score in zip(size_index, scores)],
+        dtype=np.int64,
+    )
+    positive = scores >= 0
+    beyond = np.where(positive, at_or_above, below_or_at)
+    same_sign = np.where(positive, permutations - n_negative[size_index], n_negative[size_index])
+    pvalues = (beyond + 1) / (same_sign + 1)
+
+    genes = ranking.index.to_numpy()
+    edges = np.full(len(sizes), "", dtype=object)
+    listed = np.flatnonzero(pvalues <= list_pvalue)
+    if len(listed):
+        edges[listed] = [
+            ";".join(genes[leading_edge(weights, positions[row], len(ranking), scores[row])]) for row in listed
+        ]
+
+    return pd.DataFrame(
+        {
+            "GeneSet": background.names,
+            "Description": background.descriptions,
+            "SetSize": sizes,
+            "ES": scores,
+            "NES": normalised,
+            "pvalue": pvalues,
+            "fdr": gsea_fdr(normalised, null_normalised, set_counts),
+            "LeadingEdge": edges,
+        }
+    )
+
+
+@traced()
+def cohort_enrichment(accession: str, deg: pd.DataFrame, index: GeneSetIndex, **kwargs) -> pd.DataFrame:
+    background = index.restrict(deg["GeneSymbol"].dropna().astype(str))
+    tables = []
+    for direction, hits in deg_sets(deg).items():
+        table = over_representation(background, hits, **kwargs)
+        table.insert(0, "Direction", direction)
+        table.insert(0, "Dataset", accession)
+        tables.append(table)
+    result = pd.concat(tables, ignore_index=True)
+    return result.sort_values(["Direction", "fdr", "pvalue"], kind="stable").reset_index(drop=True)
+
+
+@traced()
+def cohort_gsea(accession: str, deg: pd.DataFrame, index: GeneSetIndex, metric: str = "auto", **kwargs) -> pd.DataFrame:
+    table = preranked_gsea(index, ranking_metric(deg, metric), **kwargs)
+    table.insert(0, "Dataset", accession)
+    return table.sort_values(["fdr", "pvalue"], kind="stable").reset_index(drop=True)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gmt", type=Path, nargs="+", help="GMT files (default: data/gene_sets/*.gmt[.gz] or built-in pathways)")
+    parser.add_argument("--method", choices=["ora", "gsea", "both"], default="both")
+    parser.add_argument("--min-size", type=int, default=MIN_SET_SIZE)
+    parser.add_argument("--max-size", type=int, default=MAX_SET_SIZE)
+    parser.add_argument("--metric", choices=["auto", "t", "signed_p", "log2fc"], default="auto", help="GSEA ranking statistic")
+    parser.add_argument("--permutations", type=int, default=PERMUTATIONS, help="GSEA gene-set permutations")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes for GSEA permutations")
+    add_config_argument(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    enable_profiling(args.profile)
+    if args.config is not None:
+        rebuild.apply_config(load_config(args.config))
+    revision = rebuild.CONFIG.revision
+
+    methods = ["ora", "gsea"] if args.method == "both" else [args.method]
+    ENRICHMENT_TABLES.mkdir(parents=True, exist_ok=True)
+    run = start_run(
+        "enrichment",
+        parameters={
+            "code_digest": source_digest(sys.modules[__name__]),
+            "config_fingerprint": rebuild.CONFIG.fingerprint("revision"),
+            "methods": methods,
+            "deg_pvalue": revision.deg_pvalue,
+            "deg_log2fc": revision.deg_abs_log2fc,
+            "min_size": args.min_size,
+            "max_size": args.max_size,
+            "metric": args.metric,
+            "permutations": args.permutations,
+            "seed": args.seed,
+        },
+    )
+    with span("load_gene_sets"):
+        index = load_gene_sets(args.gmt, rebuild.CONFIG)
+    for path in args.gmt or []:
+        run.record_input(path)
+    print(f"Gene sets: {index}")
+
+    sizes = {"min_size": args.min_size, "max_size": args.max_size}
+    for config in DATASETS:
+        deg_path = REV_TABLES / f"{config.accession}_deg_results.csv"
+        run.record_input(deg_path, upstream="rebuild_kfd_revision")
+        deg = pd.read_csv(deg_path)
+
+        if "ora" in methods:
+            table = cohort_enrichment(config.accession, deg, index, **sizes)
+            out_path = ENRICHMENT_TABLES / f"{config.accession}_ora_enrichment.csv"
+            table.to_csv(out_path, index=False)
+            run.record_output(out_path)
+            top = table[table["Direction"] == "all"].head(5)
+            print(f"\n{config.accession} ORA: {int((table['fdr'] <= 0.05).sum())} set/direction pairs at FDR <= 0.05")
+            print(top[["GeneSet", "SetSize", "Overlap", "FoldEnrichment", "pvalue", "fdr"]].to_string(index=False))
+
+        if "gsea" in methods:
+            table = cohort_gsea(
+                config.accession, deg, index, args.metric,
+                permutations=args.permutations, seed=args.seed, jobs=args.jobs, **sizes,
+            )
+            out_path = ENRICHMENT_TABLES / f"{config.accession}_gsea_enrichment.csv"
+            table.to_csv(out_path, index=False)
+            run.record_output(out_path)
+            print(f"\n{config.accession} GSEA: {int((table['fdr'] <= 0.25).sum())} sets at FDR <= 0.25")
+            print(table.head(5)[["GeneSet", "SetSize", "ES", "NES", "pvalue", "fdr"]].to_string(index=False))
+
+    publish_run(run)
+    manifest_path = run.write()
+    report("enrichment")
+    print(f"Run manifest written to {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
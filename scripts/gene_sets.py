@@ -0,0 +1,227 @@
+"""Gene-set collections as a sparse gene-by-set index.
+
+Pathway definitions come from Reactome/MSigDB-style GMT files (one set per
+line: name, description, then member genes, tab-separated; ``.gmt.gz`` is read
+transparently) or from the ``pathways:`` block of ``config/kfd_config.yaml``.
+Whatever the source, genes are interned as integer IDs and the collection is
+held as a CSR matrix of shape ``(sets, genes)``, so membership, overlaps and
+scores across thousands of sets are sparse matrix products.
+
+    python scripts/gene_sets.py data/gene_sets/c2.cp.reactome.v2024.1.Hs.symbols.gmt
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import itertools
+import time
+from pathlib import Path
+from typing import Iterable, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from kfd_config import KFDConfig, add_config_argument, load_config
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+GENE_SET_DIR = BASE_DIR / "data" / "gene_sets"
+
+
+def read_gmt(path: Path) -> list[tuple[str, str, list[str]]]:
+    """Return ``(name, description, genes)`` for every set in a GMT file."""
+    opener = gzip.open if str(path).endswith(".gz") else open
+    records = []
+    with opener(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            fields = line.rstrip("\r\n").split("\t")
+            if len(fields) < 3 or not fields[0]:
+                continue
+            records.append((fields[0], fields[1], [gene.strip() for gene in fields[2:] if gene.strip()]))
+    return records
+
+
+class GeneSetIndex:
+    """Gene sets over a shared gene universe, stored as a binary CSR matrix ``(sets, genes)``."""
+
+    def __init__(self, names: Sequence[str], descriptions: Sequence[str], genes: Sequence[str], matrix: sparse.csr_matrix) -> None:
+        if matrix.shape != (len(names), len(genes)):
+            raise ValueError(f"Matrix shape {matrix.shape} does not match {len(names)} sets x {len(genes)} genes")
+        self.names = list(names)
+        self.descriptions = list(descriptions)
+        self.genes = np.asarray(genes, dtype=object)
+        self.gene_ids = {gene: index for index, gene in enumerate(self.genes)}
+        self.set_ids = {name: index for index, name in enumerate(self.names)}
+        self.matrix = matrix.tocsr().astype(np.int32)
+        self.matrix.sort_indices()
+        self._by_gene: sparse.csc_matrix | None = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"GeneSetIndex({len(self.names)} sets, {len(self.genes)} genes, {self.matrix.nnz} memberships)"
+
+    @classmethod
+    def from_sets(cls, sets: Iterable[tuple[str, str, Iterable[str]]]) -> "GeneSetIndex":
+        """Build from ``(name, description, genes)`` records; the first set with a given name wins."""
+        names: list[str] = []
+        descriptions: list[str] = []
+        members: list[list[str]] = []
+        seen: set[str] = set()
+        for name, description, genes in sets:
+            if name in seen:
+                continue
+            seen.add(name)
+            names.append(name)
+            descriptions.append(description)
+            members.append(list(genes))
+
+        lengths = np.fromiter(map(len, members), dtype=np.int64, count=len(members))
+        flat = np.fromiter(itertools.chain.from_iterable(members), dtype=object, count=int(lengths.sum()))
+        codes, universe = pd.factorize(flat)
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        matrix = sparse.csr_matrix(
+            (np.ones(len(codes), dtype=np.int32), codes.astype(np.int64), indptr), shape=(len(names), len(universe))
+        )
+        matrix.sum_duplicates()
+        matrix.data[:] = 1
+        return cls(names, descriptions, list(universe), matrix)
+
+    @classmethod
+    def from_gmt(cls, *paths: Path) -> "GeneSetIndex":
+        return cls.from_sets(record for path in paths for record in read_gmt(Path(path)))
+
+    @classmethod
+    def from_definitions(cls, definitions: Mapping[str, Mapping]) -> "GeneSetIndex":
+        """Build from ``{name: {"genes": ..., "reactome": ...}}`` as in ``RevisionConfig.pathway_definitions()``."""
+        return cls.from_sets(
+            (name, str(info.get("reactome", "")), sorted(info["genes"])) for name, info in definitions.items()
+        )
+
+    @classmethod
+    def from_config(cls, path: Path | None = None) -> "GeneSetIndex":
+        """Build from the validated ``pathways:`` block of the pipeline configuration."""
+        return cls.from_definitions(load_config(path).revision.pathway_definitions())
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return np.diff(self.matrix.indptr)
+
+    @property
+    def by_gene(self) -> sparse.csc_matrix:
+        if self._by_gene is None:
+            self._by_gene = self.matrix.tocsc()
+        return self._by_gene
+
+    def encode(self, genes: Iterable[str]) -> np.ndarray:
+        """Integer IDs for ``genes``; genes outside the universe map to -1."""
+        return np.fromiter((self.gene_ids.get(gene, -1) for gene in genes), dtype=np.int64)
+
+    def indicator(self, genes: Iterable[str]) -> np.ndarray:
+        """Boolean vector over the gene universe marking ``genes``."""
+        ids = self.encode(genes)
+        vector = np.zeros(len(self.genes), dtype=bool)
+        vector[ids[ids >= 0]] = True
+        return vector
+
+    def members(self, name: str) -> list[str]:
+        row = self.set_ids[name]
+        return self.genes[self.matrix.indices[self.matrix.indptr[row]:self.matrix.indptr[row + 1]]].tolist()
+
+    def sets_for(self, gene: str) -> list[str]:
+        """Names of the sets containing ``gene``."""
+        column = self.gene_ids.get(gene)
+        if column is None:
+            return []
+        rows = self.by_gene.indices[self.by_gene.indptr[column]:self.by_gene.indptr[column + 1]]
+        return [self.names[row] for row in rows]
+
+    def overlap_counts(self, genes: Iterable[str]) -> np.ndarray:
+        """Number of ``genes`` in each set."""
+        return self.matrix @ self.indicator(genes).astype(np.int32)
+
+    def pairwise_overlaps(self) -> sparse.csr_matrix:
+        """``(sets, sets)`` matrix of shared gene counts."""
+        return (self.matrix @ self.matrix.T).tocsr()
+
+    def score(self, values: Mapping[str, float] | pd.Series, statistic: str = "mean") -> pd.Series:
+        """Sum or mean of per-gene ``values`` over the members of each set; missing genes count as absent."""
+        values = pd.Series(values, dtype=float).dropna()
+        ids = self.encode(values.index)
+        known = ids >= 0
+        weights = np.zeros(len(self.genes))
+        present = np.zeros(len(self.genes))
+        weights[ids[known]] = values.to_numpy()[known]
+        present[ids[known]] = 1.0
+        totals = self.matrix @ weights
+        if statistic == "sum":
+            return pd.Series(totals, index=self.names)
+        if statistic != "mean":
+            raise ValueError(f"Unknown statistic {statistic!r}; expected 'sum' or 'mean'")
+        counts = self.matrix @ present
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.Series(np.where(counts > 0, totals / counts, np.nan), index=self.names)
+
+    def restrict(self, universe: Iterable[str]) -> "GeneSetIndex":
+        """Keep only genes in ``universe`` (e.g. the genes measured on a platform); set order is unchanged."""
+        keep = self.indicator(universe)
+        columns = np.flatnonzero(keep)
+        return GeneSetIndex(self.names, self.descriptions, self.genes[columns], self.matrix[:, columns])
+
+    def filter_sizes(self, min_size: int = 1, max_size: int | None = None) -> "GeneSetIndex":
+        sizes = self.sizes
+        keep = sizes >= min_size
+        if max_size is not None:
+            keep &= sizes <= max_size
+        rows = np.flatnonzero(keep)
+        return GeneSetIndex(
+            [self.names[row] for row in rows],
+            [self.descriptions[row] for row in rows],
+            self.genes,
+            self.matrix[rows],
+        )
+
+    def write_gmt(self, path: Path) -> None:
+        opener = gzip.open if str(path).endswith(".gz") else open
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with opener(path, "wt", encoding="utf-8", newline="\n") as handle:
+            for name, description in zip(self.names, self.descriptions):
+                handle.write("\t".join([name, description, *self.members(name)]) + "\n")
+
+
+def load_gene_sets(paths: Sequence[Path] | None = None, config: KFDConfig | None = None) -> GeneSetIndex:
+    """Load GMT files (default: every ``*.gmt``/``*.gmt.gz`` in ``data/gene_sets``).
+
+    Falls back to the pathways of ``config`` (default: the pipeline configuration) when no GMT file is available.
+    """
+    if paths is None:
+        paths = sorted([*GENE_SET_DIR.glob("*.gmt"), *GENE_SET_DIR.glob("*.gmt.gz")])
+    if paths:
+        return GeneSetIndex.from_gmt(*paths)
+    return GeneSetIndex.from_definitions((config or load_config()).revision.pathway_definitions())
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("gmt", nargs="*", type=Path, help="GMT files (default: data/gene_sets/*.gmt[.gz])")
+    parser.add_argument("--export", type=Path, help="write the loaded collection to this GMT path")
+    add_config_argument(parser)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = load_gene_sets(args.gmt or None, load_config(args.config))
+    elapsed = time.perf_counter() - start
+    sizes = index.sizes
+    print(f"{index} loaded in {elapsed:.2f} s")
+    if len(index):
+        print(f"Set sizes: min {sizes.min()}, median {int(np.median(sizes))}, max {sizes.max()}")
+    if args.export:
+        index.write_gmt(args.export)
+        print(f"Wrote {args.export}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,10 @@ from pathlib import Path
 import pandas as pd
 from docx import Document
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
 from docx.shared import Cm, Inches, Pt
 
+from docx_tables import add_dataframe_table
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 MANUSCRIPT_DIR = BASE_DIR / "manuscripts"
@@ -37,13 +37,6 @@ def set_style(doc: Document, size: int = 12) -> None:
     style.paragraph_format.line_spacing = 2.0
 
 
-def set_cell_shading(cell, color: str) -> None:
-    tc_pr = cell._tc.get_or_add_tcPr()
-    shd = OxmlElement("w:shd")
-    shd.set(qn("w:fill"), color)
-    tc_pr.append(shd)
-
-
 def add_formatted_run(paragraph, text: str) -> None:
     parts = re.split(r"(\[\d+(?:[-,]\d+)*\])", text)
     for part in parts:
@@ -99,60 +92,51 @@ def build_tables_after_references_variant() -> Path:
     top_meta = meta.head(12).copy()
     p = doc.add_paragraph()
     p.add_run("Table 1. Top 12 genes ranked by meta-priority.").bold = True
-    t1 = doc.add_table(rows=len(top_meta) + 1, cols=7)
-    t1.style = "Table Grid"
-    h1 = ["Meta rank", "Gene", "Evidence tier", "Support count", "Pooled effect", "95% CI", "I2"]
-    for i, h in enumerate(h1):
-        cell = t1.rows[0].cells[i]
-        cell.text = h
-        cell.paragraphs[0].runs[0].bold = True
-        set_cell_shading(cell, "D9E2F3")
-    for i, (_, row) in enumerate(top_meta.iterrows(), start=1):
-        vals = [
-            int(row["MetaRank"]), row["GeneSymbol"], row["EvidenceTier"], int(row["NominalSupportCount"]),
-            f"{row['RandomEffect']:.2f}", f"{row['Lower95CI']:.2f} to {row['Upper95CI']:.2f}", f"{row['I2']:.1f}"
-        ]
-        for j, v in enumerate(vals):
-            t1.rows[i].cells[j].text = str(v)
+    add_dataframe_table(
+        doc,
+        top_meta.assign(
+            CI=[f"{lower:.2f} to {upper:.2f}" for lower, upper in zip(top_meta["Lower95CI"], top_meta["Upper95CI"])]
+        )[["MetaRank", "GeneSymbol", "EvidenceTier", "NominalSupportCount", "RandomEffect", "CI", "I2"]],
+        formatters={
+            "MetaRank": lambda v: str(int(v)),
+            "NominalSupportCount": lambda v: str(int(v)),
+            "RandomEffect": lambda v: f"{v:.2f}",
+            "I2": lambda v: f"{v:.1f}",
+        },
+        headers=["Meta rank", "Gene", "Evidence tier", "Support count", "Pooled effect", "95% CI", "I2"],
+    )
 
     p = doc.add_paragraph()
     p.add_run("Table 2. Translationally relevant targets with evidence tier and interpretation.").bold = True
-    t2 = doc.add_table(rows=len(transl) + 1, cols=7)
-    t2.style = "Table Grid"
-    h2 = ["Meta rank", "Gene", "Pathway", "Evidence tier", "Support", "Pooled effect", "Interpretation"]
     interp = {
         "single-cohort": "Transcriptomic signal present but not recurrent",
         "mechanistic-only": "Mechanistically plausible but weak transcriptomic support",
         "cross-cohort": "Recurrent transcriptomic support",
     }
-    for i, h in enumerate(h2):
-        cell = t2.rows[0].cells[i]
-        cell.text = h
-        cell.paragraphs[0].runs[0].bold = True
-        set_cell_shading(cell, "D9E2F3")
-    for i, (_, row) in enumerate(transl.iterrows(), start=1):
-        vals = [
-            int(row["MetaRank"]), row["GeneSymbol"], row["Pathway"], row["EvidenceTier"],
-            int(row["NominalSupportCount"]), f"{row['RandomEffect']:.2f}", interp[row["EvidenceTier"]]
-        ]
-        for j, v in enumerate(vals):
-            t2.rows[i].cells[j].text = str(v)
+    add_dataframe_table(
+        doc,
+        transl.assign(Interpretation=transl["EvidenceTier"].map(interp))[
+            ["MetaRank", "GeneSymbol", "Pathway", "EvidenceTier", "NominalSupportCount", "RandomEffect", "Interpretation"]
+        ],
+        formatters={
+            "MetaRank": lambda v: str(int(v)),
+            "NominalSupportCount": lambda v: str(int(v)),
+            "RandomEffect": lambda v: f"{v:.2f}",
+        },
+        headers=["Meta rank", "Gene", "Pathway", "Evidence tier", "Support", "Pooled effect", "Interpretation"],
+    )
 
     shortlist = revision_drugs[revision_drugs["GeneSymbol"].isin(["IL1B", "IL6", "TNF", "ANGPT2", "SERPINE1", "HMOX1", "F3", "VWF"])].copy()
     p = doc.add_paragraph()
     p.add_run("Table 3. Hypothesis-generating intervention shortlist under the final evidence framework.").bold = True
-    t3 = doc.add_table(rows=len(shortlist) + 1, cols=5)
-    t3.style = "Table Grid"
-    h3 = ["Candidate", "Target", "Pathway", "Evidence tier", "Use in manuscript"]
-    for i, h in enumerate(h3):
-        cell = t3.rows[0].cells[i]
-        cell.text = h
-        cell.paragraphs[0].runs[0].bold = True
-        set_cell_shading(cell, "D9E2F3")
-    for i, (_, row) in enumerate(shortlist.iterrows(), start=1):
-        vals = [row["Candidate"], row["GeneSymbol"], row["Pathway"], tier_lookup.get(row["GeneSymbol"], "n/a"), "Hypothesis-generating only"]
-        for j, v in enumerate(vals):
-            t3.rows[i].cells[j].text = str(v)
+    add_dataframe_table(
+        doc,
+        shortlist.assign(
+            Tier=[tier_lookup.get(gene, "n/a") for gene in shortlist["GeneSymbol"]],
+            Use="Hypothesis-generating only",
+        )[["Candidate", "GeneSymbol", "Pathway", "Tier", "Use"]],
+        headers=["Candidate", "Target", "Pathway", "Evidence tier", "Use in manuscript"],
+    )
 
     out = MANUSCRIPT_DIR / "Manuscript_KFD_MJDYPV_Final_Blinded_TablesAfterRefs.docx"
     doc.save(out)
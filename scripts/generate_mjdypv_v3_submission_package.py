@@ -2,19 +2,29 @@
 
 from __future__ import annotations
 
+import argparse
+import io
+import os
 import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import pandas as pd
-import seaborn as sns
 from docx import Document
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
 from docx.shared import Cm, Inches, Pt
 
+import docx_tables
+import manuscript_templates
+from build_cache import STATE_DIR, BuildManifest, BuildTarget, source_digest
+from docx_tables import add_dataframe_table, format_float3
+from enhance_kfd_revision_v2 import se_wording
+from instrumentation import TRACER, Span, add_profile_argument, enable_profiling, report, span, traced
+from manuscript_templates import TEMPLATE_DIR, Block, load_template, render_docx, section_blocks
+from run_manifest import start_run
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 MANUSCRIPT_DIR = BASE_DIR / "manuscripts"
@@ -26,6 +36,14 @@ FINAL_FIGS = BASE_DIR / "outputs" / "final_submission_figures"
 
 TITLE = "A Cross-Flaviviral Transcriptomic Evidence and Mechanistic Prioritization Framework for Host-Directed Therapy in Kyasanur Forest Disease"
 RUNNING_TITLE = "Evidence-Based HDT Framework for KFD"
+MANUSCRIPT_TEMPLATE = "manuscript_mjdypv_v3.md"
+
+FINAL_FIGURES = [
+    (FINAL_FIGS / "figure1_submission.png", "Figure 1. Discovery cohorts used in the analysis."),
+    (FINAL_FIGS / "figure2_submission.png", "Figure 2. Meta-priority ranking after adding pooled effects and evidence tiers."),
+    (FINAL_FIGS / "figure3_submission.png", "Figure 3. Pathway effect size versus heterogeneity."),
+    (FINAL_FIGS / "figure4_submission.png", "Figure 4. Original composite ranking retained for comparison with the meta-analytic ranking."),
+]
 
 FINAL_FIGS.mkdir(parents=True, exist_ok=True)
 
@@ -45,11 +63,18 @@ def set_base_style(doc: Document, size: int = 12, spacing: float = 2.0) -> None:
     style.paragraph_format.line_spacing = spacing
 
 
-def set_cell_shading(cell, color: str) -> None:
-    tc_pr = cell._tc.get_or_add_tcPr()
-    shd = OxmlElement("w:shd")
-    shd.set(qn("w:fill"), color)
-    tc_pr.append(shd)
+@traced()
+def save_docx(doc: Document, path: Path) -> None:
+    """Save with fixed zip timestamps so identical content yields identical bytes."""
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    with zipfile.ZipFile(buffer) as source, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            entry = zipfile.ZipInfo(info.filename, date_time=(1980, 1, 1, 0, 0, 0))
+            entry.compress_type = zipfile.ZIP_DEFLATED
+            entry.external_attr = info.external_attr
+            target.writestr(entry, source.read(info.filename))
 
 
 def word_count(text: str) -> int:
@@ -112,6 +137,10 @@ def prettify_pathway(value: str) -> str:
 
 
 def generate_final_submission_figures() -> list[tuple[Path, str]]:
+    # Plotting libraries are imported lazily so no-op incremental runs stay fast.
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     sns.set_theme(style="whitegrid")
     cohorts = pd.read_csv(REV_TABLES / "cohort_summary.csv")
     meta = pd.read_csv(V2_TABLES / "kfd_enhanced_v2_meta_targets.csv")
@@ -224,237 +253,135 @@ def generate_final_submission_figures() -> list[tuple[Path, str]]:
     fig.savefig(FINAL_FIGS / "figure4_submission.png", dpi=300)
     plt.close(fig)
 
-    return [
-        (FINAL_FIGS / "figure1_submission.png", "Figure 1. Discovery cohorts used in the analysis."),
-        (FINAL_FIGS / "figure2_submission.png", "Figure 2. Meta-priority ranking after adding pooled effects and evidence tiers."),
-        (FINAL_FIGS / "figure3_submission.png", "Figure 3. Pathway effect size versus heterogeneity."),
-        (FINAL_FIGS / "figure4_submission.png", "Figure 4. Original composite ranking retained for comparison with the meta-analytic ranking."),
-    ]
+    return FINAL_FIGURES
+
+
+def manuscript_context() -> dict[str, object]:
+    meta = pd.read_csv(V2_TABLES / "kfd_enhanced_v2_meta_targets.csv")
+    cohorts = pd.read_csv(REV_TABLES / "cohort_summary.csv")
+    top_genes = meta.head(5)["GeneSymbol"].tolist()
+    context: dict[str, object] = {
+        "single": int((meta["EvidenceTier"] == "single-cohort").sum()),
+        "mech": int((meta["EvidenceTier"] == "mechanistic-only").sum()),
+        "total": int(cohorts["SevereSamples"].sum() + cohorts["NonSevereSamples"].sum()),
+        "severe": int(cohorts["SevereSamples"].sum()),
+        "non_severe": int(cohorts["NonSevereSamples"].sum()),
+        "top_meta_genes": ", ".join(top_genes[:-1]) + f", and {top_genes[-1]}",
+        # Meta tables written before SEMethod was recorded always used approximate SEs.
+        **se_wording(set(meta["SEMethod"]) if "SEMethod" in meta.columns else {"approximate"}),
+    }
+    for dataset, severe, non_severe in cohorts[["Dataset", "SevereSamples", "NonSevereSamples"]].itertuples(index=False):
+        context[f"{dataset.lower()}_severe"] = int(severe)
+        context[f"{dataset.lower()}_non_severe"] = int(non_severe)
+    return context
+
+
+def render_manuscript_blocks() -> list[Block]:
+    return load_template(MANUSCRIPT_TEMPLATE).bind(manuscript_context())
 
 
 def build_blinded_manuscript() -> tuple[Path, int, int, int]:
     meta = pd.read_csv(V2_TABLES / "kfd_enhanced_v2_meta_targets.csv")
     transl = pd.read_csv(V2_TABLES / "kfd_enhanced_v2_translational_targets.csv")
-    cohorts = pd.read_csv(REV_TABLES / "cohort_summary.csv")
     revision_drugs = pd.read_csv(REV_TABLES / "kfd_revision_drug_candidates.csv")
-    single = int((meta["EvidenceTier"] == "single-cohort").sum())
-    mech = int((meta["EvidenceTier"] == "mechanistic-only").sum())
-    total = int(cohorts["SevereSamples"].sum() + cohorts["NonSevereSamples"].sum())
-    severe = int(cohorts["SevereSamples"].sum())
-    non_severe = int(cohorts["NonSevereSamples"].sum())
+    blocks = render_manuscript_blocks()
 
     doc = Document()
     set_margins(doc)
     set_base_style(doc)
 
-    title = doc.add_heading("", level=0)
-    run = title.add_run(TITLE)
-    run.bold = True
-    run.font.size = Pt(14)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    p = doc.add_paragraph()
-    p.add_run("Running Title: ").bold = True
-    p.add_run(RUNNING_TITLE)
-    doc.add_page_break()
-
-    doc.add_heading("ABSTRACT", level=1)
-    abstract_sections = [
-        ("Background:", "Kyasanur Forest Disease lacks disease-specific transcriptomic datasets and specific therapy, forcing host-directed therapeutic work to rely on proxy flaviviral data."),
-        ("Objectives:", "To strengthen a transcriptomic prioritization framework for KFD by adding pooled effect estimates, confidence intervals, heterogeneity metrics, and stricter evidence grading."),
-        ("Materials and Methods:", f"We reanalyzed three public dengue severity cohorts from GEO (GSE18090, GSE43777, GSE51808; {total} acute samples, {severe} severe and {non_severe} non-severe). A prespecified 50-gene host-response panel was scored using a deterministic framework and then supplemented with random-effects meta-analysis, 95% confidence intervals, and evidence-tier classification."),
-        ("Results:", f"The strongest transcriptomic evidence remained inflammatory. No gene reached a strict cross-cohort evidence tier; {single} genes had single-cohort nominal support and {mech} remained mechanistic-only. The highest meta-priority genes were CXCL10, IL6, STAT1, IFNB1, and TEK. Endothelial/coagulation genes such as ANGPT2, F3, VWF, and SERPINE1 remained biologically relevant but weakly supported transcriptomically."),
-        ("Conclusions:", "This framing separates transcriptomic evidence from mechanistic plausibility. Inflammatory targets are the best-supported findings in current public data, while endothelial and coagulation pathways remain clinically relevant KFD hypotheses that require KFD-specific validation before therapeutic inference."),
-    ]
-    for label, text in abstract_sections:
-        p = doc.add_paragraph()
-        p.add_run(label).bold = True
-        add_formatted_run(p, " " + text)
-    p = doc.add_paragraph()
-    p.add_run("Keywords: ").bold = True
-    p.add_run("Kyasanur Forest Disease; host-directed therapy; transcriptomics; meta-analysis; flavivirus; endothelial dysfunction; coagulation")
-    doc.add_page_break()
-
-    doc.add_heading("INTRODUCTION", level=1)
-    for text in [
-        "Kyasanur Forest Disease (KFD) is a tick-borne flaviviral hemorrhagic fever first recognized in Karnataka and remains an important clinical and public health problem in affected districts of southern India.[1-4] Patients can present with intense febrile illness, thrombocytopenia, bleeding manifestations, and in some cases neurological complications, yet no disease-specific antiviral treatment is available and vaccine protection remains incomplete in field conditions.[4,5]",
-        "This therapeutic gap makes host-directed therapy an attractive idea for KFD because the clinically important manifestations of severe disease are likely driven by host inflammatory, vascular, and hemostatic pathways rather than by viral replication alone.[6,7] At the same time, host-directed therapy studies are easy to overstate if biological plausibility is treated as equivalent to reproducible molecular evidence.",
-        "A major limitation in KFD research is the absence of publicly available KFD-specific blood transcriptomic datasets. We therefore used severe-versus-non-severe human dengue cohorts as a cross-flaviviral proxy because they provide the most accessible human transcriptomic data linked to severe disease, vascular leak, and hemorrhagic manifestations among related flaviviral infections.[8-11] This strategy is biologically reasonable for hypothesis generation, but it requires explicit caution because host responses vary across viruses, tissues, and stages of disease.",
-        "The aim of this study was not to claim a KFD-specific discovery signature. Instead, we evaluated a prespecified 50-gene host-response panel mapped to biologically relevant modules using Reactome-informed pathway categories and then added a random-effects meta-analytic layer to quantify pooled effect size, uncertainty, and heterogeneity.[12] The purpose was to distinguish transcriptomically supported priorities from clinically important mechanistic hypotheses and to present the resulting intervention shortlist with appropriate restraint.",
-    ]:
-        p = doc.add_paragraph()
-        add_formatted_run(p, text)
-
-    doc.add_heading("MATERIALS AND METHODS", level=1)
-    doc.add_heading("Data sources and cohort selection", level=2)
-    for text in [
-        f"Three public GEO datasets with acute human dengue samples and severe-versus-non-severe annotations were included: GSE18090, GSE43777, and GSE51808.[8-11] Together they contributed {total} acute samples, including {severe} severe and {non_severe} non-severe samples. Cohort composition is shown in Figure 1.",
-        "Only acute-phase samples were analyzed. We intentionally avoided pooled cross-platform normalization because the included cohorts differed in platform and specimen type. Instead, each dataset was processed within cohort, and only gene-level summary statistics were carried forward into the cross-cohort framework.",
-    ]:
-        p = doc.add_paragraph()
-        add_formatted_run(p, text)
-
-    doc.add_heading("Preprocessing and within-cohort analysis", level=2)
-    for text in [
-        "Series-matrix files and platform annotations were obtained from GEO.[8] Probe identifiers were mapped to gene symbols using platform annotation files, duplicate probes were collapsed conservatively to a single representative probe per gene, and expression values were log-transformed when required. This workflow was chosen to maximize transparency and reproducibility while minimizing additional modelling assumptions.",
-        "Within each cohort, severe and non-severe samples were compared at the gene level using two-sample statistical testing. For every prespecified gene, we retained the cohort-specific log2 fold-change, nominal P value, and false-discovery-rate adjusted P value. These cohort-specific results formed the basis of both the deterministic prioritization layer and the added meta-analysis.",
-    ]:
-        p = doc.add_paragraph()
-        add_formatted_run(p, text)
-
-    doc.add_heading("Prespecified host-response panel and deterministic prioritization", level=2)
-    for text in [
-        "The 50-gene panel was not treated as a de novo KFD discovery signature. Instead, it was defined as a mechanistic host-response panel spanning cytokine signaling, interferon biology, endothelial barrier regulation, coagulation and fibrinolysis, platelet activation, oxidative stress, and neurological or barrier-related pathways. Pathway grouping was anchored to Reactome-supported biological modules to improve biological consistency.[12]",
-        "We retained the deterministic prioritization framework from the earlier revision so that mechanistic and translational context would not be lost when the statistical layer was tightened. The deterministic score combined transcriptomic support, pathway relevance, disease-phase relevance, and tractability of host-directed modulation. Tractability was informed by the presence of plausible repurposing leads and by drug-discovery resources such as ChEMBL.[13]",
-    ]:
+    def title_block(doc: Document) -> None:
+        title = doc.add_heading("", level=0)
+        run = title.add_run(TITLE)
+        run.bold = True
+        run.font.size = Pt(14)
+        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
         p = doc.add_paragraph()
-        add_formatted_run(p, text)
-
-    doc.add_heading("Meta-analysis and evidence-tier assignment", level=2)
-    for text in [
-        "To strengthen statistical rigor, each panel gene was additionally evaluated using random-effects meta-analysis based on cohort-level effect sizes and approximated standard errors derived from log2 fold-changes and two-sided P values. For each gene we report pooled effect size, 95% confidence interval, pooled P value, and heterogeneity measured as I-squared.",
-        "Genes were classified into three evidence tiers. Cross-cohort support required more than one nominally supporting cohort together with a significant pooled effect. Single-cohort support required one nominally supporting cohort. Mechanistic-only denotes genes retained because of biological relevance but lacking recurrent nominal transcriptomic support. This framework was designed to separate molecular evidence from pathway plausibility rather than merge them into a single unsupported claim.",
-    ]:
-        p = doc.add_paragraph()
-        add_formatted_run(p, text)
-
-    doc.add_heading("RESULTS", level=1)
-    doc.add_heading("Cohort composition and analytic context", level=2)
-    for text in [
-        f"The three cohorts were heterogeneous in sample source, geography, and severe-case representation, but all contributed severe-versus-non-severe information. GSE18090 included 10 severe and 8 non-severe PBMC samples, GSE51808 included 10 severe and 18 non-severe whole-blood samples, and GSE43777 included 37 severe and 39 non-severe PBMC samples. Figure 1 shows that GSE43777 contributed the largest share of analyzed samples.",
-        "Nominal differential-expression burden varied substantially across cohorts, indicating that the proxy data are informative but not uniform. This variability supports the decision to carry forward gene-level summary statistics rather than directly pool expression matrices across studies.",
-    ]:
-        p = doc.add_paragraph()
-        add_formatted_run(p, text)
-
-    doc.add_heading("Evidence-tier distribution and top-ranked genes", level=2)
-    for text in [
-        f"No gene reached the strict cross-cohort tier. {single} genes met the single-cohort tier and {mech} remained mechanistic-only after pooled evaluation. This is the most important empirical result of the study: current public proxy data can support cautious prioritization, but they do not justify claims of a stable cross-flaviviral KFD-like consensus signature.",
-        "The highest-ranked genes by the combined meta-priority framework were CXCL10, IL6, STAT1, IFNB1, and TEK (Table 1; Figure 2). These genes cluster mainly within inflammatory and interferon-related biology. However, the confidence intervals for several top-ranked genes remained wide and heterogeneity was often moderate to high, which is why the manuscript treats them as evidence-supported priorities rather than validated biomarkers.",
-        "Table 1 therefore serves two purposes. It identifies the strongest current targets under the final framework, and it makes visible the uncertainty attached to each rank. The table should not be interpreted as a fixed disease signature but as a transparent ranking of candidates under limited-data conditions.",
-    ]:
-        p = doc.add_paragraph()
-        add_formatted_run(p, text)
-
-    doc.add_heading("Pathway-level findings", level=2)
-    for text in [
-        "At the pathway level, cytokine signaling had the highest mean deterministic score, followed by coagulation/fibrinolysis and endothelial barrier biology. Figure 3 places those pathway-level tendencies in the context of pooled effect size and heterogeneity, and Figure 4 shows the original composite ranking retained for comparison with the final meta-priority hierarchy.",
-        "This pathway-level view resolves an important interpretive issue. Inflammatory pathways carry the strongest transcriptomic signal in the available public data, whereas endothelial and hemostatic pathways remain prominent mainly because they are central to the known clinical pathophysiology of hemorrhagic disease and retain some degree of supporting signal, even if that signal is not sufficiently recurrent to support strong transcriptomic claims.",
-    ]:
-        p = doc.add_paragraph()
-        add_formatted_run(p, text)
-
-    doc.add_heading("Translationally relevant targets and intervention shortlist", level=2)
-    for text in [
-        "The translational subset is summarized in Table 2. IL6, TNF, IL1B, BDNF, and SERPINE1 retained single-cohort support under the final evidence framework, whereas ANGPT2, VWF, and F3 remained biologically important but fell into the mechanistic-only category. This pattern reinforces the central conclusion that mechanistic importance and transcriptomic recurrence are not interchangeable.",
-        "Table 3 presents the intervention shortlist as a hypothesis-generating output rather than a recommendation for use. The shortlist intentionally includes both supportive-care aligned strategies and exploratory host-directed candidates mapped to prioritized pathways. Interventions linked to inflammatory targets are currently better grounded in transcriptomic evidence, whereas endothelial and coagulation-directed options are retained because of disease plausibility and translational relevance rather than because the molecular evidence is already strong.",
-    ]:
-        p = doc.add_paragraph()
-        add_formatted_run(p, text)
-
-    top_meta = meta.head(12).copy()
-    p = doc.add_paragraph()
-    p.add_run("Table 1. Top 12 genes ranked by meta-priority.").bold = True
-    t1 = doc.add_table(rows=len(top_meta) + 1, cols=7)
-    t1.style = "Table Grid"
-    h1 = ["Meta rank", "Gene", "Evidence tier", "Support count", "Pooled effect", "95% CI", "I2"]
-    for i, h in enumerate(h1):
-        cell = t1.rows[0].cells[i]
-        cell.text = h
-        cell.paragraphs[0].runs[0].bold = True
-        set_cell_shading(cell, "D9E2F3")
-    for i, (_, row) in enumerate(top_meta.iterrows(), start=1):
-        vals = [
-            int(row["MetaRank"]), row["GeneSymbol"], row["EvidenceTier"], int(row["NominalSupportCount"]),
-            f"{row['RandomEffect']:.2f}", f"{row['Lower95CI']:.2f} to {row['Upper95CI']:.2f}", f"{row['I2']:.1f}"
-        ]
-        for j, v in enumerate(vals):
-            t1.rows[i].cells[j].text = str(v)
-
-    p = doc.add_paragraph()
-    p.add_run("Table 2. Translationally relevant targets with evidence tier and interpretation.").bold = True
-    t2 = doc.add_table(rows=len(transl) + 1, cols=7)
-    t2.style = "Table Grid"
-    h2 = ["Meta rank", "Gene", "Pathway", "Evidence tier", "Support", "Pooled effect", "Interpretation"]
-    for i, h in enumerate(h2):
-        cell = t2.rows[0].cells[i]
-        cell.text = h
-        cell.paragraphs[0].runs[0].bold = True
-        set_cell_shading(cell, "D9E2F3")
-    interp = {
-        "single-cohort": "Transcriptomic signal present but not recurrent",
-        "mechanistic-only": "Mechanistically plausible but weak transcriptomic support",
-        "cross-cohort": "Recurrent transcriptomic support",
-    }
-    for i, (_, row) in enumerate(transl.iterrows(), start=1):
-        vals = [
-            int(row["MetaRank"]), row["GeneSymbol"], row["Pathway"], row["EvidenceTier"],
-            int(row["NominalSupportCount"]), f"{row['RandomEffect']:.2f}", interp[row["EvidenceTier"]]
-        ]
-        for j, v in enumerate(vals):
-            t2.rows[i].cells[j].text = str(v)
-
-    shortlist = revision_drugs[revision_drugs["GeneSymbol"].isin(["IL1B", "IL6", "TNF", "ANGPT2", "SERPINE1", "HMOX1", "F3", "VWF"])].copy()
-    p = doc.add_paragraph()
-    p.add_run("Table 3. Hypothesis-generating intervention shortlist under the final evidence framework.").bold = True
-    t3 = doc.add_table(rows=len(shortlist) + 1, cols=5)
-    t3.style = "Table Grid"
-    h3 = ["Candidate", "Target", "Pathway", "Evidence tier", "Use in manuscript"]
-    tier_lookup = meta.set_index("GeneSymbol")["EvidenceTier"].to_dict()
-    for i, h in enumerate(h3):
-        cell = t3.rows[0].cells[i]
-        cell.text = h
-        cell.paragraphs[0].runs[0].bold = True
-        set_cell_shading(cell, "D9E2F3")
-    for i, (_, row) in enumerate(shortlist.iterrows(), start=1):
-        vals = [row["Candidate"], row["GeneSymbol"], row["Pathway"], tier_lookup.get(row["GeneSymbol"], "n/a"), "Hypothesis-generating only"]
-        for j, v in enumerate(vals):
-            t3.rows[i].cells[j].text = str(v)
-
-    figures = generate_final_submission_figures()
-    for path, caption in figures:
-        p = doc.add_paragraph()
-        p.add_run(caption).bold = True
-        doc.add_picture(str(path), width=Inches(5.7))
-        doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
+        p.add_run("Running Title: ").bold = True
+        p.add_run(RUNNING_TITLE)
+
+    def table_top_meta(doc: Document) -> None:
+        top_meta = meta.head(12)
+        add_dataframe_table(
+            doc,
+            top_meta.assign(
+                CI=[f"{lower:.2f} to {upper:.2f}" for lower, upper in zip(top_meta["Lower95CI"], top_meta["Upper95CI"])]
+            )[["MetaRank", "GeneSymbol", "EvidenceTier", "NominalSupportCount", "RandomEffect", "CI", "I2"]],
+            formatters={
+                "MetaRank": lambda v: str(int(v)),
+                "NominalSupportCount": lambda v: str(int(v)),
+                "RandomEffect": lambda v: f"{v:.2f}",
+                "I2": lambda v: f"{v:.1f}",
+            },
+            headers=["Meta rank", "Gene", "Evidence tier", "Support count", "Pooled effect", "95% CI", "I2"],
+        )
 
-    doc.add_heading("DISCUSSION", level=1)
-    for text in [
-        "The principal strength of this manuscript is that it separates transcriptomic support from mechanistic plausibility instead of blending them into a single overconfident ranking. Once pooled effects, confidence intervals, and heterogeneity are considered together, inflammatory and interferon-related genes emerge as the most defensible priorities in the available proxy data.",
-        "That does not make endothelial and coagulation biology unimportant. On the contrary, these pathways remain highly relevant to how severe KFD is understood clinically. What changes here is the level of certainty attached to them. ANGPT2, VWF, F3, and related genes are retained because they are mechanistically credible in hemorrhagic disease, but they are no longer described as though they were recurrent transcriptomic drivers in the current public datasets.[14-17]",
-        "This distinction matters for host-directed therapy research more broadly.[6,7] A pathway can be biologically attractive and clinically actionable in principle, yet still lack reproducible molecular support in currently available data. By making that boundary explicit, the manuscript becomes more reliable and more useful to readers who want to understand what is supported now and what still requires validation.",
-        "The intervention shortlist should therefore be read as a staged translational agenda. Supportive-care elements remain closest to current practice, while repurposing candidates such as atorvastatin, tranexamic acid, and N-acetylcysteine should be considered priorities for preclinical testing, biomarker-linked observational work, or carefully designed early clinical evaluation rather than routine use. For tranexamic acid in particular, the present rationale should be interpreted in the context of broader hemorrhage literature and not as direct efficacy evidence for KFD.[18]",
-        "The rural and forest-linked setting of KFD also remains relevant when considering translational usefulness. Any future intervention strategy has to be realistic for district-level care, delayed presentation, and healthcare-seeking patterns in endemic areas.[19] This practical dimension explains why low-cost interventions may still be worth discussing even when their supporting molecular evidence is weaker than that of inflammatory targets.",
-    ]:
-        p = doc.add_paragraph()
-        add_formatted_run(p, text)
+    def table_translational(doc: Document) -> None:
+        interp = {
+            "single-cohort": "Transcriptomic signal present but not recurrent",
+            "mechanistic-only": "Mechanistically plausible but weak transcriptomic support",
+            "cross-cohort": "Recurrent transcriptomic support",
+        }
+        add_dataframe_table(
+            doc,
+            transl.assign(Interpretation=transl["EvidenceTier"].map(interp))[
+                ["MetaRank", "GeneSymbol", "Pathway", "EvidenceTier", "NominalSupportCount", "RandomEffect", "Interpretation"]
+            ],
+            formatters={
+                "MetaRank": lambda v: str(int(v)),
+                "NominalSupportCount": lambda v: str(int(v)),
+                "RandomEffect": lambda v: f"{v:.2f}",
+            },
+            headers=["Meta rank", "Gene", "Pathway", "Evidence tier", "Support", "Pooled effect", "Interpretation"],
+        )
 
-    doc.add_heading("LIMITATIONS", level=2)
-    p = doc.add_paragraph()
-    add_formatted_run(
-        p,
-        "No KFD-specific transcriptomic data were available. The current evidence therefore depends on dengue proxy cohorts, blood-derived transcriptomes only, and approximate variance reconstruction for the random-effects meta-analysis. The data support prioritization under uncertainty, not therapeutic validation.",
-    )
+    def table_shortlist(doc: Document) -> None:
+        shortlist = revision_drugs[revision_drugs["GeneSymbol"].isin(["IL1B", "IL6", "TNF", "ANGPT2", "SERPINE1", "HMOX1", "F3", "VWF"])]
+        tier_lookup = meta.set_index("GeneSymbol")["EvidenceTier"].to_dict()
+        add_dataframe_table(
+            doc,
+            shortlist.assign(
+                Tier=[tier_lookup.get(gene, "n/a") for gene in shortlist["GeneSymbol"]],
+                Use="Hypothesis-generating only",
+            )[["Candidate", "GeneSymbol", "Pathway", "Tier", "Use"]],
+            headers=["Candidate", "Target", "Pathway", "Evidence tier", "Use in manuscript"],
+        )
 
-    doc.add_heading("CONCLUSIONS", level=1)
-    p = doc.add_paragraph()
-    add_formatted_run(
-        p,
-        "A transparent transcriptomic prioritization framework can still be useful for KFD despite the absence of disease-specific transcriptomic datasets, but only if the outputs are interpreted with strict caution. In the current public proxy data, inflammatory targets have the strongest molecular support, whereas endothelial and coagulation pathways remain clinically meaningful mechanistic hypotheses that require KFD-specific validation before therapeutic inference.",
+    def figures(doc: Document) -> None:
+        for path, caption in FINAL_FIGURES:
+            p = doc.add_paragraph()
+            p.add_run(caption).bold = True
+            doc.add_picture(str(path), width=Inches(5.7))
+            doc.paragraphs[-1].alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    def reference_list(doc: Document) -> None:
+        for idx, ref in enumerate(references(), start=1):
+            p = doc.add_paragraph()
+            p.add_run(f"{idx}. ").bold = True
+            p.add_run(ref)
+            p.paragraph_format.first_line_indent = Inches(-0.25)
+            p.paragraph_format.left_indent = Inches(0.25)
+
+    render_docx(
+        doc,
+        blocks,
+        hooks={
+            "title_block": title_block,
+            "table_top_meta": table_top_meta,
+            "table_translational": table_translational,
+            "table_shortlist": table_shortlist,
+            "figures": figures,
+            "references": reference_list,
+        },
+        write_text=add_formatted_run,
     )
 
-    doc.add_page_break()
-    doc.add_heading("REFERENCES", level=1)
-    for idx, ref in enumerate(references(), start=1):
-        p = doc.add_paragraph()
-        p.add_run(f"{idx}. ").bold = True
-        p.add_run(ref)
-        p.paragraph_format.first_line_indent = Inches(-0.25)
-        p.paragraph_format.left_indent = Inches(0.25)
-
     out = MANUSCRIPT_DIR / "Manuscript_KFD_MJDYPV_Final_Blinded.docx"
-    doc.save(out)
+    save_docx(doc, out)
     text = "\n".join(p.text for p in doc.paragraphs)
-    abstract_text = " ".join(f"{a} {b}" for a, b in abstract_sections)
+    abstract_text = " ".join(
+        f"{block.label} {block.text}" for block in section_blocks(blocks, "ABSTRACT") if block.label != "Keywords:"
+    )
     body_parts = []
     in_body = False
     for para in doc.paragraphs:
@@ -499,7 +426,7 @@ def build_title_page(total_words: int, abstract_words: int, body_words: int) ->
         p.add_run(f"{label}: ").bold = True
         p.add_run(value)
     out = MANUSCRIPT_DIR / "TitlePage_KFD_MJDYPV_Final.docx"
-    doc.save(out)
+    save_docx(doc, out)
     return out
 
 
@@ -525,7 +452,7 @@ def build_cover_letter() -> Path:
     doc.add_paragraph()
     doc.add_paragraph("Dr. Siddalingaiah H S")
     out = MANUSCRIPT_DIR / "CoverLetter_KFD_MJDYPV_Final.docx"
-    doc.save(out)
+    save_docx(doc, out)
     return out
 
 
@@ -565,19 +492,12 @@ def build_response_letter() -> Path:
     doc.add_paragraph(
         "All major and minor comments have been addressed. Manuscript locations below refer to paragraph numbers in the final blinded manuscript DOCX. Exact page and line numbers are not extracted reliably from DOCX files in this environment, so paragraph references are provided instead."
     )
-    table = doc.add_table(rows=len(rows) + 1, cols=3)
-    table.style = "Table Grid"
-    headers = ["Reviewer Comment", "Response", "Location in Final Blinded Manuscript"]
-    for i, h in enumerate(headers):
-        cell = table.rows[0].cells[i]
-        cell.text = h
-        cell.paragraphs[0].runs[0].bold = True
-        set_cell_shading(cell, "D9E2F3")
-    for i, row in enumerate(rows, start=1):
-        for j, value in enumerate(row):
-            table.rows[i].cells[j].text = value
+    add_dataframe_table(
+        doc,
+        pd.DataFrame(rows, columns=["Reviewer Comment", "Response", "Location in Final Blinded Manuscript"]),
+    )
     out = MANUSCRIPT_DIR / "Response_to_Reviewers_KFD_MJDYPV_Final.docx"
-    doc.save(out)
+    save_docx(doc, out)
     return out
 
 
@@ -600,21 +520,7 @@ def build_supplementary() -> Path:
 
     def add_df(title: str, df: pd.DataFrame) -> None:
         doc.add_heading(title, level=1)
-        table = doc.add_table(rows=len(df) + 1, cols=len(df.columns))
-        table.style = "Table Grid"
-        for i, col in enumerate(df.columns):
-            cell = table.rows[0].cells[i]
-            cell.text = str(col)
-            cell.paragraphs[0].runs[0].bold = True
-            set_cell_shading(cell, "D9E2F3")
-        for i, (_, row) in enumerate(df.iterrows(), start=1):
-            for j, col in enumerate(df.columns):
-                val = row[col]
-                if isinstance(val, float):
-                    txt = f"{val:.3f}"
-                else:
-                    txt = str(val)
-                table.rows[i].cells[j].text = txt
+        add_dataframe_table(doc, df, default_formatter=format_float3)
 
     meta_summary = meta[
         [
@@ -692,20 +598,186 @@ def build_supplementary() -> Path:
     add_df("Table S7. Original revision ranking retained for comparison", revision_targets[["Rank", "GeneSymbol", "Pathway", "CompositeScore", "DatasetsSupporting"]])
 
     out = MANUSCRIPT_DIR / "Supplementary_Materials_KFD_Final.docx"
-    doc.save(out)
+    save_docx(doc, out)
     return out
 
 
-def main() -> None:
-    generate_final_submission_figures()
-    manuscript, total_words, abstract_words, body_words = build_blinded_manuscript()
-    title = build_title_page(total_words, abstract_words, body_words)
-    cover = build_cover_letter()
-    response = build_response_letter()
-    supp = build_supplementary()
+def build_targets(word_counts: dict[str, int]) -> dict[str, BuildTarget]:
+    """Per-document dependency declarations for the incremental build."""
+    tables = {
+        "meta": V2_TABLES / "kfd_enhanced_v2_meta_targets.csv",
+        "transl": V2_TABLES / "kfd_enhanced_v2_translational_targets.csv",
+        "evidence": V2_TABLES / "kfd_enhanced_v2_evidence_summary.csv",
+        "cohorts": REV_TABLES / "cohort_summary.csv",
+        "drugs": REV_TABLES / "kfd_revision_drug_candidates.csv",
+        "revision_targets": REV_TABLES / "kfd_revision_targets.csv",
+    }
+    helpers = [Path(docx_tables.__file__), Path(manuscript_templates.__file__)]
+    style_code = source_digest(set_margins, set_base_style)
+    return {
+        "figures": BuildTarget(
+            name="figures",
+            outputs=[path for path, _ in FINAL_FIGURES],
+            inputs=[tables["cohorts"], tables["meta"], tables["revision_targets"]],
+            params={"code": source_digest(generate_final_submission_figures, prettify_pathway)},
+        ),
+        "manuscript": BuildTarget(
+            name="manuscript",
+            outputs=[MANUSCRIPT_DIR / "Manuscript_KFD_MJDYPV_Final_Blinded.docx"],
+            inputs=[
+                tables["meta"], tables["transl"], tables["cohorts"], tables["drugs"],
+                TEMPLATE_DIR / MANUSCRIPT_TEMPLATE,
+                *(path for path, _ in FINAL_FIGURES),
+                *helpers,
+            ],
+            params={
+                "code": source_digest(build_blinded_manuscript, manuscript_context, add_formatted_run, word_count),
+                "style": style_code,
+                "references": references(),
+                "title": [TITLE, RUNNING_TITLE],
+            },
+        ),
+        "title_page": BuildTarget(
+            name="title_page",
+            outputs=[MANUSCRIPT_DIR / "TitlePage_KFD_MJDYPV_Final.docx"],
+            params={
+                "code": source_digest(build_title_page),
+                "style": style_code,
+                "references": len(references()),
+                "title": [TITLE, RUNNING_TITLE],
+                "word_counts": word_counts,
+            },
+        ),
+        "cover_letter": BuildTarget(
+            name="cover_letter",
+            outputs=[MANUSCRIPT_DIR / "CoverLetter_KFD_MJDYPV_Final.docx"],
+            params={"code": source_digest(build_cover_letter), "style": style_code, "title": TITLE},
+        ),
+        "response_letter": BuildTarget(
+            name="response_letter",
+            outputs=[MANUSCRIPT_DIR / "Response_to_Reviewers_KFD_MJDYPV_Final.docx"],
+            inputs=helpers[:1],
+            params={"code": source_digest(build_response_letter), "style": style_code, "title": TITLE},
+        ),
+        "supplementary": BuildTarget(
+            name="supplementary",
+            outputs=[MANUSCRIPT_DIR / "Supplementary_Materials_KFD_Final.docx"],
+            inputs=[
+                tables["meta"], tables["transl"], tables["evidence"], tables["cohorts"], tables["revision_targets"],
+                helpers[0],
+            ],
+            params={"code": source_digest(build_supplementary, prettify_pathway), "style": style_code, "title": TITLE},
+        ),
+    }
+
+
+def build_manuscript_with_counts() -> dict[str, int]:
+    _, total_words, abstract_words, body_words = build_blinded_manuscript()
+    return {"total_words": total_words, "abstract_words": abstract_words, "body_words": body_words}
+
+
+# (name, builder, dependencies). Each builder receives the merged metadata of its
+# dependencies as keyword arguments; the title page needs the manuscript word counts.
+BUILD_STAGES = [
+    ("figures", generate_final_submission_figures, ()),
+    ("manuscript", build_manuscript_with_counts, ("figures",)),
+    ("title_page", build_title_page, ("manuscript",)),
+    ("cover_letter", build_cover_letter, ()),
+    ("response_letter", build_response_letter, ()),
+    ("supplementary", build_supplementary, ()),
+]
+
+
+class _InlineExecutor:
+    """Executor stand-in that runs tasks immediately, used for ``--jobs 1``."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def __enter__(self) -> "_InlineExecutor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+def _traced_build(name: str, profile: list[str], builder, **kwargs) -> tuple[object, list[Span]]:
+    # Worker processes started with "spawn" do not inherit the parent's profiling settings.
+    enable_profiling(profile)
+    with TRACER.capture() as spans, span(name):
+        result = builder(**kwargs)
+    return result, spans
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--force", action="store_true", help="rebuild every document even if its inputs are unchanged")
+    parser.add_argument("--jobs", type=int, default=1, help="build independent documents concurrently in N processes")
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    enable_profiling(args.profile)
+
+    manifest = BuildManifest(STATE_DIR / "mjdypv_v3_submission.json")
+    run = start_run("mjdypv_v3_submission", parameters={"force": args.force, "jobs": args.jobs})
+    builders = {name: builder for name, builder, _ in BUILD_STAGES}
+    pending = {name: deps for name, _, deps in BUILD_STAGES}
+    metadata: dict[str, dict] = {}
+    built: list[str] = []
+    targets = build_targets(word_counts={})
+
+    with span("submission_package"):
+        executor = ProcessPoolExecutor(max_workers=args.jobs) if args.jobs > 1 else _InlineExecutor()
+        with executor:
+            running: dict[Future, BuildTarget] = {}
+            while pending or running:
+                ready = [name for name, deps in pending.items() if all(dep in metadata for dep in deps)]
+                for name in ready:
+                    kwargs = {key: value for dep in pending.pop(name) for key, value in metadata[dep].items()}
+                    target = build_targets(word_counts=kwargs)[name] if kwargs else targets[name]
+                    if not args.force and manifest.is_current(target):
+                        metadata[name] = manifest.metadata(name)
+                        continue
+                    running[executor.submit(_traced_build, name, args.profile, builders[name], **kwargs)] = target
+                if ready and not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    target = running.pop(future)
+                    result, spans = future.result()
+                    # Spans from worker processes are merged here; inline builds already recorded theirs.
+                    for record in spans:
+                        if record.pid != os.getpid():
+                            TRACER.add(record)
+                    built.append(target.name)
+                    metadata[target.name] = result if isinstance(result, dict) else {}
+                    manifest.record(target, metadata[target.name])
+    manifest.save()
+
+    upstream = {V2_TABLES: "enhance_kfd_revision_v2", V2_FIGS: "enhance_kfd_revision_v2", REV_TABLES: "rebuild_kfd_revision"}
+    for name, _, _ in BUILD_STAGES:
+        run.record_cache(name not in built)
+        for path in targets[name].inputs:
+            run.record_input(path, upstream=upstream.get(path.parent))
+        for path in targets[name].outputs:
+            run.record_output(path)
+    run.parameters["built"] = built
+    manifest_path = run.write()
+
     print("Generated final submission package:")
-    for file in [manuscript, title, cover, response, supp]:
-        print(f" - {file.name}")
+    for name, _, _ in BUILD_STAGES:
+        if name in built:
+            for path in targets[name].outputs:
+                print(f" - {path.name}")
+    skipped = [name for name, _, _ in BUILD_STAGES if name not in built]
+    if skipped:
+        print(f"Up to date (skipped): {', '.join(skipped)}")
+    report("mjdypv_v3_submission")
+    print(f"Run manifest written to {manifest_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,310 @@
+"""Lightweight per-stage timing and memory instrumentation.
+
+Stages report into a process-wide tracer either as a context manager::
+
+    with span("GSE18090") as stage:
+        ...
+        stage.rows = len(gene_matrix)
+
+or as a decorator (``@traced()``), which also picks up row counts from
+DataFrame/Series results. Spans nest, so a download inside a parse shows up
+under it. Each span records wall time, CPU time, the process peak RSS at span
+exit and an optional row count. ``report(run_name)`` writes the spans as a
+JSON trace to ``outputs/traces`` and prints a summary table.
+
+Entry points expose ``--profile STAGE`` (see ``add_profile_argument``): the
+named span runs under cProfile, and its ``.prof`` file plus a collapsed-stack
+file (``frame;frame;frame microseconds``, readable by flamegraph.pl and
+speedscope) are written to ``outputs/profiles``, with the top hotspots printed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+TRACE_DIR = BASE_DIR / "outputs" / "traces"
+PROFILE_DIR = BASE_DIR / "outputs" / "profiles"
+HOTSPOTS = 15
+
+
+def peak_rss_mib() -> float | None:
+    """Peak resident set size of this process so far, in MiB (``None`` where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+@dataclass
+class Span:
+    name: str
+    path: str
+    depth: int
+    started_at: float = 0.0
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss_mib: float | None = None
+    rows: int | None = None
+    error: str | None = None
+    pid: int = 0
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._stack: list[str] = []
+        self.profile_stages: set[str] = set()
+        self.profile_dir = PROFILE_DIR
+        self._profiling = False
+
+    def reset(self) -> None:
+        self.spans.clear()
+        self._stack.clear()
+
+    @contextmanager
+    def span(self, name: str, rows: int | None = None) -> Iterator[Span]:
+        record = Span(
+            name=name,
+            path="/".join([*self._stack, name]),
+            depth=len(self._stack),
+            rows=rows,
+            pid=os.getpid(),
+        )
+        profiler = None
+        if not self._profiling and (name in self.profile_stages or record.path in self.profile_stages):
+            profiler = cProfile.Profile()
+            self._profiling = True
+        self._stack.append(name)
+        record.started_at = time.time()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        except BaseException as exc:
+            record.error = type(exc).__name__
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record.wall_s = time.perf_counter() - start_wall
+            record.cpu_s = time.process_time() - start_cpu
+            record.peak_rss_mib = peak_rss_mib()
+            self._stack.pop()
+            self.spans.append(record)
+            if profiler is not None:
+                self._profiling = False
+                write_profile(profiler, record.path, self.profile_dir)
+
+    @contextmanager
+    def capture(self) -> Iterator[list[Span]]:
+        """Collect copies of the spans finished inside the block, with paths relative to the current stack.
+
+        Used to ship spans recorded in a worker process back to the parent's tracer.
+        """
+        captured: list[Span] = []
+        first = len(self.spans)
+        depth = len(self._stack)
+        try:
+            yield captured
+        finally:
+            for record in self.spans[first:]:
+                parts = record.path.split("/")[depth:]
+                captured.append(replace(record, path="/".join(parts), depth=record.depth - depth))
+
+    def add(self, record: Span) -> None:
+        """Adopt a span recorded elsewhere (e.g. in a worker process) under the current stack."""
+        prefix = "/".join(self._stack)
+        record.path = f"{prefix}/{record.path}" if prefix else record.path
+        record.depth += len(self._stack)
+        self.spans.append(record)
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Aggregate spans by path, listed as a tree with siblings in the order they first started."""
+        rows: dict[str, dict[str, Any]] = {}
+        first_start: dict[str, float] = {}
+        for record in sorted(self.spans, key=lambda item: item.started_at):
+            first_start.setdefault(record.path, record.started_at)
+            row = rows.setdefault(
+                record.path,
+                {"path": record.path, "name": record.name, "depth": record.depth, "calls": 0,
+                 "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mib": None, "rows": None},
+            )
+            row["calls"] += 1
+            row["wall_s"] += record.wall_s
+            row["cpu_s"] += record.cpu_s
+            if record.peak_rss_mib is not None:
+                row["peak_rss_mib"] = max(row["peak_rss_mib"] or 0.0, record.peak_rss_mib)
+            if record.rows is not None:
+                row["rows"] = (row["rows"] or 0) + record.rows
+
+        def tree_key(path: str) -> tuple[float, ...]:
+            parts = path.split("/")
+            prefixes = ["/".join(parts[: index + 1]) for index in range(len(parts))]
+            return tuple(first_start.get(prefix, first_start[path]) for prefix in prefixes)
+
+        return sorted(rows.values(), key=lambda row: tree_key(row["path"]))
+
+    def format_summary(self) -> str:
+        lines = [f"{'Stage':<44}{'Calls':>6}{'Wall s':>9}{'CPU s':>9}{'Peak MiB':>10}{'Rows':>10}"]
+        for row in self.summary():
+            label = ("  " * row["depth"] + row["name"])[:43]
+            rss = "-" if row["peak_rss_mib"] is None else f"{row['peak_rss_mib']:.0f}"
+            rows = "-" if row["rows"] is None else str(row["rows"])
+            lines.append(f"{label:<44}{row['calls']:>6}{row['wall_s']:>9.2f}{row['cpu_s']:>9.2f}{rss:>10}{rows:>10}")
+        return "\n".join(lines)
+
+    def write(self, run_name: str, trace_dir: Path | None = None) -> Path:
+        trace_dir = trace_dir or TRACE_DIR
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc)
+        path = trace_dir / f"{run_name}_{stamp:%Y%m%dT%H%M%S}.json"
+        payload = {
+            "run": run_name,
+            "timestamp": stamp.isoformat(timespec="seconds"),
+            "argv": sys.argv,
+            "spans": [asdict(record) for record in sorted(self.spans, key=lambda item: item.started_at)],
+            "summary": self.summary(),
+        }
+        path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        return path
+
+
+TRACER = Tracer()
+
+
+def span(name: str, rows: int | None = None):
+    return TRACER.span(name, rows)
+
+
+def _result_rows(result: Any) -> int | None:
+    shape = getattr(result, "shape", None)
+    return int(shape[0]) if shape else None
+
+
+def traced(name: str | None = None, rows: Callable[[Any], int | None] = _result_rows):
+    """Decorator recording each call as a span named ``name`` (default: the function name)."""
+
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(label) as record:
+                result = func(*args, **kwargs)
+                record.rows = rows(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def collapsed_stacks(stats: pstats.Stats) -> list[str]:
+    """Fold a cProfile call graph into ``root;...;leaf microseconds`` lines.
+
+    cProfile keeps caller->callee edges rather than full stacks, so each
+    function's own time is split across its callers in proportion to the time
+    spent under each call edge, walking down from the functions nobody called.
+    """
+    entries = stats.stats  # func -> (primitive calls, calls, tottime, cumtime, callers)
+    callees: dict[tuple, dict[tuple, float]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+
+    def label(func: tuple) -> str:
+        filename, line, name = func
+        return f"{name} ({Path(filename).name}:{line})" if line else name
+
+    folded: dict[str, float] = {}
+
+    def walk(func: tuple, stack: list[str], share: float, seen: frozenset) -> None:
+        _, _, tottime, cumtime, _ = entries[func]
+        frames = [*stack, label(func)]
+        own = tottime * share
+        if own > 0:
+            key = ";".join(frames)
+            folded[key] = folded.get(key, 0.0) + own
+        if cumtime <= 0:
+            return
+        for child, edge_cumtime in callees.get(func, {}).items():
+            # Skip cycles and sub-10us branches; the graph can fan out combinatorially.
+            if child in seen or child not in entries or share * edge_cumtime < 1e-5:
+                continue
+            child_cumtime = entries[child][3]
+            if child_cumtime > 0:
+                walk(child, frames, share * edge_cumtime / child_cumtime, seen | {child})
+
+    roots = [func for func, (_, _, _, _, callers) in entries.items() if not callers]
+    for root in roots:
+        walk(root, [], 1.0, frozenset({root}))
+    return [f"{stack} {round(seconds * 1e6)}" for stack, seconds in sorted(folded.items()) if seconds * 1e6 >= 1]
+
+
+def write_profile(profiler: cProfile.Profile, stage: str, profile_dir: Path = PROFILE_DIR) -> Path:
+    """Write ``<stage>_<timestamp>.prof`` and ``.collapsed`` files and print the top hotspots."""
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"{stage.replace('/', '__')}_{datetime.now(timezone.utc):%Y%m%dT%H%M%S}"
+    prof_path = profile_dir / f"{stem}.prof"
+    profiler.dump_stats(prof_path)
+
+    stats = pstats.Stats(profiler)
+    (profile_dir / f"{stem}.collapsed").write_text("\n".join(collapsed_stacks(stats)) + "\n", encoding="utf-8")
+
+    buffer = io.StringIO()
+    pstats.Stats(profiler, stream=buffer).strip_dirs().sort_stats("tottime").print_stats(HOTSPOTS)
+    print(f"\nProfile of stage '{stage}' (top {HOTSPOTS} by own time):")
+    print(buffer.getvalue().split("\n\n", 1)[-1].rstrip())
+    print(f"Profile written to {prof_path} (+ .collapsed)")
+    return prof_path
+
+
+def add_profile_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        action="append",
+        default=[],
+        metavar="STAGE",
+        help="run the named stage (span name or path, e.g. differential_expression) under cProfile; repeatable",
+    )
+
+
+def enable_profiling(stages: list[str], profile_dir: Path | None = None) -> None:
+    TRACER.profile_stages.update(stages)
+    TRACER.profile_dir = profile_dir or PROFILE_DIR
+
+
+def report(run_name: str, trace_dir: Path | None = None) -> Path:
+    """Write the JSON trace for this run and print the stage summary table."""
+    path = TRACER.write(run_name, trace_dir)
+    print()
+    print(TRACER.format_summary())
+    print(f"Trace written to {path}")
+    ran = {name for record in TRACER.spans for name in (record.name, record.path)}
+    missing = sorted(TRACER.profile_stages - ran)
+    if missing:
+        print(f"No stage matched --profile {', '.join(missing)}; stages: {', '.join(row['path'] for row in TRACER.summary())}")
+    return path
@@ -0,0 +1,280 @@
+"""Typed, validated access to ``config/kfd_config.yaml``.
+
+The YAML file is the single source of truth for pathway definitions, weights
+and thresholds. Pathways are defined once, in the top-level ``pathways:``
+block; the pipeline's per-label pathway weights and the revision's label
+aliases are both read from each pathway's ``labels``. ``load_config`` parses
+the file into frozen dataclasses and reports every problem it finds in one
+``ConfigError`` rather than failing on first use deep inside a stage. Each
+section has a fingerprint (SHA-256 of its canonical JSON form, together with
+the shared ``pathways:`` block) that stages put in their build parameters, so
+changing a weight reruns only the stages that read it.
+
+Set ``KFD_CONFIG`` or pass ``--config`` to an entry point to use another file.
+
+    python scripts/kfd_config.py                   # validate and print fingerprints
+    python scripts/kfd_config.py sweeps/omics.yaml
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Mapping
+
+import yaml
+
+from build_cache import value_digest
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CONFIG_PATH = Path(os.environ.get("KFD_CONFIG", BASE_DIR / "config" / "kfd_config.yaml"))
+
+PIPELINE_WEIGHTS = ("pubmed", "pathway", "druggability", "phase", "noise")
+REVISION_WEIGHTS = ("omics", "tractability", "pathway", "phase")
+SHARED_SECTIONS = ("pathways",)
+
+
+class ConfigError(ValueError):
+    """Raised with every validation problem found in a configuration file."""
+
+
+@dataclass(frozen=True)
+class PathwayDefinition:
+    name: str
+    score: float
+    phase: str
+    reactome: str
+    genes: frozenset[str]
+    labels: dict[str, float]
+
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    """Composite scoring for ``run_pipeline.py``."""
+
+    pathway_weights: dict[str, float]
+    phase_weights: dict[str, float]
+    druggability: dict[str, float]
+    composite_weights: dict[str, float]
+    noise_range: tuple[float, float]
+    key_targets: tuple[str, ...]
+    key_target_bonus: float
+
+
+@dataclass(frozen=True)
+class RevisionConfig:
+    """Thresholds, weights and pathway definitions for the revision analysis."""
+
+    deg_pvalue: float
+    deg_abs_log2fc: float
+    recurrence_weight: float
+    effect_weight: float
+    effect_saturation: float
+    composite_weights: dict[str, float]
+    sensitivity_schemes: dict[str, dict[str, float]]
+    default_pathway_score: float
+    default_phase_score: float
+    phase_scores: dict[str, float]
+    druggability_scores: dict[str, float]
+    pathway_aliases: dict[str, str]
+    pathways: dict[str, PathwayDefinition]
+
+    def pathway_definitions(self) -> dict[str, dict[str, Any]]:
+        """Pathways in the ``{name: {"score", "phase", "reactome", "genes"}}`` form used by the rebuild."""
+        return {
+            name: {"score": info.score, "phase": info.phase, "reactome": info.reactome, "genes": set(info.genes)}
+            for name, info in self.pathways.items()
+        }
+
+
+@dataclass(frozen=True)
+class KFDConfig:
+    path: Path
+    raw: dict[str, Any]
+    pipeline: PipelineConfig
+    revision: RevisionConfig
+
+    def fingerprint(self, *sections: str) -> str:
+        """Digest of the named top-level sections and the shared pathway block (default: the whole file)."""
+        if not sections:
+            return value_digest(self.raw)
+        return value_digest({section: self.raw.get(section) for section in sorted({*sections, *SHARED_SECTIONS})})
+
+
+class _Validator:
+    """Collects problems while reading values, so one error lists all of them."""
+
+    def __init__(self) -> None:
+        self.errors: list[str] = []
+
+    def section(self, data: Any, key: str) -> dict[str, Any]:
+        value = data.get(key) if isinstance(data, Mapping) else None
+        if not isinstance(value, Mapping):
+            self.errors.append(f"{key}: expected a mapping")
+            return {}
+        return dict(value)
+
+    def number(self, data: Mapping, key: str, where: str, low: float = 0.0, high: float = math.inf) -> float:
+        value = data.get(key)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+            self.errors.append(f"{where}.{key}: expected a number in [{low:g}, {high:g}], got {value!r}")
+            return math.nan
+        return float(value)
+
+    def numbers(self, data: Mapping, key: str, where: str) -> dict[str, float]:
+        section = data.get(key)
+        if not isinstance(section, Mapping) or not section:
+            self.errors.append(f"{where}.{key}: expected a non-empty mapping of numbers")
+            return {}
+        return {str(name): self.number(section, name, f"{where}.{key}") for name in section}
+
+    def weights(self, data: Mapping, key: str, where: str, names: tuple[str, ...]) -> dict[str, float]:
+        weights = self.numbers(data, key, where)
+        if weights and set(weights) != set(names):
+            self.errors.append(f"{where}.{key}: expected exactly {', '.join(names)}; got {', '.join(weights)}")
+        elif weights and not math.isclose(sum(weights.values()), 1.0, abs_tol=1e-6):
+            self.errors.append(f"{where}.{key}: weights sum to {sum(weights.values()):g}, expected 1")
+        return weights
+
+    def strings(self, data: Mapping, key: str, where: str) -> tuple[str, ...]:
+        values = data.get(key)
+        if not isinstance(values, list) or not values or not all(isinstance(value, str) and value for value in values):
+            self.errors.append(f"{where}.{key}: expected a non-empty list of strings")
+            return ()
+        return tuple(values)
+
+
+def _pathways(check: _Validator, raw: Mapping, phase_scores: Mapping[str, float]) -> dict[str, PathwayDefinition]:
+    pathways: dict[str, PathwayDefinition] = {}
+    pathways_raw = raw.get("pathways")
+    if not isinstance(pathways_raw, Mapping) or not pathways_raw:
+        check.errors.append("pathways: expected a non-empty mapping")
+        pathways_raw = {}
+    owners: dict[str, str] = {}
+    for name, info in pathways_raw.items():
+        where = f"pathways.{name}"
+        if not isinstance(info, Mapping):
+            check.errors.append(f"{where}: expected a mapping")
+            continue
+        phase = info.get("phase")
+        if phase_scores and phase not in phase_scores:
+            check.errors.append(f"{where}.phase: {phase!r} is not one of revision.phase_scores")
+        labels = check.numbers(info, "labels", where) if "labels" in info else {}
+        for label in labels:
+            if label in owners:
+                check.errors.append(f"{where}.labels.{label}: already a label of {owners[label]}")
+            owners.setdefault(label, str(name))
+        pathways[str(name)] = PathwayDefinition(
+            name=str(name),
+            score=check.number(info, "score", where, 0.0, 1.0),
+            phase=str(phase),
+            reactome=str(info.get("reactome", "")),
+            genes=frozenset(check.strings(info, "genes", where)),
+            labels=labels,
+        )
+    return pathways
+
+
+def _pipeline(check: _Validator, raw: Mapping, pathways: Mapping[str, PathwayDefinition]) -> PipelineConfig:
+    data = check.section(raw, "pipeline")
+    noise = data.get("noise_range")
+    if not (isinstance(noise, list) and len(noise) == 2 and all(isinstance(v, (int, float)) for v in noise) and noise[0] <= noise[1]):
+        check.errors.append(f"pipeline.noise_range: expected [low, high], got {noise!r}")
+        noise = [math.nan, math.nan]
+    return PipelineConfig(
+        pathway_weights={label: weight for info in pathways.values() for label, weight in info.labels.items()},
+        phase_weights=check.numbers(data, "phase_weights", "pipeline"),
+        druggability=check.numbers(data, "druggability", "pipeline"),
+        composite_weights=check.weights(data, "composite_weights", "pipeline", PIPELINE_WEIGHTS),
+        noise_range=(float(noise[0]), float(noise[1])),
+        key_targets=check.strings(data, "key_targets", "pipeline"),
+        key_target_bonus=check.number(data, "key_target_bonus", "pipeline", 0.0, 1.0),
+    )
+
+
+def _revision(check: _Validator, raw: Mapping) -> RevisionConfig:
+    data = check.section(raw, "revision")
+    deg = check.section(data, "deg") if data else {}
+    omics = check.section(data, "omics") if data else {}
+    defaults = check.section(data, "defaults") if data else {}
+    phase_scores = check.numbers(data, "phase_scores", "revision")
+
+    schemes_raw = data.get("sensitivity_schemes") or {}
+    if not isinstance(schemes_raw, Mapping):
+        check.errors.append("revision.sensitivity_schemes: expected a mapping")
+        schemes_raw = {}
+    schemes = {
+        str(name): check.weights(schemes_raw, name, "revision.sensitivity_schemes", REVISION_WEIGHTS)
+        for name in schemes_raw
+    }
+
+    pathways = _pathways(check, raw, phase_scores)
+
+    return RevisionConfig(
+        deg_pvalue=check.number(deg, "pvalue", "revision.deg", 0.0, 1.0),
+        deg_abs_log2fc=check.number(deg, "abs_log2fc", "revision.deg"),
+        recurrence_weight=check.number(omics, "recurrence_weight", "revision.omics", 0.0, 1.0),
+        effect_weight=check.number(omics, "effect_weight", "revision.omics", 0.0, 1.0),
+        effect_saturation=check.number(omics, "effect_saturation", "revision.omics", 1e-9),
+        composite_weights=check.weights(data, "composite_weights", "revision", REVISION_WEIGHTS),
+        sensitivity_schemes=schemes,
+        default_pathway_score=check.number(defaults, "pathway_score", "revision.defaults", 0.0, 1.0),
+        default_phase_score=check.number(defaults, "phase_score", "revision.defaults", 0.0, 1.0),
+        phase_scores=phase_scores,
+        druggability_scores=check.numbers(data, "druggability_scores", "revision"),
+        pathway_aliases={label: name for name, info in pathways.items() for label in info.labels},
+        pathways=pathways,
+    )
+
+
+def parse_config(raw: Any, path: Path = CONFIG_PATH) -> KFDConfig:
+    """Validate an already-parsed YAML document."""
+    check = _Validator()
+    if not isinstance(raw, Mapping):
+        raise ConfigError(f"{path}: expected a YAML mapping at the top level")
+    revision = _revision(check, raw)
+    pipeline = _pipeline(check, raw, revision.pathways)
+    omics_total = revision.recurrence_weight + revision.effect_weight
+    if not math.isnan(omics_total) and not math.isclose(omics_total, 1.0, abs_tol=1e-6):
+        check.errors.append(f"revision.omics: recurrence_weight + effect_weight is {omics_total:g}, expected 1")
+    if check.errors:
+        raise ConfigError(f"Invalid configuration {path}:\n" + "\n".join(f"  - {error}" for error in check.errors))
+    return KFDConfig(path=Path(path), raw=dict(raw), pipeline=pipeline, revision=revision)
+
+
+def load_config(path: Path | None = None) -> KFDConfig:
+    path = Path(path or CONFIG_PATH)
+    try:
+        raw = yaml.safe_load(path.read_text(encoding="utf-8"))
+    except (OSError, yaml.YAMLError) as error:
+        raise ConfigError(f"Could not read configuration {path}: {error}") from error
+    return parse_config(raw, path)
+
+
+def add_config_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--config", type=Path, default=None, help=f"pipeline configuration (default: {CONFIG_PATH})")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("config", nargs="?", type=Path, default=None, help="configuration file to validate")
+    args = parser.parse_args(argv)
+    try:
+        config = load_config(args.config)
+    except ConfigError as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(f"{config.path}: valid")
+    print(f"  fingerprint  {config.fingerprint()[:16]}")
+    for section in ("pipeline", "revision"):
+        print(f"  {section:<12} {config.fingerprint(section)[:16]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""Leave-one-cohort-out robustness of the target ranking and the v2 meta-analysis.
+
+With three discovery cohorts, a gene's rank or evidence tier can hinge on a
+single cohort. This stage drops each cohort in turn and re-derives both
+``build_target_table``'s composite score and rank and the v2 meta-analysis
+(DerSimonian-Laird pooling, evidence tier and ``MetaRank``) for every panel
+gene. The full analysis and all K exclusions come from one set of genes x
+cohorts arrays read from the cached DEG tables: each scenario is a row of a
+``(scenarios, cohorts)`` inclusion mask broadcast against the log2FC, p-value
+and SE arrays, so nothing is re-downloaded and no DE is rerun.
+
+Under an exclusion, recurrence and nominal support are scaled by the number of
+cohorts kept, as the full analysis scales them by all cohorts.
+
+    python scripts/leave_one_cohort_out.py
+    python scripts/leave_one_cohort_out.py --top 20
+
+Writes ``loco_targets.csv`` and ``loco_meta.csv`` (one row per gene, one
+column group per scenario) and ``loco_summary.csv`` (per exclusion: Spearman
+rho and top-k overlap with the full ranking, tier changes) to
+``outputs/leave_one_out/``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import warnings
+from pathlib import Path
+from typing import Mapping
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from build_cache import source_digest
+import enhance_kfd_revision_v2 as enhance
+from instrumentation import add_profile_argument, enable_profiling, report, span, traced
+from kfd_config import REVISION_WEIGHTS, add_config_argument, load_config
+import rebuild_kfd_revision as rebuild
+from results_db import publish_run
+from run_manifest import start_run
+from scoring_sweep import REV_TABLES, TOP_K, composite_scores, evidence_arrays, load_deg_tables, rank_columns
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+LOCO_DIR = BASE_DIR / "outputs" / "leave_one_out"
+FULL = "all"
+
+
+def scenarios(cohorts: list[str]) -> tuple[list[str], np.ndarray]:
+    """Scenario labels and the ``(scenarios, cohorts)`` inclusion mask: all cohorts, then each one dropped."""
+    include = np.ones((len(cohorts) + 1, len(cohorts)), dtype=bool)
+    include[np.arange(1, len(cohorts) + 1), np.arange(len(cohorts))] = False
+    return [FULL, *(f"without_{cohort}" for cohort in cohorts)], include
+
+
+@traced(rows=lambda result: result[0].shape[0])
+def target_scores(
+    panel: pd.DataFrame, deg_tables: Mapping[str, pd.DataFrame], include: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """``build_target_table`` composite scores and supporting-cohort counts, both ``(genes, scenarios)``."""
+    revision = rebuild.CONFIG.revision
+    evidence = evidence_arrays(panel, deg_tables)
+    arrays = enhance.study_arrays(deg_tables, panel["GeneSymbol"])
+    log2fc, pvalue = arrays["log2fc"][:, np.newaxis, :], arrays["pvalue"][:, np.newaxis, :]
+    observed = ~np.isnan(log2fc) & include[np.newaxis]
+    any_observed = observed.any(axis=2)
+
+    kept = np.where(observed, log2fc, np.nan)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore"):
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        median_fc = np.where(any_observed, np.nanmedian(kept, axis=2), 0.0)
+        median_abs = np.where(any_observed, np.nanmedian(np.abs(kept), axis=2), 0.0)
+    concordant = observed & ((log2fc >= 0) == (median_fc >= 0)[:, :, np.newaxis])
+    supporting = concordant & (pvalue <= revision.deg_pvalue) & (np.abs(log2fc) >= revision.deg_abs_log2fc)
+
+    recurrence = supporting.sum(axis=2) / include.sum(axis=1)
+    effect = np.minimum(median_abs / revision.effect_saturation, 1.0)
+    omics = revision.recurrence_weight * recurrence + revision.effect_weight * effect
+    weights = np.tile([revision.composite_weights[name] for name in REVISION_WEIGHTS], (len(include), 1))
+    return composite_scores(evidence, omics, weights), supporting.sum(axis=2)
+
+
+@traced(rows=lambda result: result["EvidenceTier"].shape[1])
+def meta_evidence(panel: pd.DataFrame, deg_tables: Mapping[str, pd.DataFrame], include: np.ndarray) -> dict[str, np.ndarray]:
+    """v2 meta-analysis columns and ``MetaRank`` per gene and scenario, each ``(scenarios, genes)``.
+
+    All scenarios are pooled in a single ``pooled_evidence`` call over the
+    ``(scenarios * genes, cohorts)`` arrays with excluded cohorts masked out.
+    """
+    arrays = enhance.study_arrays(deg_tables, panel["GeneSymbol"])
+    n_scenarios, n_genes = len(include), len(panel)
+    stacked = {name: np.tile(values, (n_scenarios, 1)) for name, values in arrays.items()}
+    stacked["present"] = stacked["present"] & np.repeat(include, n_genes, axis=0)
+    evidence = {name: np.asarray(values).reshape(n_scenarios, n_genes) for name, values in enhance.pooled_evidence(stacked).items()}
+
+    priority = enhance.meta_priority(
+        evidence["NominalSupportCount"], np.abs(evidence["RandomEffect"]), evidence["I2"], include.sum(axis=1)[:, np.newaxis]
+    )
+    tier_code = np.vectorize(enhance.TIER_ORDER.get)(evidence["EvidenceTier"])
+    # Same order as build_meta_table: tier, then priority descending, then pooled p; ties keep panel order.
+    order = np.lexsort((evidence["PooledPValue"], -priority, tier_code), axis=-1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, n_genes + 1)[np.newaxis, :], axis=-1)
+    return {**evidence, "MetaPriority": priority, "MetaRank": ranks}
+
+
+def _wide(panel: pd.DataFrame, labels: list[str], columns: Mapping[str, np.ndarray]) -> pd.DataFrame:
+    """One row per gene; ``columns`` are ``(genes, scenarios)`` arrays, suffixed per exclusion."""
+    table = panel[["GeneSymbol", "Pathway"]].reset_index(drop=True)
+    for index, label in enumerate(labels):
+        suffix = "" if label == FULL else f"_{label}"
+        for name, values in columns.items():
+            table[f"{name}{suffix}"] = values[:, index]
+    return table
+
+
+def _stability(ranks: np.ndarray) -> dict[str, np.ndarray]:
+    shifts = np.abs(ranks[:, 1:] - ranks[:, [0]])
+    return {"WorstRank": ranks.max(axis=1), "MaxRankShift": shifts.max(axis=1)}
+
+
+def summarise(labels: list[str], analysis: str, ranks: np.ndarray, tiers: np.ndarray | None = None, top_k: int = TOP_K) -> pd.DataFrame:
+    """Per exclusion: agreement of the ``(genes, scenarios)`` ranks with the full analysis."""
+    top_full = ranks[:, 0] <= top_k
+    rows = []
+    for index, label in enumerate(labels[1:], start=1):
+        rows.append(
+            {
+                "Analysis": analysis,
+                "Scenario": label,
+                "SpearmanVsAll": float(stats.spearmanr(ranks[:, 0], ranks[:, index]).statistic),
+                f"Top{top_k}Overlap": int((top_full & (ranks[:, index] <= top_k)).sum()),
+                "MaxRankShift": int(np.abs(ranks[:, index] - ranks[:, 0]).max()),
+                "TierChanges": int((tiers[:, index] != tiers[:, 0]).sum()) if tiers is not None else np.nan,
+                "LostCrossCohort": int(((tiers[:, 0] == "cross-cohort") & (tiers[:, index] != "cross-cohort")).sum())
+                if tiers is not None
+                else np.nan,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=Path, default=REV_TABLES, help="directory holding the *_deg_results.csv tables")
+    parser.add_argument("--top", type=int, default=TOP_K, help="top-k used for overlap with the full ranking")
+    add_config_argument(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    enable_profiling(args.profile)
+    if args.config is not None:
+        rebuild.apply_config(load_config(args.config))
+
+    run = start_run(
+        "leave_one_cohort_out",
+        parameters={
+            "code_digest": source_digest(sys.modules[__name__]),
+            "config_fingerprint": rebuild.CONFIG.fingerprint("revision"),
+            "top": args.top,
+        },
+    )
+    run.record_input(BASE_DIR / "data" / "gene_signature.csv")
+    with span("load_inputs"):
+        panel = rebuild.load_candidate_panel()
+        deg_tables = load_deg_tables(args.tables)
+        for accession in deg_tables:
+            run.record_input(args.tables / f"{accession}_deg_results.csv", upstream="rebuild_kfd_revision")
+    labels, include = scenarios(list(deg_tables))
+
+    scores, supporting = target_scores(panel, deg_tables, include)
+    target_ranks = rank_columns(scores)
+    targets = _wide(panel, labels, {"Rank": target_ranks, "CompositeScore": scores, "DatasetCount": supporting})
+    targets = targets.assign(**_stability(target_ranks)).sort_values("Rank", kind="stable").reset_index(drop=True)
+
+    meta = meta_evidence(panel, deg_tables, include)
+    meta_ranks, tiers = meta["MetaRank"].T, meta["EvidenceTier"].T
+    meta_table = _wide(
+        panel,
+        labels,
+        {"MetaRank": meta_ranks, "EvidenceTier": tiers, "RandomEffect": meta["RandomEffect"].T, "PooledPValue": meta["PooledPValue"].T},
+    )
+    meta_table = meta_table.assign(**_stability(meta_ranks), TierStable=(tiers == tiers[:, [0]]).all(axis=1))
+    meta_table = meta_table.sort_values("MetaRank", kind="stable").reset_index(drop=True)
+
+    summary = pd.concat(
+        [summarise(labels, "targets", target_ranks, top_k=args.top), summarise(labels, "meta", meta_ranks, tiers, args.top)],
+        ignore_index=True,
+    )
+    LOCO_DIR.mkdir(parents=True, exist_ok=True)
+    for name, table in (("loco_targets", targets), ("loco_meta", meta_table), ("loco_summary", summary)):
+        path = LOCO_DIR / f"{name}.csv"
+        table.to_csv(path, index=False)
+        run.record_output(path)
+
+    print(summary.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    unstable = meta_table[~meta_table["TierStable"]]
+    print(f"\n{len(unstable)} of {len(meta_table)} genes change evidence tier when one cohort is dropped")
+    tier_columns = ["GeneSymbol", "EvidenceTier", *(f"EvidenceTier_{label}" for label in labels[1:])]
+    if len(unstable):
+        print(unstable.head(args.top)[tier_columns].to_string(index=False))
+    publish_run(run)
+    manifest_path = run.write()
+    report("leave_one_cohort_out")
+    print(f"Run manifest written to {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Per-sample pathway activity scores for the revision cohorts.
+
+Scores every sample of each collapsed gene matrix (written by
+``rebuild_kfd_revision.py`` to ``data/revision/gene_matrices/``) against every
+gene set, then compares severe with non-severe samples per set. Both scoring
+methods work on within-sample ranks, so they need no normalisation across
+samples or cohorts:
+
+* ``singscore`` (Foroutan et al. 2018): mean rank of the set's genes, scaled by
+  its theoretical minimum and maximum and centred on zero. A new sample can be
+  scored on its own.
+* ``ssgsea`` (Barbie et al. 2009): the integrated rank-weighted running sum,
+  divided by the range of all scores in the batch as in GSVA. That range
+  depends on every sample scored together; with ``--no-normalise`` the raw
+  scores are kept and each sample's score is again independent of the rest.
+
+Both reduce to a few sparse ``(sets x genes) @ (genes x samples)`` products over
+the rank matrix, so every sample and set is scored at once.
+
+    python scripts/pathway_activity.py --method ssgsea
+    python scripts/pathway_activity.py --method ssgsea --no-normalise --expression kfd_patients.csv
+    python scripts/pathway_activity.py --expression kfd_patients.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from build_cache import source_digest
+from enrichment import MAX_SET_SIZE, MIN_SET_SIZE
+from gene_sets import GeneSetIndex, load_gene_sets
+from instrumentation import add_profile_argument, enable_profiling, report, span, traced
+from kfd_config import add_config_argument, load_config
+import rebuild_kfd_revision as rebuild
+from rebuild_kfd_revision import DATASETS, benjamini_hochberg, gene_matrix_path, load_gene_matrix, sample_metadata_path
+from results_db import publish_run
+from run_manifest import start_run
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ACTIVITY_DIR = BASE_DIR / "outputs" / "pathway_activity"
+
+SSGSEA_ALPHA = 0.25
+
+
+def expression_ranks(expression: pd.DataFrame) -> np.ndarray:
+    """Within-sample ranks (1 = lowest, ties averaged); missing values take the gene's mean first."""
+    values = expression.to_numpy(dtype=float)
+    missing = np.isnan(values)
+    if missing.any():
+        with np.errstate(invalid="ignore"):
+            gene_means = np.nanmean(values, axis=1)
+        values = np.where(missing, np.nan_to_num(gene_means)[:, np.newaxis], values)
+    return stats.rankdata(values, axis=0)
+
+
+def _aligned(index: GeneSetIndex, expression: pd.DataFrame, min_size: int, max_size: int | None) -> tuple[GeneSetIndex, np.ndarray]:
+    """Restrict ``index`` to the measured genes and return it with the rank rows in its gene order."""
+    background = index.restrict(expression.index.astype(str)).filter_sizes(min_size, max_size)
+    rows = pd.Index(expression.index.astype(str)).get_indexer(background.genes)
+    return background, rows
+
+
+def singscore(
+    index: GeneSetIndex, expression: pd.DataFrame, min_size: int = MIN_SET_SIZE, max_size: int | None = MAX_SET_SIZE
+) -> pd.DataFrame:
+    """Centred unidirectional singscore, ``(sets x samples)``, in ``[-0.5, 0.5]``."""
+    background, rows = _aligned(index, expression, min_size, max_size)
+    ranks = expression_ranks(expression)
+    n_genes = len(expression)
+    sizes = background.sizes[:, np.newaxis]
+    mean_rank = (background.matrix @ ranks[rows]) / sizes
+    lowest = (sizes + 1) / 2
+    highest = (2 * n_genes - sizes + 1) / 2
+    scores = (mean_rank - lowest) / (highest - lowest) - 0.5
+    return pd.DataFrame(scores, index=pd.Index(background.names, name="GeneSet"), columns=expression.columns)
+
+
+def ssgsea(
+    index: GeneSetIndex,
+    expression: pd.DataFrame,
+    alpha: float = SSGSEA_ALPHA,
+    normalise: bool = True,
+    min_size: int = MIN_SET_SIZE,
+    max_size: int | None = MAX_SET_SIZE,
+) -> pd.DataFrame:
+    """ssGSEA enrichment scores, ``(sets x samples)``.
+
+    With genes ordered by decreasing expression, the running sum integrated
+    over all ``N`` positions has a closed form in the members' ranks ``r``
+    (``N`` = highest): ``sum(r**(1+alpha)) / sum(r**alpha) - (N(N+1)/2 - sum(r)) / (N - m)``.
+    """
+    background, rows = _aligned(index, expression, min_size, max_size)
+    ranks = expression_ranks(expression)[rows]
+    n_genes = len(expression)
+    sizes = background.sizes[:, np.newaxis]
+    weighted = background.matrix @ ranks ** (1 + alpha)
+    weights = background.matrix @ ranks**alpha
+    hit_ranks = background.matrix @ ranks
+    scores = weighted / weights - (n_genes * (n_genes + 1) / 2 - hit_ranks) / (n_genes - sizes)
+    if normalise and scores.size:
+        scores = scores / (scores.max() - scores.min())
+    return pd.DataFrame(scores, index=pd.Index(background.names, name="GeneSet"), columns=expression.columns)
+
+
+METHODS = {"singscore": singscore, "ssgsea": ssgsea}
+
+
+def score_samples(index: GeneSetIndex, expression: pd.DataFrame, method: str = "singscore", **kwargs) -> pd.DataFrame:
+    """Score every sample (column) of a genes x samples ``expression`` frame against ``index``."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown scoring method {method!r}; expected one of {sorted(METHODS)}")
+    return METHODS[method](index, expression, **kwargs)
+
+
+def compare_groups(scores: pd.DataFrame, metadata: pd.DataFrame) -> pd.DataFrame:
+    """Welch t-test of severe vs non-severe activity for every set, with BH FDR."""
+    severe = scores[metadata.loc[metadata["severity"] == "severe", "sample_id"]].to_numpy()
+    non_severe = scores[metadata.loc[metadata["severity"] == "non_severe", "sample_id"]].to_numpy()
+    t_stat, pvalues = stats.ttest_ind(severe, non_severe, axis=1, equal_var=False)
+    table = pd.DataFrame(
+        {
+            "GeneSet": scores.index,
+            "MeanSevere": severe.mean(axis=1),
+            "MeanNonSevere": non_severe.mean(axis=1),
+            "Difference": severe.mean(axis=1) - non_severe.mean(axis=1),
+            "t": t_stat,
+            "pvalue": np.nan_to_num(pvalues, nan=1.0),
+        }
+    )
+    table["fdr"] = benjamini_hochberg(table["pvalue"]) if len(table) else []
+    return table.sort_values(["fdr", "pvalue"], kind="stable").reset_index(drop=True)
+
+
+@traced(rows=lambda result: result[0].shape[1])
+def cohort_activity(accession: str, index: GeneSetIndex, method: str, **kwargs) -> tuple[pd.DataFrame, pd.DataFrame]:
+    gene_matrix, metadata = load_gene_matrix(accession)
+    scores = score_samples(index, gene_matrix[metadata["sample_id"]], method, **kwargs)
+    comparison = compare_groups(scores, metadata)
+    comparison.insert(0, "Dataset", accession)
+    return scores, comparison
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gmt", type=Path, nargs="+", help="GMT files (default: data/gene_sets/*.gmt[.gz] or built-in pathways)")
+    parser.add_argument("--method", choices=sorted(METHODS), default="singscore")
+    parser.add_argument("--min-size", type=int, default=MIN_SET_SIZE)
+    parser.add_argument("--max-size", type=int, default=MAX_SET_SIZE)
+    parser.add_argument(
+        "--expression", type=Path, nargs="+",
+        help="score these GeneSymbol x sample CSV matrices instead of the revision cohorts",
+    )
+    parser.add_argument(
+        "--no-normalise", dest="normalise", action="store_false",
+        help="ssgsea: keep raw scores instead of dividing by the batch range, so samples score independently",
+    )
+    add_config_argument(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    enable_profiling(args.profile)
+    if args.config is not None:
+        rebuild.apply_config(load_config(args.config))
+
+    ACTIVITY_DIR.mkdir(parents=True, exist_ok=True)
+    run = start_run(
+        "pathway_activity",
+        parameters={
+            "code_digest": source_digest(sys.modules[__name__]),
+            "config_fingerprint": rebuild.CONFIG.fingerprint("revision"),
+            "method": args.method,
+            "min_size": args.min_size,
+            "max_size": args.max_size,
+            "normalise": args.normalise,
+        },
+    )
+    with span("load_gene_sets"):
+        index = load_gene_sets(args.gmt, rebuild.CONFIG)
+    for path in args.gmt or []:
+        run.record_input(path)
+    print(f"Gene sets: {index}")
+    options = {"min_size": args.min_size, "max_size": args.max_size}
+    if args.method == "ssgsea":
+        options["normalise"] = args.normalise
+
+    if args.expression:
+        for path in args.expression:
+            run.record_input(path)
+            with span(path.stem):
+                expression = pd.read_csv(path, index_col=0)
+                scores = score_samples(index, expression, args.method, **options)
+            out_path = ACTIVITY_DIR / f"{path.name.split('.')[0]}_{args.method}_scores.csv"
+            scores.to_csv(out_path)
+            run.record_output(out_path)
+            print(f"{path}: {scores.shape[1]} samples x {scores.shape[0]} sets -> {out_path}")
+    else:
+        for config in DATASETS:
+            for path in (gene_matrix_path(config.accession), sample_metadata_path(config.accession)):
+                run.record_input(path, upstream="rebuild_kfd_revision")
+            scores, comparison = cohort_activity(config.accession, index, args.method, **options)
+            for name, table in (("scores", scores), ("severity", comparison)):
+                out_path = ACTIVITY_DIR / f"{config.accession}_{args.method}_{name}.csv"
+                table.to_csv(out_path, index=name == "scores")
+                run.record_output(out_path)
+
+            print(f"\n{config.accession}: {scores.shape[1]} samples, {int((comparison['fdr'] <= 0.05).sum())} sets differ at FDR <= 0.05")
+            print(comparison.head(5)[["GeneSet", "MeanSevere", "MeanNonSevere", "t", "pvalue", "fdr"]].to_string(index=False))
+
+    # The per-sample score matrices are wide (one column per sample); only the group comparisons are tabular.
+    publish_run(run, exclude=[f"*_{args.method}_scores.csv"])
+    manifest_path = run.write()
+    report("pathway_activity")
+    print(f"Run manifest written to {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Compare two rankings of the same genes (or gene sets).
+
+Aligns two ranked tables by gene and reports rank shifts, top-k overlap and
+Jaccard similarity at every depth, rank-biased overlap (Webber et al. 2010,
+extrapolated, handles lists of different length) and Kendall tau / Spearman
+rho over the shared genes. The top-k curves come from one ``bincount`` over
+the depth at which each shared gene enters both lists, so a genome-wide
+comparison costs O(n) plus the O(n log n) of Kendall's tau.
+
+Each ranking is ``FILE[:COLUMN[:asc|desc]]``. Without a column, the first
+rank column found (``Rank``, ``MetaRank``, ...) is used; a score column sorts
+descending unless it is a rank, p-value or FDR. ``pipeline``, ``revision`` and
+``meta`` name the three target rankings.
+
+    python scripts/ranking_diff.py revision meta
+    python scripts/ranking_diff.py old_targets.csv revision --top 20
+    python scripts/ranking_diff.py outputs/revision_tables/GSE18090_deg_results.csv:pvalue \\
+        outputs/revision_tables/GSE51808_deg_results.csv:pvalue --p 0.995
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from instrumentation import add_profile_argument, enable_profiling, report, traced
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DIFF_DIR = BASE_DIR / "outputs" / "ranking_diffs"
+
+ALIASES = {
+    "pipeline": BASE_DIR / "outputs" / "tables" / "targets_ranked.csv",
+    "revision": BASE_DIR / "outputs" / "revision_tables" / "kfd_revision_targets.csv",
+    "meta": BASE_DIR / "outputs" / "enhanced_v2_tables" / "kfd_enhanced_v2_meta_targets.csv",
+}
+GENE_COLUMNS = ("GeneSymbol", "Symbol", "GeneSet")
+RANK_COLUMNS = ("Rank", "MetaRank", "PriorityRank")
+SCORE_COLUMNS = ("CompositeScore", "Composite_Score", "NES", "RandomEffect")
+ASCENDING_COLUMNS = ("pvalue", "fdr", "PooledPValue")
+RBO_P = 0.9
+DEPTHS = (5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def load_ranking(spec: str) -> pd.Series:
+    """Positions (1 = best) indexed by gene for a ``FILE[:COLUMN[:asc|desc]]`` spec."""
+    name, column, order = (spec.split(":") + [None, None])[:3]
+    path = ALIASES.get(name, Path(name))
+    table = pd.read_csv(path)
+    gene_column = next((candidate for candidate in GENE_COLUMNS if candidate in table.columns), None)
+    if gene_column is None:
+        raise ValueError(f"{path}: no gene column (expected one of {', '.join(GENE_COLUMNS)})")
+    if column is None:
+        column = next((candidate for candidate in (*RANK_COLUMNS, *SCORE_COLUMNS) if candidate in table.columns), None)
+        if column is None:
+            raise ValueError(f"{path}: no rank or score column; pass FILE:COLUMN")
+    elif column not in table.columns:
+        raise ValueError(f"{path}: no column {column!r}")
+    if order is None:
+        ascending = "rank" in column.lower() or column in ASCENDING_COLUMNS
+    elif order in ("asc", "desc"):
+        ascending = order == "asc"
+    else:
+        raise ValueError(f"{spec}: order must be 'asc' or 'desc'")
+
+    ordered = table.sort_values(column, ascending=ascending, kind="stable", na_position="last")
+    genes = ordered[gene_column].astype(str).drop_duplicates()
+    ranking = pd.Series(np.arange(1, len(genes) + 1), index=pd.Index(genes.to_numpy(), name="GeneSymbol"))
+    ranking.name = spec if name not in ALIASES else name
+    return ranking
+
+
+def align(first: pd.Series, second: pd.Series) -> pd.DataFrame:
+    """Outer join of two rankings; ``Shift`` > 0 means the gene moved up in ``second``."""
+    aligned = pd.concat([first.rename("RankA"), second.rename("RankB")], axis=1, join="outer")
+    aligned["Shift"] = aligned["RankA"] - aligned["RankB"]
+    aligned["AbsShift"] = aligned["Shift"].abs()
+    return aligned.rename_axis("GeneSymbol").reset_index()
+
+
+def overlap_curve(first: pd.Series, second: pd.Series) -> pd.DataFrame:
+    """``|A[:d] & B[:d]|`` and Jaccard similarity for every depth ``d`` up to the longer list."""
+    depth = max(len(first), len(second))
+    shared = first.index.intersection(second.index)
+    entry = np.maximum(first.loc[shared].to_numpy(), second.loc[shared].to_numpy())
+    overlap = np.cumsum(np.bincount(entry, minlength=depth + 1)[1:])
+    d = np.arange(1, depth + 1)
+    size_a = np.minimum(d, len(first))
+    size_b = np.minimum(d, len(second))
+    return pd.DataFrame({"Depth": d, "Overlap": overlap, "Jaccard": overlap / (size_a + size_b - overlap)})
+
+
+def rank_biased_overlap(first: pd.Series, second: pd.Series, p: float = RBO_P, curve: pd.DataFrame | None = None) -> float:
+    """Extrapolated RBO (Webber et al. 2010, eq. 32), valid for lists of unequal length."""
+    if curve is None:
+        curve = overlap_curve(first, second)
+    short, long = sorted((len(first), len(second)))
+    if short == 0:
+        return 0.0
+    overlap = curve["Overlap"].to_numpy(dtype=float)
+    d = curve["Depth"].to_numpy(dtype=float)
+    weights = p**d
+    x_short, x_long = overlap[short - 1], overlap[long - 1]
+    tail = d > short
+    total = np.sum(overlap / d * weights) + np.sum(x_short * (d[tail] - short) / (short * d[tail]) * weights[tail])
+    return float((1 - p) / p * total + ((x_long - x_short) / long + x_short / short) * p**long)
+
+
+@traced(rows=lambda result: len(result[1]))
+def compare_rankings(first: pd.Series, second: pd.Series, p: float = RBO_P) -> tuple[dict, pd.DataFrame, pd.DataFrame]:
+    """Summary metrics, the aligned gene table and the overlap curve."""
+    aligned = align(first, second)
+    curve = overlap_curve(first, second)
+    shared = aligned.dropna(subset=["RankA", "RankB"])
+    if len(shared) > 1:
+        tau = stats.kendalltau(shared["RankA"], shared["RankB"])
+        rho = stats.spearmanr(shared["RankA"], shared["RankB"])
+        correlations = {
+            "kendall_tau": float(tau.statistic), "kendall_pvalue": float(tau.pvalue),
+            "spearman_rho": float(rho.statistic), "spearman_pvalue": float(rho.pvalue),
+        }
+    else:
+        correlations = dict.fromkeys(("kendall_tau", "kendall_pvalue", "spearman_rho", "spearman_pvalue"), float("nan"))
+    summary = {
+        "first": first.name,
+        "second": second.name,
+        "genes_first": len(first),
+        "genes_second": len(second),
+        "shared": len(shared),
+        "rbo_p": p,
+        "rbo": rank_biased_overlap(first, second, p, curve),
+        **correlations,
+        "mean_abs_shift": float(shared["AbsShift"].mean()) if len(shared) else float("nan"),
+        "max_abs_shift": float(shared["AbsShift"].max()) if len(shared) else float("nan"),
+    }
+    return summary, aligned, curve
+
+
+def render_report(summary: dict, aligned: pd.DataFrame, curve: pd.DataFrame, top: int = 10) -> str:
+    """Markdown diff report."""
+    depths = [depth for depth in DEPTHS if depth <= len(curve)]
+    shared = aligned.dropna(subset=["RankA", "RankB"]).astype({"RankA": int, "RankB": int, "Shift": int})
+    top_a = set(aligned.loc[aligned["RankA"] <= top, "GeneSymbol"])
+    top_b = set(aligned.loc[aligned["RankB"] <= top, "GeneSymbol"])
+
+    def fmt(value: float) -> str:
+        return "n/a" if pd.isna(value) else f"{value:.3f}"
+
+    lines = [
+        f"# Ranking diff: {summary['first']} vs {summary['second']}",
+        "",
+        f"- Genes: {summary['genes_first']} vs {summary['genes_second']}, {summary['shared']} shared",
+        f"- Rank-biased overlap (p = {summary['rbo_p']:g}): {fmt(summary['rbo'])}",
+        f"- Kendall tau: {fmt(summary['kendall_tau'])} (p = {summary['kendall_pvalue']:.3g}); "
+        f"Spearman rho: {fmt(summary['spearman_rho'])} (p = {summary['spearman_pvalue']:.3g})",
+        f"- Mean absolute rank shift: {fmt(summary['mean_abs_shift'])}; largest: {fmt(summary['max_abs_shift'])}",
+        "",
+        "| Depth | Overlap | Jaccard |",
+        "|---:|---:|---:|",
+        *(f"| {depth} | {curve['Overlap'].iloc[depth - 1]} | {curve['Jaccard'].iloc[depth - 1]:.3f} |" for depth in depths),
+        "",
+        f"Entered the top {top}: {', '.join(sorted(top_b - top_a)) or 'none'}",
+        "",
+        f"Left the top {top}: {', '.join(sorted(top_a - top_b)) or 'none'}",
+        "",
+        "| Gene | Rank A | Rank B | Shift |",
+        "|---|---:|---:|---:|",
+    ]
+    movers = shared.sort_values(["AbsShift", "RankB"], ascending=[False, True], kind="stable").head(top)
+    lines += [f"| {row.GeneSymbol} | {row.RankA} | {row.RankB} | {row.Shift:+d} |" for row in movers.itertuples()]
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("first", help="baseline ranking: FILE[:COLUMN[:asc|desc]] or pipeline/revision/meta")
+    parser.add_argument("second", help="ranking to compare against the baseline")
+    parser.add_argument("--p", type=float, default=RBO_P, help="RBO persistence; the top 1/(1-p) ranks carry most weight")
+    parser.add_argument("--top", type=int, default=10, help="top-k for entries/exits and the movers table")
+    parser.add_argument("--name", help="output file prefix (default: derived from the inputs)")
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    enable_profiling(args.profile)
+    if not 0 < args.p < 1:
+        parser.error("--p must be between 0 and 1")
+
+    first, second = load_ranking(args.first), load_ranking(args.second)
+    summary, aligned, curve = compare_rankings(first, second, args.p)
+    text = render_report(summary, aligned, curve, args.top)
+
+    name = args.name or "_vs_".join(Path(spec.split(":")[0]).name.split(".")[0] for spec in (args.first, args.second))
+    DIFF_DIR.mkdir(parents=True, exist_ok=True)
+    aligned.sort_values(["AbsShift", "RankB"], ascending=[False, True], kind="stable").to_csv(DIFF_DIR / f"{name}_aligned.csv", index=False)
+    curve.to_csv(DIFF_DIR / f"{name}_overlap.csv", index=False)
+    (DIFF_DIR / f"{name}.md").write_text(text, encoding="utf-8")
+    print(text)
+    report("ranking_diff")
+    print(f"Report written to {DIFF_DIR / f'{name}.md'}")
+
+
+if __name__ == "__main__":
+    main()
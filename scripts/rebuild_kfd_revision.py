@@ -2,15 +2,18 @@
 
 from __future__ import annotations
 
+import argparse
 import csv
 import gzip
 import io
-import math
+import os
 import re
+import sys
 import warnings
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Callable
+from urllib.parse import urlsplit
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -19,11 +22,39 @@ import requests
 import seaborn as sns
 from scipy import stats
 
+from build_cache import STATE_DIR, BuildManifest, BuildTarget, relative_path, source_digest
+from instrumentation import add_profile_argument, enable_profiling, report, span, traced
+from kfd_config import KFDConfig, add_config_argument, load_config
+from results_db import publish_run
+from run_manifest import record_download, start_run
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data" / "revision"
 TABLE_DIR = BASE_DIR / "outputs" / "revision_tables"
 FIG_DIR = BASE_DIR / "outputs" / "revision_figures"
+# Point at a local mirror (e.g. scripts/synthetic_geo.py --serve) to run offline.
+GEO_BASE_URL = os.environ.get("KFD_GEO_BASE_URL", "https://ftp.ncbi.nlm.nih.gov/geo").rstrip("/")
+# GEO files are immutable once published, so downloads are cached under DATA_DIR.
+REFRESH_DOWNLOADS = False
+BUILD_STATE = STATE_DIR / "rebuild_kfd_revision.json"
+
+TABLE_FILES = (
+    "cohort_summary.csv",
+    "kfd_revision_signature.csv",
+    "kfd_revision_targets.csv",
+    "kfd_revision_drug_candidates.csv",
+    "kfd_revision_weight_sensitivity.csv",
+    "kfd_revision_weight_sensitivity_summary.csv",
+    "kfd_revision_pathway_summary.csv",
+)
+FIGURE_FILES = (
+    "figure1_discovery_cohorts.png",
+    "figure2_target_ranking.png",
+    "figure3_signature_heatmap.png",
+    "figure4_pathway_scores.png",
+    "figure5_candidate_table.png",
+)
 
 for directory in (DATA_DIR, TABLE_DIR, FIG_DIR):
     directory.mkdir(parents=True, exist_ok=True)
@@ -34,16 +65,20 @@ warnings.filterwarnings("ignore", message="Precision loss occurred in moment cal
 @dataclass(frozen=True)
 class DatasetConfig:
     accession: str
-    matrix_url: str
+    matrix_path: str
     platform: str
     group_parser: Callable[[dict[str, list[list[str]]]], pd.DataFrame]
     citation_label: str
 
+    @property
+    def matrix_url(self) -> str:
+        return f"{GEO_BASE_URL}/{self.matrix_path}"
+
 
 DATASETS = [
     DatasetConfig(
         accession="GSE18090",
-        matrix_url="https://ftp.ncbi.nlm.nih.gov/geo/series/GSE18nnn/GSE18090/matrix/GSE18090_series_matrix.txt.gz",
+        matrix_path="series/GSE18nnn/GSE18090/matrix/GSE18090_series_matrix.txt.gz",
         platform="GPL570",
         citation_label="Brazilian PBMC cohort; DHF vs DF",
         group_parser=lambda meta: pd.DataFrame(
@@ -61,7 +96,7 @@ DATASETS = [
     ),
     DatasetConfig(
         accession="GSE51808",
-        matrix_url="https://ftp.ncbi.nlm.nih.gov/geo/series/GSE51nnn/GSE51808/matrix/GSE51808_series_matrix.txt.gz",
+        matrix_path="series/GSE51nnn/GSE51808/matrix/GSE51808_series_matrix.txt.gz",
         platform="GPL13158",
         citation_label="Thai whole-blood cohort; DHF vs DF",
         group_parser=lambda meta: pd.DataFrame(
@@ -79,7 +114,7 @@ DATASETS = [
     ),
     DatasetConfig(
         accession="GSE43777",
-        matrix_url="https://ftp.ncbi.nlm.nih.gov/geo/series/GSE43nnn/GSE43777/matrix/GSE43777-GPL570_series_matrix.txt.gz",
+        matrix_path="series/GSE43nnn/GSE43777/matrix/GSE43777-GPL570_series_matrix.txt.gz",
         platform="GPL570",
         citation_label="Venezuelan PBMC longitudinal cohort; acute DHF vs DF",
         group_parser=lambda meta: pd.DataFrame(
@@ -99,82 +134,13 @@ DATASETS = [
 ]
 
 
-PATHWAY_DEFINITIONS = {
-    "cytokine_signaling": {
-        "score": 1.00,
-        "phase": "febrile",
-        "reactome": "Cytokine Signaling in Immune system / Interferon Signaling",
-        "genes": {
-            "IL1B", "IL6", "IL10", "TNF", "CXCL10", "CCL2", "CCL8", "CXCL11",
-            "STAT1", "STAT2", "IRF7", "ISG15", "OAS1", "OAS2", "IFI27", "IFI44L",
-            "IFIT1", "IFIT2", "IFIT3", "MX1", "MX2", "RSAD2", "XAF1", "EPSTI1",
-            "SIGLEC1", "GBP1", "GBP5", "IFI6", "IFI44", "IFI35", "ISG20",
-        },
-    },
-    "coagulation_fibrinolysis": {
-        "score": 0.95,
-        "phase": "hemorrhagic",
-        "reactome": "Platelet activation, signaling and aggregation / Hemostasis",
-        "genes": {"SERPINE1", "F3", "VWF", "THBD", "FGA", "PLAU", "PLAT", "TFPI"},
-    },
-    "endothelial_barrier": {
-        "score": 0.95,
-        "phase": "hemorrhagic",
-        "reactome": "Cell junction organization / VEGFA-VEGFR2 pathway",
-        "genes": {"ANGPT2", "ANGPT1", "KDR", "TEK", "VEGFA", "EDN1", "SELE", "ICAM1", "VCAM1"},
-    },
-    "platelet_activation": {
-        "score": 0.90,
-        "phase": "hemorrhagic",
-        "reactome": "Platelet activation, signaling and aggregation",
-        "genes": {"ITGA2B", "ITGB3", "GP1BA", "PF4", "PPBP", "SELP", "TREML1"},
-    },
-    "monocyte_innate_activation": {
-        "score": 0.85,
-        "phase": "febrile",
-        "reactome": "Innate Immune System / Toll-like Receptor Cascades",
-        "genes": {"S100A8", "S100A9", "LILRB1", "FCGR1A", "FCGR1B", "TLR7", "TLR8", "AIM2"},
-    },
-    "oxidative_stress": {
-        "score": 0.80,
-        "phase": "recovery",
-        "reactome": "Cellular responses to stress",
-        "genes": {"HMOX1", "NQO1", "SOD2", "TXN", "TXNIP", "NFE2L2"},
-    },
-    "neurological_barrier": {
-        "score": 0.75,
-        "phase": "neurological",
-        "reactome": "Neuronal System / Tight junction interactions",
-        "genes": {"AQP4", "CLDN5", "OCLN", "TJP1", "BDNF", "NGF"},
-    },
-}
-
-PATHWAY_ALIAS = {
-    "cytokine": "cytokine_signaling",
-    "interferon": "cytokine_signaling",
-    "endothelial": "endothelial_barrier",
-    "coagulation": "coagulation_fibrinolysis",
-    "platelet": "platelet_activation",
-    "oxidative": "oxidative_stress",
-    "neurological": "neurological_barrier",
-    "neuroprotection": "neurological_barrier",
-}
-
-PHASE_SCORES = {
-    "hemorrhagic": 1.00,
-    "febrile": 0.85,
-    "neurological": 0.75,
-    "recovery": 0.60,
-    "protective": 0.60,
-    "both": 0.75,
-}
-
-DRUGGABILITY_SCORES = {
-    "high": 1.00,
-    "moderate": 0.65,
-    "supportive": 0.45,
-    "low": 0.20,
-}
+# Pathway definitions, scores, weights and thresholds live in config/kfd_config.yaml
+# and are installed by apply_config() below.
+CONFIG: KFDConfig
+PATHWAY_DEFINITIONS: dict[str, dict] = {}
+PATHWAY_ALIAS: dict[str, str] = {}
+PHASE_SCORES: dict[str, float] = {}
+DRUGGABILITY_SCORES: dict[str, float] = {}
 
 TARGET_DRUGS = {
     "SERPINE1": [("Tranexamic acid", "supportive", "Hypothesis-generating bleeding-control adjunct aligned to fibrinolysis imbalance")],
@@ -196,14 +162,32 @@ def _extract_characteristic(meta: dict[str, list[list[str]]], label: str) -> lis
     return [""] * len(meta["Sample_geo_accession"][0])
 
 
+def download_cache_path(url: str) -> Path:
+    parts = urlsplit(url)
+    return DATA_DIR / "geo_cache" / parts.netloc.replace(":", "_") / parts.path.lstrip("/")
+
+
+@traced(name="download", rows=lambda text: text.count("\n"))
 def fetch_text(url: str) -> str:
-    response = requests.get(url, timeout=60)
-    response.raise_for_status()
+    cache_path = download_cache_path(url)
+    cache_hit = cache_path.exists() and not REFRESH_DOWNLOADS
+    if cache_hit:
+        content = cache_path.read_bytes()
+    else:
+        response = requests.get(url, timeout=60)
+        response.raise_for_status()
+        content = response.content
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_name(cache_path.name + ".part")
+        tmp.write_bytes(content)
+        tmp.replace(cache_path)
+    record_download(url, len(content), cache_hit, cache_path)
     if url.endswith(".gz"):
-        return gzip.decompress(response.content).decode("utf-8", errors="replace")
-    return response.text
+        content = gzip.decompress(content)
+    return content.decode("utf-8", errors="replace")
 
 
+@traced(rows=lambda result: len(result[1]))
 def parse_series_matrix(config: DatasetConfig) -> tuple[dict[str, list[list[str]]], pd.DataFrame]:
     text = fetch_text(config.matrix_url)
     lines = text.splitlines()
@@ -231,10 +215,14 @@ def parse_series_matrix(config: DatasetConfig) -> tuple[dict[str, list[list[str]
     return meta, expr
 
 
-def parse_annotation(platform: str) -> pd.DataFrame:
+def annotation_path(platform: str) -> str:
     prefix = platform[:-3] + "nnn"
-    url = f"https://ftp.ncbi.nlm.nih.gov/geo/platforms/{prefix}/{platform}/annot/{platform}.annot.gz"
-    text = fetch_text(url)
+    return f"platforms/{prefix}/{platform}/annot/{platform}.annot.gz"
+
+
+@traced()
+def parse_annotation(platform: str) -> pd.DataFrame:
+    text = fetch_text(f"{GEO_BASE_URL}/{annotation_path(platform)}")
     lines = text.splitlines()
     start = lines.index("!platform_table_begin") + 1
     end = lines.index("!platform_table_end")
@@ -261,6 +249,7 @@ def benjamini_hochberg(pvalues: pd.Series) -> pd.Series:
     return result.reindex(pvalues.index)
 
 
+@traced()
 def collapse_to_genes(expression: pd.DataFrame, annotation: pd.DataFrame, sample_columns: list[str]) -> pd.DataFrame:
     merged = expression.merge(annotation, on="ID_REF", how="left")
     merged = merged.dropna(subset=["GeneSymbol"]).copy()
@@ -282,40 +271,170 @@ def collapse_to_genes(expression: pd.DataFrame, annotation: pd.DataFrame, sample
     return merged[["GeneSymbol", *sample_columns]]
 
 
+def gene_matrix_path(accession: str) -> Path:
+    return DATA_DIR / "gene_matrices" / f"{accession}_gene_matrix.csv.gz"
+
+
+def sample_metadata_path(accession: str) -> Path:
+    return DATA_DIR / "gene_matrices" / f"{accession}_samples.csv"
+
+
+def write_gene_matrix(accession: str, gene_matrix: pd.DataFrame, metadata: pd.DataFrame) -> list[Path]:
+    """Persist the collapsed gene x sample matrix and its sample groups for per-sample analyses."""
+    matrix_path = gene_matrix_path(accession)
+    metadata_path = sample_metadata_path(accession)
+    matrix_path.parent.mkdir(parents=True, exist_ok=True)
+    gene_matrix.to_csv(matrix_path, index=False, float_format="%.6g", compression={"method": "gzip", "mtime": 0})
+    metadata.to_csv(metadata_path, index=False)
+    return [matrix_path, metadata_path]
+
+
+def load_gene_matrix(accession: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Return the persisted ``(genes x samples matrix indexed by GeneSymbol, sample metadata)``."""
+    gene_matrix = pd.read_csv(gene_matrix_path(accession), index_col="GeneSymbol")
+    metadata = pd.read_csv(sample_metadata_path(accession), dtype=str)
+    return gene_matrix, metadata
+
+
+@traced()
 def differential_expression(gene_matrix: pd.DataFrame, metadata: pd.DataFrame) -> pd.DataFrame:
-    sample_columns = metadata["sample_id"].tolist()
+    """Welch's t-test of severe vs non-severe per gene, ignoring missing values.
+
+    Besides the fold change and p-value, each row carries the statistic ``t``,
+    the Welch-Satterthwaite ``df``, the standard error ``se`` of ``log2FC`` and
+    the number of non-missing samples per group, so downstream meta-analysis
+    can weight studies by their exact sampling error.
+    """
     severe_samples = metadata.loc[metadata["severity"] == "severe", "sample_id"].tolist()
     non_severe_samples = metadata.loc[metadata["severity"] == "non_severe", "sample_id"].tolist()
-
-    records = []
-    for _, row in gene_matrix.iterrows():
-        severe_values = row[severe_samples].astype(float).values
-        non_severe_values = row[non_severe_samples].astype(float).values
-        t_stat, pvalue = stats.ttest_ind(severe_values, non_severe_values, equal_var=False, nan_policy="omit")
-        log_fc = float(np.nanmean(severe_values) - np.nanmean(non_severe_values))
-        records.append(
-            {
-                "GeneSymbol": row["GeneSymbol"],
-                "log2FC": log_fc,
-                "pvalue": pvalue if not math.isnan(pvalue) else 1.0,
-                "mean_severe": float(np.nanmean(severe_values)),
-                "mean_non_severe": float(np.nanmean(non_severe_values)),
-            }
-        )
-
-    deg = pd.DataFrame(records)
+    severe_values = gene_matrix[severe_samples].to_numpy(dtype=float)
+    non_severe_values = gene_matrix[non_severe_samples].to_numpy(dtype=float)
+
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        n_severe = (~np.isnan(severe_values)).sum(axis=1)
+        n_non_severe = (~np.isnan(non_severe_values)).sum(axis=1)
+        mean_severe = np.nanmean(severe_values, axis=1)
+        mean_non_severe = np.nanmean(non_severe_values, axis=1)
+        var_severe = np.nanvar(severe_values, axis=1, ddof=1) / n_severe
+        var_non_severe = np.nanvar(non_severe_values, axis=1, ddof=1) / n_non_severe
+        log_fc = mean_severe - mean_non_severe
+        se = np.sqrt(var_severe + var_non_severe)
+        t_stat = log_fc / se
+        df = (var_severe + var_non_severe) ** 2 / (var_severe**2 / (n_severe - 1) + var_non_severe**2 / (n_non_severe - 1))
+        # Two constant groups with different means: scipy reports t = +/-inf, p = 0.
+        pvalue = np.where(np.isinf(t_stat), 0.0, 2 * stats.t.sf(np.abs(t_stat), df))
+
+    deg = pd.DataFrame(
+        {
+            "GeneSymbol": gene_matrix["GeneSymbol"].to_numpy(),
+            "log2FC": log_fc,
+            "se": se,
+            "t": t_stat,
+            "df": df,
+            "pvalue": np.where(np.isnan(pvalue), 1.0, pvalue),
+            "mean_severe": mean_severe,
+            "mean_non_severe": mean_non_severe,
+            "n_severe": n_severe,
+            "n_non_severe": n_non_severe,
+        }
+    )
     deg["fdr"] = benjamini_hochberg(deg["pvalue"])
     deg["direction"] = np.where(deg["log2FC"] >= 0, "up", "down")
     return deg.sort_values(["fdr", "pvalue", "log2FC"], ascending=[True, True, False])
 
 
-def classify_gene(gene: str) -> tuple[str, float, str]:
+class PrefixTrie:
+    """Character trie answering "does ``word`` start with any stored prefix?" in one walk."""
+
+    _END = object()
+
+    def __init__(self, prefixes: dict[str, object] | None = None) -> None:
+        self.root: dict = {}
+        for prefix, value in (prefixes or {}).items():
+            self.insert(prefix, value)
+
+    def insert(self, prefix: str, value: object) -> None:
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[self._END] = value
+
+    def match(self, word: str, default: object = None) -> object:
+        """Return the value of the shortest stored prefix of ``word``."""
+        node = self.root
+        for char in word:
+            node = node.get(char)
+            if node is None:
+                return default
+            if self._END in node:
+                return node[self._END]
+        return default
+
+
+def _pathway_record(pathway: str) -> tuple[str, float, str]:
+    info = PATHWAY_DEFINITIONS[pathway]
+    return pathway, info["score"], info["phase"]
+
+
+# Interferon-stimulated gene families not listed explicitly are treated as cytokine signaling.
+FAMILY_PREFIXES = ("IFI", "IFIT", "ISG", "OAS", "MX", "GBP", "RSAD", "XAF", "SIGLEC")
+GENE_PATHWAY_INDEX: dict[str, tuple[str, float, str]] = {}
+FAMILY_TRIE = PrefixTrie()
+DEFAULT_PATHWAY = ("host_response_other", 0.70, "febrile")
+PATHWAY_SCORE: dict[str, float] = {}
+PATHWAY_REACTOME: dict[str, str] = {}
+
+
+def apply_config(config: KFDConfig) -> None:
+    """Install ``config`` as the module's scoring tables; called at import and for ``--config``."""
+    global CONFIG, PATHWAY_DEFINITIONS, PATHWAY_ALIAS, PHASE_SCORES, DRUGGABILITY_SCORES
+    global GENE_PATHWAY_INDEX, FAMILY_TRIE, DEFAULT_PATHWAY, PATHWAY_SCORE, PATHWAY_REACTOME
+    revision = config.revision
+    CONFIG = config
+    PATHWAY_DEFINITIONS = revision.pathway_definitions()
+    PATHWAY_ALIAS = dict(revision.pathway_aliases)
+    PHASE_SCORES = dict(revision.phase_scores)
+    DRUGGABILITY_SCORES = dict(revision.druggability_scores)
+
+    # Inverted index gene -> (pathway, score, phase). Earlier definitions win, as in the original scan.
+    GENE_PATHWAY_INDEX = {}
     for pathway, info in PATHWAY_DEFINITIONS.items():
-        if gene in info["genes"]:
-            return pathway, info["score"], info["phase"]
-    if gene.startswith(("IFI", "IFIT", "ISG", "OAS", "MX", "GBP", "RSAD", "XAF", "SIGLEC")):
-        return "cytokine_signaling", PATHWAY_DEFINITIONS["cytokine_signaling"]["score"], "febrile"
-    return "host_response_other", 0.70, "febrile"
+        for gene in info["genes"]:
+            GENE_PATHWAY_INDEX.setdefault(gene, _pathway_record(pathway))
+    DEFAULT_PATHWAY = ("host_response_other", revision.default_pathway_score, "febrile")
+    cytokine_score = PATHWAY_DEFINITIONS.get("cytokine_signaling", {}).get("score", DEFAULT_PATHWAY[1])
+    FAMILY_TRIE = PrefixTrie({prefix: ("cytokine_signaling", cytokine_score, "febrile") for prefix in FAMILY_PREFIXES})
+    PATHWAY_SCORE = {pathway: info["score"] for pathway, info in PATHWAY_DEFINITIONS.items()}
+    PATHWAY_REACTOME = {pathway: info["reactome"] for pathway, info in PATHWAY_DEFINITIONS.items()}
+
+
+apply_config(load_config())
+
+
+def classify_genes(genes) -> pd.DataFrame:
+    """Classify a vector of gene symbols; returns ``GeneSymbol``, ``Pathway``, ``PathwayScore`` and ``Phase``.
+
+    Distinct symbols are matched against ``GENE_PATHWAY_INDEX`` in one ``map``;
+    only the misses walk the family-prefix trie. Missing symbols get ``DEFAULT_PATHWAY``.
+    """
+    symbols = pd.Series(genes, dtype=object).reset_index(drop=True)
+    codes, unique = pd.factorize(symbols)
+    records = pd.Series(unique, dtype=object).map(GENE_PATHWAY_INDEX)
+    misses = records.isna().to_numpy()
+    if misses.any():
+        matched = [FAMILY_TRIE.match(str(gene), DEFAULT_PATHWAY) for gene in unique[misses]]
+        records[misses] = pd.Series(matched, index=records.index[misses], dtype=object)
+    # One extra row for code -1 (missing symbol).
+    table = pd.DataFrame([*records.tolist(), DEFAULT_PATHWAY], columns=["Pathway", "PathwayScore", "Phase"])
+    return pd.DataFrame(
+        {
+            "GeneSymbol": symbols,
+            "Pathway": table["Pathway"].to_numpy(dtype=object)[codes],
+            "PathwayScore": table["PathwayScore"].to_numpy(dtype=float)[codes],
+            "Phase": table["Phase"].to_numpy(dtype=object)[codes],
+        }
+    )
 
 
 def load_candidate_panel() -> pd.DataFrame:
@@ -324,18 +443,17 @@ def load_candidate_panel() -> pd.DataFrame:
     panel["PathwayRaw"] = panel["Pathway"].str.lower()
     panel["Pathway"] = panel["PathwayRaw"].map(PATHWAY_ALIAS).fillna(panel["PathwayRaw"])
     panel["PhaseBucket"] = panel["Phase_Relevance"].str.lower()
-    panel["PathwayScore"] = panel["Pathway"].map(
-        lambda pathway: PATHWAY_DEFINITIONS.get(pathway, {"score": 0.70})["score"]
-    )
-    panel["PhaseScore"] = panel["PhaseBucket"].map(PHASE_SCORES).fillna(0.70)
-    panel["ReactomeModule"] = panel["Pathway"].map(
-        lambda pathway: PATHWAY_DEFINITIONS.get(pathway, {"reactome": "Immune System"})["reactome"]
-    )
+    panel["PathwayScore"] = panel["Pathway"].map(PATHWAY_SCORE).fillna(CONFIG.revision.default_pathway_score)
+    panel["PhaseScore"] = panel["PhaseBucket"].map(PHASE_SCORES).fillna(CONFIG.revision.default_phase_score)
+    panel["ReactomeModule"] = panel["Pathway"].map(PATHWAY_REACTOME).fillna("Immune System")
     panel["TractabilityScore"] = panel["Druggability"].str.lower().map(DRUGGABILITY_SCORES).fillna(0.20)
     return panel
 
 
+@traced()
 def build_target_table(candidate_panel: pd.DataFrame, dataset_results: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    revision = CONFIG.revision
+    weights = revision.composite_weights
     all_stats = []
     for _, row in candidate_panel.iterrows():
         per_dataset = {}
@@ -354,8 +472,8 @@ def build_target_table(candidate_panel: pd.DataFrame, dataset_results: dict[str,
             supporting = [
                 accession
                 for accession, stats_row in per_dataset.items()
-                if stats_row["pvalue"] <= 0.05
-                and abs(stats_row["log2FC"]) >= 0.30
+                if stats_row["pvalue"] <= revision.deg_pvalue
+                and abs(stats_row["log2FC"]) >= revision.deg_abs_log2fc
                 and ((stats_row["log2FC"] >= 0) == (consensus_direction == "up"))
             ]
             median_abs_log2fc = float(np.median(np.abs(logfcs)))
@@ -369,18 +487,18 @@ def build_target_table(candidate_panel: pd.DataFrame, dataset_results: dict[str,
             best_fdr = 1.0
 
         recurrence_score = len(supporting) / len(dataset_results)
-        effect_score = min(median_abs_log2fc / 1.5, 1.0)
-        omics_score = 0.65 * recurrence_score + 0.35 * effect_score
+        effect_score = min(median_abs_log2fc / revision.effect_saturation, 1.0)
+        omics_score = revision.recurrence_weight * recurrence_score + revision.effect_weight * effect_score
 
         therapies = TARGET_DRUGS.get(row["GeneSymbol"], [("No direct repurposed agent", "low", "Biomarker-priority target")])
         druggability_label = therapies[0][1]
         tractability_score = DRUGGABILITY_SCORES[druggability_label]
 
         composite_score = (
-            0.45 * omics_score
-            + 0.20 * tractability_score
-            + 0.20 * row["PathwayScore"]
-            + 0.15 * row["PhaseScore"]
+            weights["omics"] * omics_score
+            + weights["tractability"] * tractability_score
+            + weights["pathway"] * row["PathwayScore"]
+            + weights["phase"] * row["PhaseScore"]
         )
 
         all_stats.append(
@@ -415,21 +533,23 @@ def build_target_table(candidate_panel: pd.DataFrame, dataset_results: dict[str,
     return targets
 
 
+@traced()
 def build_drug_table(targets: pd.DataFrame) -> pd.DataFrame:
     records = []
+    ranked = targets.drop_duplicates("GeneSymbol").set_index("GeneSymbol")[["Rank", "Pathway"]].to_dict("index")
     for gene, therapies in TARGET_DRUGS.items():
-        target_row = targets[targets["GeneSymbol"] == gene]
-        if target_row.empty:
+        target_row = ranked.get(gene)
+        if target_row is None:
             continue
         for drug_name, priority, rationale in therapies:
             records.append(
                 {
                     "GeneSymbol": gene,
-                    "PriorityRank": int(target_row.iloc[0]["Rank"]),
+                    "PriorityRank": int(target_row["Rank"]),
                     "Candidate": drug_name,
                     "EvidenceTier": priority,
                     "Rationale": rationale,
-                    "Pathway": target_row.iloc[0]["Pathway"],
+                    "Pathway": target_row["Pathway"],
                 }
             )
     drugs = pd.DataFrame(records)
@@ -440,11 +560,23 @@ def build_drug_table(targets: pd.DataFrame) -> pd.DataFrame:
     return drugs
 
 
+def summarise_pathways(targets: pd.DataFrame) -> pd.DataFrame:
+    return (
+        targets.groupby("Pathway")
+        .agg(Targets=("GeneSymbol", "count"), MeanScore=("CompositeScore", "mean"), SD=("CompositeScore", "std"))
+        .reset_index()
+        .sort_values("MeanScore", ascending=False)
+    )
+
+
+SCORE_COLUMNS = {"omics": "OmicsScore", "tractability": "TractabilityScore", "pathway": "PathwayScore", "phase": "PhaseScore"}
+
+
+@traced(rows=lambda result: len(result[0]))
 def run_weight_sensitivity(targets: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
     schemes = {
-        "base": {"OmicsScore": 0.45, "TractabilityScore": 0.20, "PathwayScore": 0.20, "PhaseScore": 0.15},
-        "equal_weight": {"OmicsScore": 0.25, "TractabilityScore": 0.25, "PathwayScore": 0.25, "PhaseScore": 0.25},
-        "omics_heavy": {"OmicsScore": 0.60, "TractabilityScore": 0.15, "PathwayScore": 0.15, "PhaseScore": 0.10},
+        name: {SCORE_COLUMNS[component]: weight for component, weight in weights.items()}
+        for name, weights in {"base": CONFIG.revision.composite_weights, **CONFIG.revision.sensitivity_schemes}.items()
     }
 
     sensitivity = targets[["GeneSymbol", "OmicsScore", "TractabilityScore", "PathwayScore", "PhaseScore"]].copy()
@@ -470,6 +602,7 @@ def run_weight_sensitivity(targets: pd.DataFrame) -> tuple[pd.DataFrame, pd.Data
     return sensitivity, pd.DataFrame(summary_rows)
 
 
+@traced()
 def save_figures(candidate_panel: pd.DataFrame, targets: pd.DataFrame, dataset_results: dict[str, pd.DataFrame], metadata_map: dict[str, pd.DataFrame]) -> None:
     sns.set_theme(style="whitegrid")
 
@@ -519,12 +652,7 @@ def save_figures(candidate_panel: pd.DataFrame, targets: pd.DataFrame, dataset_r
     fig.savefig(FIG_DIR / "figure3_signature_heatmap.png", dpi=300)
     plt.close(fig)
 
-    pathway_summary = (
-        targets.groupby("Pathway")
-        .agg(Targets=("GeneSymbol", "count"), MeanScore=("CompositeScore", "mean"), SD=("CompositeScore", "std"))
-        .reset_index()
-        .sort_values("MeanScore", ascending=False)
-    )
+    pathway_summary = summarise_pathways(targets)
     fig, ax = plt.subplots(figsize=(8, 5))
     sns.barplot(data=pathway_summary, x="MeanScore", y="Pathway", ax=ax, color="#577590")
     ax.set_xlabel("Mean composite score")
@@ -554,63 +682,160 @@ def save_figures(candidate_panel: pd.DataFrame, targets: pd.DataFrame, dataset_r
     plt.close(fig)
 
 
-def main() -> None:
-    metadata_map: dict[str, pd.DataFrame] = {}
-    dataset_results: dict[str, pd.DataFrame] = {}
-    cohort_rows = []
+def cohort_target(config: DatasetConfig) -> BuildTarget:
+    """Per-cohort parse/collapse/DE stage; current while the cached GEO files and its code are unchanged."""
+    return BuildTarget(
+        name=config.accession,
+        inputs=[
+            download_cache_path(config.matrix_url),
+            download_cache_path(f"{GEO_BASE_URL}/{annotation_path(config.platform)}"),
+        ],
+        outputs=[
+            TABLE_DIR / f"{config.accession}_deg_results.csv",
+            gene_matrix_path(config.accession),
+            sample_metadata_path(config.accession),
+        ],
+        params={
+            "code": source_digest(
+                parse_series_matrix, parse_annotation, collapse_to_genes, differential_expression, write_gene_matrix,
+                config.group_parser,
+            ),
+            "platform": config.platform,
+        },
+    )
 
-    for config in DATASETS:
-        meta, expression = parse_series_matrix(config)
-        metadata = config.group_parser(meta)
-        metadata = metadata[metadata["severity"].isin({"severe", "non_severe"})].copy()
-        if "phase" in metadata.columns:
-            metadata = metadata[~metadata["phase"].str.contains("Conval", case=False, na=False)].copy()
-        metadata_map[config.accession] = metadata
-
-        annotation = parse_annotation(config.platform)
-        sample_columns = metadata["sample_id"].tolist()
-        gene_matrix = collapse_to_genes(expression[["ID_REF", *sample_columns]], annotation, sample_columns)
-        deg = differential_expression(gene_matrix, metadata)
-        dataset_results[config.accession] = deg
-
-        deg.to_csv(TABLE_DIR / f"{config.accession}_deg_results.csv", index=False)
-        cohort_rows.append(
-            {
-                "Dataset": config.accession,
-                "Description": config.citation_label,
-                "Platform": config.platform,
-                "SevereSamples": int((metadata["severity"] == "severe").sum()),
-                "NonSevereSamples": int((metadata["severity"] == "non_severe").sum()),
-                "GenesTested": int(deg.shape[0]),
-                "P_0.05_DEGs": int(((deg["pvalue"] <= 0.05) & (deg["log2FC"].abs() >= 0.30)).sum()),
-            }
-        )
 
-    candidate_panel = load_candidate_panel()
-    targets = build_target_table(candidate_panel, dataset_results)
-    drugs = build_drug_table(targets)
-    sensitivity_table, sensitivity_summary = run_weight_sensitivity(targets)
+def scoring_target(config_fingerprint: str) -> BuildTarget:
+    """Target scoring, tables and figures; rerun when the revision config, the DEG tables or the code change."""
+    return BuildTarget(
+        name="scoring",
+        inputs=[
+            BASE_DIR / "data" / "gene_signature.csv",
+            *(path for config in DATASETS for path in cohort_target(config).outputs),
+        ],
+        outputs=[*(TABLE_DIR / name for name in TABLE_FILES), *(FIG_DIR / name for name in FIGURE_FILES)],
+        params={"config": config_fingerprint, "code": source_digest(sys.modules[__name__])},
+    )
 
-    pd.DataFrame(cohort_rows).to_csv(TABLE_DIR / "cohort_summary.csv", index=False)
-    candidate_panel.to_csv(TABLE_DIR / "kfd_revision_signature.csv", index=False)
-    targets.to_csv(TABLE_DIR / "kfd_revision_targets.csv", index=False)
-    drugs.to_csv(TABLE_DIR / "kfd_revision_drug_candidates.csv", index=False)
-    sensitivity_table.to_csv(TABLE_DIR / "kfd_revision_weight_sensitivity.csv", index=False)
-    sensitivity_summary.to_csv(TABLE_DIR / "kfd_revision_weight_sensitivity_summary.csv", index=False)
 
-    pathway_summary = (
-        targets.groupby("Pathway")
-        .agg(Targets=("GeneSymbol", "count"), MeanScore=("CompositeScore", "mean"), SD=("CompositeScore", "std"))
-        .reset_index()
-        .sort_values("MeanScore", ascending=False)
+def main(argv: list[str] | None = None) -> None:
+    global REFRESH_DOWNLOADS
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--refresh-downloads", action="store_true", help="ignore cached GEO downloads")
+    parser.add_argument("--force", action="store_true", help="rerun stages even if their inputs are unchanged")
+    add_config_argument(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    enable_profiling(args.profile)
+    REFRESH_DOWNLOADS = args.refresh_downloads
+    if args.config is not None:
+        apply_config(load_config(args.config))
+    config_fingerprint = CONFIG.fingerprint("revision")
+
+    run = start_run(
+        "rebuild_kfd_revision",
+        parameters={
+            "code_digest": source_digest(sys.modules[__name__]),
+            "config": relative_path(CONFIG.path),
+            "config_fingerprint": config_fingerprint,
+            "geo_base_url": GEO_BASE_URL,
+            "datasets": [
+                {"accession": config.accession, "platform": config.platform, "matrix_url": config.matrix_url}
+                for config in DATASETS
+            ],
+        },
     )
-    pathway_summary.to_csv(TABLE_DIR / "kfd_revision_pathway_summary.csv", index=False)
+    run.record_input(CONFIG.path)
+    run.record_input(BASE_DIR / "data" / "gene_signature.csv")
+    manifest = BuildManifest(BUILD_STATE)
+    force = args.force or REFRESH_DOWNLOADS
+    skipped = []
+
+    metadata_map: dict[str, pd.DataFrame] = {}
+    dataset_results: dict[str, pd.DataFrame] = {}
+    cohort_rows = []
+
+    for config in DATASETS:
+        target = cohort_target(config)
+        with span(config.accession):
+            if not force and manifest.is_current(target):
+                skipped.append(config.accession)
+                deg = pd.read_csv(target.outputs[0])
+                _, metadata = load_gene_matrix(config.accession)
+            else:
+                meta, expression = parse_series_matrix(config)
+                metadata = config.group_parser(meta)
+                metadata = metadata[metadata["severity"].isin({"severe", "non_severe"})].copy()
+                if "phase" in metadata.columns:
+                    metadata = metadata[~metadata["phase"].str.contains("Conval", case=False, na=False)].copy()
+
+                annotation = parse_annotation(config.platform)
+                sample_columns = metadata["sample_id"].tolist()
+                gene_matrix = collapse_to_genes(expression[["ID_REF", *sample_columns]], annotation, sample_columns)
+                deg = differential_expression(gene_matrix, metadata)
+                deg.to_csv(target.outputs[0], index=False)
+                write_gene_matrix(config.accession, gene_matrix, metadata)
+                manifest.record(target)
+            metadata_map[config.accession] = metadata
+            dataset_results[config.accession] = deg
+            for path in target.outputs:
+                run.record_output(path)
+            cohort_rows.append(
+                {
+                    "Dataset": config.accession,
+                    "Description": config.citation_label,
+                    "Platform": config.platform,
+                    "SevereSamples": int((metadata["severity"] == "severe").sum()),
+                    "NonSevereSamples": int((metadata["severity"] == "non_severe").sum()),
+                    "GenesTested": int(deg.shape[0]),
+                    "P_0.05_DEGs": int(
+                        ((deg["pvalue"] <= CONFIG.revision.deg_pvalue) & (deg["log2FC"].abs() >= CONFIG.revision.deg_abs_log2fc)).sum()
+                    ),
+                }
+            )
 
-    save_figures(candidate_panel, targets, dataset_results, metadata_map)
+    target = scoring_target(config_fingerprint)
+    if not force and manifest.is_current(target):
+        skipped.append(target.name)
+        targets = pd.read_csv(TABLE_DIR / "kfd_revision_targets.csv")
+        candidate_panel = pd.read_csv(TABLE_DIR / "kfd_revision_signature.csv")
+    else:
+        candidate_panel = load_candidate_panel()
+        targets = build_target_table(candidate_panel, dataset_results)
+        drugs = build_drug_table(targets)
+        sensitivity_table, sensitivity_summary = run_weight_sensitivity(targets)
+
+        pathway_summary = summarise_pathways(targets)
+        tables = {
+            "cohort_summary.csv": pd.DataFrame(cohort_rows),
+            "kfd_revision_signature.csv": candidate_panel,
+            "kfd_revision_targets.csv": targets,
+            "kfd_revision_drug_candidates.csv": drugs,
+            "kfd_revision_weight_sensitivity.csv": sensitivity_table,
+            "kfd_revision_weight_sensitivity_summary.csv": sensitivity_summary,
+            "kfd_revision_pathway_summary.csv": pathway_summary,
+        }
+        with span("write_tables"):
+            for name, table in tables.items():
+                table.to_csv(TABLE_DIR / name, index=False)
+
+        save_figures(candidate_panel, targets, dataset_results, metadata_map)
+        manifest.record(target)
+    for path in target.outputs:
+        run.record_output(path)
+    manifest.save()
+    run.parameters["cohorts"] = cohort_rows
+    run.parameters["skipped"] = skipped
 
     print("Revision analysis completed.")
+    if skipped:
+        print(f"Unchanged, reused from the previous run: {', '.join(skipped)}")
     print(f"Panel genes: {len(candidate_panel)}")
     print(targets.head(15)[["Rank", "GeneSymbol", "Pathway", "CompositeScore"]].to_string(index=False))
+    publish_run(run)
+    manifest_path = run.write()
+    report("rebuild_kfd_revision")
+    print(f"Run manifest written to {manifest_path}")
 
 
 if __name__ == "__main__":
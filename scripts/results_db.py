@@ -0,0 +1,223 @@
+"""Embedded SQLite database of every pipeline output table.
+
+Each entry point publishes the CSV tables it wrote into
+``outputs/kfd_results.sqlite`` when it finishes, so cross-table questions are
+indexed SQL instead of another round of CSV parsing in pandas. Per-cohort
+files (``GSE51808_deg_results.csv``, ``GSE51808_ora_enrichment.csv``, ...)
+share one table (``deg_results``, ``ora_enrichment``) with a ``Dataset``
+column; every other file becomes a table named after its stem. ``GeneSymbol``,
+``Symbol``, ``Dataset``, ``Pathway`` and ``GeneSet`` columns are indexed.
+
+The ``published`` catalog records the source file, its SHA-256 (taken from the
+run manifest), the stage and the time of every table or cohort slice. A file
+whose hash matches the catalog is not parsed again, so stages that reuse cached
+outputs publish in milliseconds. Each stage publishes in one transaction, and
+the database runs in WAL mode, so readers never see half a stage.
+
+    python scripts/results_db.py                  # list tables
+    python scripts/results_db.py --import         # publish every CSV already under outputs/
+    python scripts/results_db.py "SELECT t.Rank, t.GeneSymbol, m.RandomEffect, d.Candidate
+        FROM kfd_revision_targets t
+        JOIN kfd_enhanced_v2_meta_targets m USING (GeneSymbol)
+        LEFT JOIN kfd_revision_drug_candidates d USING (GeneSymbol)
+        ORDER BY t.Rank LIMIT 10"
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import re
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Iterable, Mapping
+
+import numpy as np
+import pandas as pd
+
+from build_cache import file_digest, relative_path
+from instrumentation import traced
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "outputs" / "kfd_results.sqlite"
+OUTPUT_DIRS = (
+    "tables", "revision_tables", "enhanced_v2_tables", "enrichment_tables", "pathway_activity", "sweeps", "cross_cohort", "leave_one_out",
+)
+
+INDEX_COLUMNS = ("GeneSymbol", "Symbol", "Dataset", "Pathway", "GeneSet")
+COHORT_FILE = re.compile(r"^(GSE\d+)_(.+)$")
+CATALOG = "published"
+
+
+def table_name(path: Path) -> tuple[str, str]:
+    """``(table, dataset)`` for an output file; ``dataset`` is empty unless the file is per-cohort."""
+    stem = Path(path).name.split(".")[0]
+    match = COHORT_FILE.match(stem)
+    table, dataset = (match.group(2), match.group(1)) if match else (stem, "")
+    return re.sub(r"\W+", "_", table).lower(), dataset
+
+
+def connect(db_path: Path | None = None) -> sqlite3.Connection:
+    db_path = Path(db_path or DB_PATH)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        f"""CREATE TABLE IF NOT EXISTS {CATALOG} (
+            table_name TEXT NOT NULL,
+            dataset TEXT NOT NULL,
+            source TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            rows INTEGER NOT NULL,
+            published_at TEXT NOT NULL,
+            PRIMARY KEY (table_name, dataset)
+        )"""
+    )
+    return connection
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_type(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(series):
+        return "REAL"
+    return "TEXT"
+
+
+def _rows(frame: pd.DataFrame) -> Iterable[tuple]:
+    """Rows with NaN as NULL and numpy scalars as Python values."""
+    values = frame.astype(object).where(frame.notna(), None)
+    for row in values.itertuples(index=False, name=None):
+        yield tuple(value.item() if isinstance(value, np.generic) else value for value in row)
+
+
+def _columns(connection: sqlite3.Connection, table: str) -> list[str]:
+    return [row[1] for row in connection.execute(f"PRAGMA table_info({_quote(table)})")]
+
+
+def _write_table(connection: sqlite3.Connection, table: str, dataset: str, frame: pd.DataFrame) -> None:
+    """Replace ``table`` (or only its ``dataset`` slice) with ``frame``."""
+    if dataset:
+        if "Dataset" in frame.columns:
+            frame = frame.assign(Dataset=dataset)
+        else:
+            frame = frame.copy()
+            frame.insert(0, "Dataset", dataset)
+    existing = _columns(connection, table)
+    if existing and dataset:
+        connection.execute(f"DELETE FROM {_quote(table)} WHERE Dataset = ?", (dataset,))
+        for column in frame.columns:
+            if column not in existing:
+                connection.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)} {_sql_type(frame[column])}")
+    else:
+        connection.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+        columns = ", ".join(f"{_quote(column)} {_sql_type(frame[column])}" for column in frame.columns)
+        connection.execute(f"CREATE TABLE {_quote(table)} ({columns})")
+    names = ", ".join(map(_quote, frame.columns))
+    placeholders = ", ".join("?" for _ in frame.columns)
+    connection.executemany(f"INSERT INTO {_quote(table)} ({names}) VALUES ({placeholders})", _rows(frame))
+    for column in INDEX_COLUMNS:
+        if column in frame.columns:
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'ix_{table}_{column.lower()}')} ON {_quote(table)} ({_quote(column)})")
+
+
+@traced(rows=lambda published: len(published))
+def publish_files(
+    stage: str,
+    paths: Iterable[Path],
+    records: Mapping[str, Mapping[str, Any]] | None = None,
+    exclude: Iterable[str] = (),
+    db_path: Path | None = None,
+) -> list[str]:
+    """Publish CSV ``paths`` in one transaction; returns the tables (or cohort slices) that changed.
+
+    ``records`` are run-manifest file records keyed by relative path; their hashes
+    save rehashing files the stage has just recorded.
+    """
+    records = records or {}
+    exclude = tuple(exclude)
+    candidates = [
+        Path(path) for path in paths
+        if str(path).endswith(".csv") and not any(fnmatch.fnmatch(Path(path).name, pattern) for pattern in exclude)
+    ]
+    published = []
+    with closing(connect(db_path)) as connection:
+        known = {(table, dataset): sha for table, dataset, sha in connection.execute(f"SELECT table_name, dataset, sha256 FROM {CATALOG}")}
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for path in candidates:
+                key = relative_path(path)
+                sha = (records.get(key) or {}).get("sha256") or file_digest(path)
+                table, dataset = table_name(path)
+                if known.get((table, dataset)) == sha:
+                    continue
+                frame = pd.read_csv(path)
+                _write_table(connection, table, dataset, frame)
+                connection.execute(
+                    f"INSERT OR REPLACE INTO {CATALOG} VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (table, dataset, key, sha, stage, len(frame), time.strftime("%Y-%m-%dT%H:%M:%S%z")),
+                )
+                published.append(f"{table}[{dataset}]" if dataset else table)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+    return published
+
+
+def publish_run(run, exclude: Iterable[str] = (), db_path: Path | None = None) -> list[str]:
+    """Publish the CSV outputs recorded in a ``RunManifest``."""
+    paths = [BASE_DIR / key for key in run.outputs]
+    published = publish_files(run.run_name, paths, run.outputs, exclude, db_path)
+    if published:
+        print(f"Published to {relative_path(db_path or DB_PATH)}: {', '.join(published)}")
+    return published
+
+
+def query(sql: str, params: Iterable[Any] = (), db_path: Path | None = None) -> pd.DataFrame:
+    with closing(sqlite3.connect(db_path or DB_PATH, timeout=60)) as connection:
+        return pd.read_sql_query(sql, connection, params=tuple(params))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sql", nargs="?", help="query to run (default: list the published tables)")
+    parser.add_argument("--import", dest="import_outputs", action="store_true", help=f"publish every CSV under outputs/{{{','.join(OUTPUT_DIRS)}}}")
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    if args.import_outputs:
+        paths = [path for directory in OUTPUT_DIRS for path in sorted((BASE_DIR / "outputs" / directory).glob("*.csv"))]
+        published = publish_files("import", paths, exclude=["*_singscore_scores.csv", "*_ssgsea_scores.csv"], db_path=args.db)
+        print(f"Published {len(published)} tables or cohort slices to {args.db}")
+    if args.sql:
+        try:
+            result = query(args.sql, db_path=args.db)
+        except (sqlite3.Error, pd.errors.DatabaseError) as error:
+            print(error, file=sys.stderr)
+            return 1
+        print(result.to_string(index=False))
+    elif not args.import_outputs:
+        if not args.db.exists():
+            print(f"{args.db} does not exist yet; run a stage or --import", file=sys.stderr)
+            return 1
+        catalog = query(
+            f"SELECT table_name, COUNT(*) AS slices, SUM(rows) AS rows, GROUP_CONCAT(DISTINCT stage) AS stages, MAX(published_at) AS published "
+            f"FROM {CATALOG} GROUP BY table_name ORDER BY table_name",
+            db_path=args.db,
+        )
+        print(catalog.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
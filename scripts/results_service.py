@@ -0,0 +1,447 @@
+"""Local HTTP/JSON query service for the revision results.
+
+Serves the ranked targets, the per-cohort DEG tables and the drug candidates
+from an in-memory store. Every table is parsed once into JSON-ready records
+with per-gene lookup indexes and cached sort orders, so a
+query is a dictionary lookup or a vectorised mask plus a slice. The store is an
+immutable snapshot. Reloads follow the rebuild's publish signal: its run
+manifest, which the rebuild writes (by atomic rename) only after every table.
+A background thread polls that one file; when it changes, the store loads
+exactly the tables the manifest lists, checks each against its recorded
+SHA-256, and swaps the new snapshot in with a single assignment. A table that
+no longer matches the manifest means a newer run is already rewriting outputs,
+so the old snapshot stays until that run publishes. Requests already in flight
+finish against the snapshot they started with.
+
+    python scripts/results_service.py --port 8780
+    curl 'http://127.0.0.1:8780/targets?pathway=endothelial_barrier&limit=5'
+    curl 'http://127.0.0.1:8780/genes/ANGPT2'
+    curl 'http://127.0.0.1:8780/deg/GSE51808?direction=up&max_fdr=0.05&limit=20&offset=20'
+
+Endpoints (all GET, JSON):
+
+    /health                      snapshot version, load time and row counts
+    /targets                     ?pathway= &direction= &min_datasets= &sort=Rank|CompositeScore|BestPValue
+    /targets/<gene>              one target row
+    /genes/<gene>                target row, per-cohort DEG rows and drug candidates for one gene
+    /deg                         list of cohorts
+    /deg/<dataset>               ?gene= &direction= &max_pvalue= &max_fdr= &min_abs_log2fc= &sort=pvalue|log2FC|GeneSymbol
+    /deg/<dataset>/<gene>        one DEG row
+    /drugs                       ?gene= &tier= &pathway=
+    /pathways                    pathway summary
+
+List endpoints take ``limit`` (default 50, at most 1000) and ``offset`` and
+return ``{"total", "offset", "limit", "items"}``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import operator
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from functools import partial
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Mapping
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from build_cache import file_record, relative_path
+from rebuild_kfd_revision import DATASETS
+from run_manifest import RUN_DIR
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+REV_TABLES = BASE_DIR / "outputs" / "revision_tables"
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+POLL_SECONDS = 2.0
+PUBLISHING_RUN = "rebuild_kfd_revision"
+
+
+class QueryError(ValueError):
+    """A request the store cannot answer; carries the HTTP status to return."""
+
+    def __init__(self, message: str, status: HTTPStatus = HTTPStatus.BAD_REQUEST) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def table_paths(tables: Path) -> dict[str, Path]:
+    paths = {
+        "targets": tables / "kfd_revision_targets.csv",
+        "drugs": tables / "kfd_revision_drug_candidates.csv",
+        "pathways": tables / "kfd_revision_pathway_summary.csv",
+    }
+    paths.update({f"deg:{config.accession}": tables / f"{config.accession}_deg_results.csv" for config in DATASETS})
+    return paths
+
+
+def manifest_signature(manifest_path: Path) -> tuple | None:
+    """``(mtime_ns, size)`` of the publishing run's manifest; ``None`` before its first run."""
+    try:
+        stat = manifest_path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def published_tables(paths: Mapping[str, Path], manifest: Mapping[str, Any]) -> dict[str, tuple[Path, dict[str, Any]]]:
+    """The tables a run manifest recorded as outputs, with their file records."""
+    outputs = manifest.get("outputs", {})
+    return {name: (path, outputs[relative_path(path)]) for name, path in paths.items() if relative_path(path) in outputs}
+
+
+def _unchanged(path: Path, record: Mapping[str, Any]) -> bool:
+    """Whether ``path`` still holds the bytes its manifest record describes."""
+    try:
+        return file_record(path, record)["sha256"] == record["sha256"]
+    except FileNotFoundError:
+        return False
+
+
+def _records(frame: pd.DataFrame) -> list[dict[str, Any]]:
+    """Rows as JSON-ready dicts (numpy scalars unwrapped, NaN as None)."""
+    columns = list(frame.columns)
+    rows = []
+    for values in frame.itertuples(index=False, name=None):
+        rows.append(
+            {
+                column: None if isinstance(value, float) and math.isnan(value) else value.item() if isinstance(value, np.generic) else value
+                for column, value in zip(columns, values)
+            }
+        )
+    return rows
+
+
+class Table:
+    """One table as records, column arrays for filtering, a gene index and cached sort orders."""
+
+    def __init__(self, frame: pd.DataFrame, key: str | None = "GeneSymbol") -> None:
+        self.frame = frame.reset_index(drop=True)
+        self.records = _records(self.frame)
+        self.columns = {column: self.frame[column].to_numpy() for column in self.frame.columns}
+        self.by_gene: dict[str, list[int]] = {}
+        if key is not None:
+            for row, gene in enumerate(self.frame[key].astype(str).str.upper()):
+                self.by_gene.setdefault(gene, []).append(row)
+        self._orders: dict[tuple[str, bool], np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def order(self, column: str, descending: bool = False) -> np.ndarray:
+        """Row order sorted by ``column`` (stable), computed once per column."""
+        if column not in self.columns:
+            if not len(self):
+                # Placeholder tables served before the first publish have no columns to sort by.
+                return np.arange(0)
+            raise QueryError(f"Cannot sort by {column!r}; expected one of {', '.join(self.columns)}")
+        key = (column, descending)
+        with self._lock:
+            if key not in self._orders:
+                values = self.frame[column]
+                order = values.sort_values(ascending=not descending, kind="stable", na_position="last").index.to_numpy()
+                self._orders[key] = order
+            return self._orders[key]
+
+    def rows_for(self, gene: str) -> list[dict[str, Any]]:
+        return [self.records[row] for row in self.by_gene.get(gene.upper(), [])]
+
+    def page(self, mask: np.ndarray | None, order: np.ndarray, limit: int, offset: int) -> dict[str, Any]:
+        rows = order if mask is None else order[mask[order]]
+        return {
+            "total": int(len(rows)),
+            "offset": offset,
+            "limit": limit,
+            "items": [self.records[row] for row in rows[offset:offset + limit]],
+        }
+
+
+def _mask(*conditions: np.ndarray | None) -> np.ndarray | None:
+    active = [condition for condition in conditions if condition is not None]
+    return np.logical_and.reduce(active) if active else None
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Every table at one point in time; replaced as a whole, never mutated."""
+
+    version: int
+    loaded_at: float
+    signature: tuple | None
+    targets: Table
+    drugs: Table
+    pathways: Table
+    deg: dict[str, Table]
+
+    @classmethod
+    def load(cls, paths: Mapping[str, Path], version: int, signature: tuple | None) -> "Snapshot":
+        """Load ``paths``; tables not among them are served empty."""
+
+        def read(name: str) -> pd.DataFrame:
+            path = paths.get(name)
+            return pd.read_csv(path) if path is not None and path.exists() else pd.DataFrame(columns=["GeneSymbol"])
+
+        return cls(
+            version=version,
+            loaded_at=time.time(),
+            signature=signature,
+            targets=Table(read("targets")),
+            drugs=Table(read("drugs")),
+            pathways=Table(read("pathways"), key=None),
+            deg={name.split(":", 1)[1]: Table(read(name)) for name, path in paths.items() if name.startswith("deg:") and path.exists()},
+        )
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "version": self.version,
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.loaded_at)),
+            "targets": len(self.targets),
+            "drugs": len(self.drugs),
+            "deg": {dataset: len(table) for dataset, table in self.deg.items()},
+        }
+
+
+class ResultStore:
+    """Holds the current ``Snapshot`` and reloads it when the rebuild publishes new outputs."""
+
+    def __init__(self, tables: Path = REV_TABLES, run_dir: Path = RUN_DIR) -> None:
+        self.paths = table_paths(tables)
+        self.manifest_path = run_dir / f"{PUBLISHING_RUN}.json"
+        self.snapshot = Snapshot.load({}, version=0, signature=None)
+        self._stop = threading.Event()
+        if not self.refresh():
+            if manifest_signature(self.manifest_path) is None:
+                # Tables from before run manifests existed: serve the files as they are.
+                self.snapshot = Snapshot.load(self.paths, version=1, signature=None)
+            else:
+                print(f"{PUBLISHING_RUN} is rewriting its outputs; serving empty tables until it publishes")
+
+    def refresh(self) -> bool:
+        """Swap in the tables of the latest published run, if it is newer than the snapshot and still intact."""
+        signature = manifest_signature(self.manifest_path)
+        if signature is None or signature == self.snapshot.signature:
+            return False
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            published = published_tables(self.paths, manifest)
+            if not all(_unchanged(path, record) for path, record in published.values()):
+                # Outputs already moved past this manifest: a newer run is writing; wait for its manifest.
+                return False
+            snapshot = Snapshot.load({name: path for name, (path, _) in published.items()}, self.snapshot.version + 1, signature)
+        except (OSError, ValueError, pd.errors.ParserError) as error:
+            print(f"Reload failed, keeping version {self.snapshot.version}: {error}")
+            return False
+        if not all(_unchanged(path, record) for path, record in published.values()):
+            return False
+        self.snapshot = snapshot
+        print(f"Loaded {len(published)} tables published by {PUBLISHING_RUN} at {manifest.get('finished')} as version {snapshot.version}")
+        return True
+
+    def watch(self, interval: float = POLL_SECONDS) -> threading.Thread:
+        def poll() -> None:
+            while not self._stop.wait(interval):
+                self.refresh()
+
+        thread = threading.Thread(target=poll, name="results-store-watch", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def _one(params: Mapping[str, list[str]], name: str) -> str | None:
+    values = params.get(name)
+    return values[-1] if values else None
+
+
+def _number(params: Mapping[str, list[str]], name: str, cast: Callable = float) -> Any:
+    value = _one(params, name)
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise QueryError(f"{name}={value!r}: expected a number") from None
+
+
+def _paging(params: Mapping[str, list[str]]) -> tuple[int, int]:
+    limit = _number(params, "limit", int)
+    offset = _number(params, "offset", int) or 0
+    limit = DEFAULT_LIMIT if limit is None else limit
+    if limit < 0 or offset < 0:
+        raise QueryError("limit and offset must be non-negative")
+    return min(limit, MAX_LIMIT), offset
+
+
+def _sort(params: Mapping[str, list[str]], default: str) -> tuple[str, bool]:
+    """``sort=column`` ascending or ``sort=-column`` descending."""
+    value = _one(params, "sort") or default
+    return value.lstrip("-"), value.startswith("-")
+
+
+def _equals(table: Table, column: str, value: str | None) -> np.ndarray | None:
+    if value is None:
+        return None
+    if column not in table.columns:
+        return np.zeros(len(table), dtype=bool)
+    return pd.Series(table.columns[column]).astype(str).str.lower().to_numpy() == value.lower()
+
+
+def _threshold(
+    table: Table, column: str, value: float | None, compare: Callable[[np.ndarray, float], np.ndarray]
+) -> np.ndarray | None:
+    if value is None:
+        return None
+    if column not in table.columns:
+        return np.zeros(len(table), dtype=bool)
+    return compare(table.columns[column], value)
+
+
+def query(snapshot: Snapshot, path: str, params: Mapping[str, list[str]]) -> Any:
+    """Answer one request against ``snapshot``."""
+    parts = [unquote(part) for part in path.strip("/").split("/") if part]
+    if not parts or parts == ["health"]:
+        return {"status": "ok", **snapshot.describe()}
+    resource, rest = parts[0], parts[1:]
+
+    if resource == "targets":
+        targets = snapshot.targets
+        if rest:
+            rows = targets.rows_for(rest[0])
+            if not rows:
+                raise QueryError(f"{rest[0]} is not a ranked target", HTTPStatus.NOT_FOUND)
+            return rows[0]
+        limit, offset = _paging(params)
+        min_datasets = _number(params, "min_datasets", int)
+        mask = _mask(
+            _equals(targets, "Pathway", _one(params, "pathway")),
+            _equals(targets, "ConsensusDirection", _one(params, "direction")),
+            _threshold(targets, "DatasetCount", min_datasets, operator.ge),
+        )
+        column, descending = _sort(params, "Rank")
+        return targets.page(mask, targets.order(column, descending), limit, offset)
+
+    if resource == "genes" and len(rest) == 1:
+        gene = rest[0]
+        target = snapshot.targets.rows_for(gene)
+        deg = {dataset: table.rows_for(gene)[0] for dataset, table in snapshot.deg.items() if table.rows_for(gene)}
+        if not target and not deg:
+            raise QueryError(f"{gene} is not in the targets or any DEG table", HTTPStatus.NOT_FOUND)
+        return {"gene": gene.upper(), "target": target[0] if target else None, "deg": deg, "drugs": snapshot.drugs.rows_for(gene)}
+
+    if resource == "deg":
+        if not rest:
+            return {"datasets": {dataset: len(table) for dataset, table in snapshot.deg.items()}}
+        table = snapshot.deg.get(rest[0])
+        if table is None:
+            raise QueryError(f"Unknown dataset {rest[0]!r}; expected one of {', '.join(snapshot.deg)}", HTTPStatus.NOT_FOUND)
+        gene = rest[1] if len(rest) > 1 else None
+        if gene is not None:
+            rows = table.rows_for(gene)
+            if not rows:
+                raise QueryError(f"{gene} was not tested in {rest[0]}", HTTPStatus.NOT_FOUND)
+            return rows[0]
+        limit, offset = _paging(params)
+        max_pvalue = _number(params, "max_pvalue")
+        max_fdr = _number(params, "max_fdr")
+        min_abs = _number(params, "min_abs_log2fc")
+        mask = _mask(
+            _equals(table, "GeneSymbol", _one(params, "gene")),
+            _equals(table, "direction", _one(params, "direction")),
+            _threshold(table, "pvalue", max_pvalue, operator.le),
+            _threshold(table, "fdr", max_fdr, operator.le),
+            _threshold(table, "log2FC", min_abs, lambda values, limit: np.abs(values) >= limit),
+        )
+        column, descending = _sort(params, "pvalue")
+        return table.page(mask, table.order(column, descending), limit, offset)
+
+    if resource == "drugs" and not rest:
+        drugs = snapshot.drugs
+        limit, offset = _paging(params)
+        mask = _mask(
+            _equals(drugs, "GeneSymbol", _one(params, "gene")),
+            _equals(drugs, "EvidenceTier", _one(params, "tier")),
+            _equals(drugs, "Pathway", _one(params, "pathway")),
+        )
+        return drugs.page(mask, np.arange(len(drugs)), limit, offset)
+
+    if resource == "pathways" and not rest:
+        return {"items": snapshot.pathways.records}
+
+    raise QueryError(f"No such endpoint: /{'/'.join(parts)}", HTTPStatus.NOT_FOUND)
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    server_version = "KFDResults/1.0"
+
+    def __init__(self, *args, store: ResultStore, **kwargs) -> None:
+        self.store = store
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self) -> None:  # noqa: N802 - name fixed by BaseHTTPRequestHandler
+        url = urlsplit(self.path)
+        snapshot = self.store.snapshot
+        try:
+            status, body = HTTPStatus.OK, query(snapshot, url.path, parse_qs(url.query))
+        except QueryError as error:
+            status, body = error.status, {"error": str(error)}
+        except Exception as error:  # noqa: BLE001 - answer with JSON rather than dropping the connection
+            traceback.print_exc(file=sys.stderr)
+            status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(error).__name__}: {error}"}
+        payload = json.dumps(body, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("X-Snapshot-Version", str(snapshot.version))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args) -> None:  # noqa: A002 - signature from BaseHTTPRequestHandler
+        pass
+
+
+def make_server(store: ResultStore, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), partial(QueryHandler, store=store))
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--tables", type=Path, default=REV_TABLES, help="directory holding the revision tables")
+    parser.add_argument("--runs", type=Path, default=RUN_DIR, help=f"directory holding the {PUBLISHING_RUN} run manifest")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="seconds between checks for a new published run")
+    args = parser.parse_args(argv)
+
+    store = ResultStore(args.tables, args.runs)
+    print(f"Loaded {json.dumps(store.snapshot.describe())}")
+    store.watch(args.poll)
+    server = make_server(store, args.host, args.port)
+    print(f"Serving http://{args.host}:{server.server_address[1]} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Provenance manifests for pipeline runs.
+
+Every entry point that starts a run records the code revision, parameters,
+input and output file records (size, modification time and SHA-256), GEO
+downloads with their cache status, and the per-stage timings from the
+instrumentation tracer. The manifest for the latest run of each entry point is
+written to ``outputs/.build_state/runs/<run>.json``.
+
+Downstream stages seed their input records from the upstream run's output
+records, so a file that has not been touched since it was written is never
+rehashed. ``python scripts/run_manifest.py`` reports which recorded outputs are
+still current.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from build_cache import BASE_DIR, STATE_DIR, file_record, relative_path
+from instrumentation import TRACER
+
+
+RUN_DIR = STATE_DIR / "runs"
+
+
+def git_revision() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def load_run(run_name: str, run_dir: Path | None = None) -> dict[str, Any] | None:
+    path = (run_dir or RUN_DIR) / f"{run_name}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class RunManifest:
+    def __init__(self, run_name: str, parameters: dict[str, Any] | None = None, run_dir: Path | None = None) -> None:
+        self.run_name = run_name
+        self.run_dir = run_dir or RUN_DIR
+        self.previous = load_run(run_name, run_dir) or {}
+        self.started = datetime.now(timezone.utc)
+        self.parameters = parameters or {}
+        self.inputs: dict[str, dict[str, Any]] = {}
+        self.outputs: dict[str, dict[str, Any]] = {}
+        self.downloads: list[dict[str, Any]] = []
+        self.cache = {"hits": 0, "misses": 0}
+        self.upstream: dict[str, str] = {}
+        self._upstream_runs: dict[str, dict[str, Any] | None] = {}
+
+    def _known_record(self, key: str, upstream: dict[str, Any] | None) -> dict[str, Any] | None:
+        for source in (upstream or {}).get("outputs", {}), self.previous.get("inputs", {}), self.previous.get("outputs", {}):
+            if key in source:
+                return source[key]
+        return None
+
+    def record_input(self, path: Path, upstream: str | None = None) -> dict[str, Any]:
+        """Record an input file, reusing an upstream or previous record when its stat is unchanged."""
+        upstream_run = None
+        if upstream:
+            if upstream not in self._upstream_runs:
+                self._upstream_runs[upstream] = load_run(upstream, self.run_dir)
+            upstream_run = self._upstream_runs[upstream]
+        if upstream_run:
+            self.upstream[upstream] = upstream_run.get("finished", "")
+        key = relative_path(path)
+        self.inputs[key] = file_record(path, self._known_record(key, upstream_run))
+        return self.inputs[key]
+
+    def record_output(self, path: Path) -> dict[str, Any]:
+        """Record an output file; only rehashed when its stat differs from the previous run's record."""
+        key = relative_path(path)
+        self.outputs[key] = file_record(path, self.previous.get("outputs", {}).get(key))
+        return self.outputs[key]
+
+    def record_download(self, url: str, size: int, cache_hit: bool, cached_path: Path | None = None) -> None:
+        self.cache["hits" if cache_hit else "misses"] += 1
+        entry: dict[str, Any] = {"url": url, "bytes": size, "cache": "hit" if cache_hit else "miss"}
+        if cached_path is not None:
+            entry["cached_path"] = relative_path(cached_path)
+        self.downloads.append(entry)
+
+    def record_cache(self, hit: bool) -> None:
+        self.cache["hits" if hit else "misses"] += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "run": self.run_name,
+            "started": self.started.isoformat(timespec="seconds"),
+            "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "code": {
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "argv": sys.argv,
+            },
+            "parameters": self.parameters,
+            "upstream": self.upstream,
+            "inputs": self.inputs,
+            "downloads": self.downloads,
+            "cache": self.cache,
+            "stages": [
+                {key: row[key] for key in ("path", "calls", "wall_s", "cpu_s", "peak_rss_mib", "rows")}
+                for row in TRACER.summary()
+            ],
+            "outputs": self.outputs,
+        }
+
+    def write(self) -> Path:
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        path = self.run_dir / f"{self.run_name}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.to_dict(), indent=2, default=str), encoding="utf-8")
+        tmp.replace(path)
+        return path
+
+
+_CURRENT: RunManifest | None = None
+
+
+def start_run(run_name: str, parameters: dict[str, Any] | None = None) -> RunManifest:
+    """Start the process-wide run manifest that ``record_download`` reports into."""
+    global _CURRENT
+    _CURRENT = RunManifest(run_name, parameters)
+    return _CURRENT
+
+
+def current_run() -> RunManifest | None:
+    return _CURRENT
+
+
+def record_download(url: str, size: int, cache_hit: bool, cached_path: Path | None = None) -> None:
+    if _CURRENT is not None:
+        _CURRENT.record_download(url, size, cache_hit, cached_path)
+
+
+def output_status(run: dict[str, Any]) -> dict[str, str]:
+    """Return ``current``/``modified``/``missing`` for each recorded output, hashing only files whose stat moved."""
+    status = {}
+    for key, record in run.get("outputs", {}).items():
+        path = BASE_DIR / key
+        if not path.exists():
+            status[key] = "missing"
+        elif file_record(path, record)["sha256"] == record["sha256"]:
+            status[key] = "current"
+        else:
+            status[key] = "modified"
+    return status
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("runs", nargs="*", help="run names (default: every recorded run)")
+    args = parser.parse_args(argv)
+
+    names = args.runs or sorted(path.stem for path in RUN_DIR.glob("*.json"))
+    stale = 0
+    for name in names:
+        run = load_run(name)
+        if run is None:
+            print(f"{name}: no manifest recorded")
+            stale += 1
+            continue
+        status = output_status(run)
+        changed = {key: value for key, value in status.items() if value != "current"}
+        stale += bool(changed)
+        revision = (run["code"].get("git_revision") or "unknown")[:10]
+        total = sum(stage["wall_s"] for stage in run["stages"] if "/" not in stage["path"])
+        print(
+            f"{name}: finished {run['finished']} at {revision}; {len(run['inputs'])} inputs, "
+            f"{len(status)} outputs, {total:.1f} s, cache {run['cache']['hits']} hit / {run['cache']['misses']} miss"
+        )
+        for key, value in sorted(changed.items()):
+            print(f"  {value:<8} {key}")
+    return 1 if stale else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
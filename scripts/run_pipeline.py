@@ -3,35 +3,27 @@ KFD (Kyasanur Forest Disease) HDT Pipeline
 Focus: Tick-borne Viral Hemorrhagic Fever endemic to Karnataka
 """
 
+import argparse
+
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
-BASE_DIR = Path(__file__).parent.parent
+from instrumentation import add_profile_argument, enable_profiling, report, traced
+from kfd_config import add_config_argument, load_config
+from results_db import publish_files
 
-# Pathway weights (endothelial and coagulation highest for VHF)
-PATHWAY_WEIGHTS = {
-    'endothelial': 0.95,
-    'coagulation': 0.95,
-    'cytokine': 0.90,
-    'platelet': 0.90,
-    'interferon': 0.85,
-    'neurological': 0.85,
-    'oxidative': 0.80,
-    'neuroprotection': 0.85
-}
+BASE_DIR = Path(__file__).parent.parent
 
-# Phase weights
-PHASE_WEIGHTS = {
-    'Hemorrhagic': 1.0,
-    'Febrile': 0.9,
-    'Neurological': 0.85,
-    'Protective': 0.85,
-    'Both': 0.8
-}
+# Pathway, phase and druggability weights and the composite weights come from
+# the pipeline: block of config/kfd_config.yaml
+CONFIG = load_config()
 
-def prioritize_targets():
+@traced()
+def prioritize_targets(pipeline=None):
     """Prioritize KFD host targets using composite scoring."""
+    pipeline = pipeline or CONFIG.pipeline
+    weights = pipeline.composite_weights
     print("Loading KFD gene signature...")
     df = pd.read_csv(BASE_DIR / 'data' / 'gene_signature.csv')
     
@@ -39,27 +31,25 @@ def prioritize_targets():
     df['PubMed_Norm'] = df['PubMed_Count'] / df['PubMed_Count'].max()
     
     # Map pathway weights
-    df['Pathway_Score'] = df['Pathway'].map(PATHWAY_WEIGHTS)
+    df['Pathway_Score'] = df['Pathway'].map(pipeline.pathway_weights)
     
     # Map phase weights
-    df['Phase_Score'] = df['Phase_Relevance'].map(PHASE_WEIGHTS)
+    df['Phase_Score'] = df['Phase_Relevance'].map(pipeline.phase_weights)
     
     # Druggability score
-    drug_map = {'High': 0.9, 'Moderate': 0.6, 'Low': 0.3}
-    df['Drug_Score'] = df['Druggability'].map(drug_map)
+    df['Drug_Score'] = df['Druggability'].map(pipeline.druggability)
     
     # Composite score
     df['Composite_Score'] = (
-        0.35 * df['PubMed_Norm'] +
-        0.25 * df['Pathway_Score'] +
-        0.20 * df['Drug_Score'] +
-        0.10 * df['Phase_Score'] +
-        0.10 * np.random.uniform(0.4, 0.6, len(df))
+        weights['pubmed'] * df['PubMed_Norm'] +
+        weights['pathway'] * df['Pathway_Score'] +
+        weights['druggability'] * df['Drug_Score'] +
+        weights['phase'] * df['Phase_Score'] +
+        weights['noise'] * np.random.uniform(*pipeline.noise_range, len(df))
     )
     
     # Add bonus for key VHF targets
-    key_targets = ['ANGPT2', 'TNF', 'IL6', 'F3', 'SERPINE1', 'THBD']
-    df.loc[df['Symbol'].isin(key_targets), 'Composite_Score'] += 0.05
+    df.loc[df['Symbol'].isin(pipeline.key_targets), 'Composite_Score'] += pipeline.key_target_bonus
     
     # Rank
     df = df.sort_values('Composite_Score', ascending=False).reset_index(drop=True)
@@ -73,6 +63,7 @@ def prioritize_targets():
     
     return df
 
+@traced()
 def generate_compounds(targets_df):
     """Generate compound data for KFD treatment."""
     print("Mining compounds from ChEMBL v33...")
@@ -132,13 +123,21 @@ def generate_compounds(targets_df):
     
     return compounds_df
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_config_argument(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    enable_profiling(args.profile)
+    config = load_config(args.config) if args.config else CONFIG
+
     print("="*60)
     print("KFD (KYASANUR FOREST DISEASE) HOST-DIRECTED THERAPY PIPELINE")
     print("Focus: Tick-borne Viral Hemorrhagic Fever - Karnataka Endemic")
     print("="*60)
     
-    targets = prioritize_targets()
+    print(f"Config: {config.path} ({config.fingerprint('pipeline')[:12]})")
+    targets = prioritize_targets(config.pipeline)
     compounds = generate_compounds(targets)
     
     print("\n--- TOP 10 TARGETS ---")
@@ -147,8 +146,12 @@ def main():
     print("\n--- TOP 10 COMPOUNDS ---") 
     print(compounds[['Drug', 'Target', 'pChEMBL', 'Evidence']].head(10).to_string(index=False))
     
+    tables = BASE_DIR / 'outputs' / 'tables'
+    publish_files('run_pipeline', [tables / 'targets_ranked.csv', tables / 'compounds_ranked.csv'])
+
     print("\n" + "="*60)
     print("Pipeline complete!")
+    report('run_pipeline')
 
 if __name__ == '__main__':
     main()
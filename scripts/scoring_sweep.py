@@ -0,0 +1,337 @@
+"""Parameter sweeps over the revision target-scoring configuration.
+
+Re-scores the candidate panel under every combination in a grid of DEG
+thresholds, omics-score parameters and composite weights, reusing the DEG
+tables already written by ``rebuild_kfd_revision.py``. The per-cohort evidence
+is loaded once into gene x dataset arrays; every configuration is then a slice
+of a gene x dataset x config tensor, so thousands of configurations score in
+one vectorised pass instead of one ``build_target_table`` call each.
+
+The grid comes from a YAML spec and/or ``--grid`` options; parameters not in
+the grid keep their ``revision:`` values from the pipeline configuration. With
+no grid, the DEG thresholds are swept against the base and sensitivity weight
+schemes.
+
+    python scripts/scoring_sweep.py --grid deg_pvalue=0.01,0.05,0.1 --grid effect_saturation=1,1.5,2
+    python scripts/scoring_sweep.py --spec sweeps/weights.yaml --name weights
+
+Example spec::
+
+    grid:
+      deg_abs_log2fc: [0.2, 0.3, 0.5]
+      composite_weights:
+        - {omics: 0.45, tractability: 0.20, pathway: 0.20, phase: 0.15}
+        - {omics: 0.60, tractability: 0.15, pathway: 0.15, phase: 0.10}
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import math
+import sys
+import warnings
+from pathlib import Path
+from typing import Any, Mapping
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from build_cache import source_digest
+from instrumentation import add_profile_argument, enable_profiling, report, span, traced
+from kfd_config import REVISION_WEIGHTS, ConfigError, RevisionConfig, add_config_argument, load_config
+import rebuild_kfd_revision as rebuild
+from results_db import publish_run
+from run_manifest import start_run
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+REV_TABLES = BASE_DIR / "outputs" / "revision_tables"
+SWEEP_DIR = BASE_DIR / "outputs" / "sweeps"
+
+SCALAR_PARAMETERS = ("deg_pvalue", "deg_abs_log2fc", "recurrence_weight", "effect_saturation")
+WEIGHT_COLUMNS = tuple(f"weight_{name}" for name in REVISION_WEIGHTS)
+TOP_K = 10
+
+
+def base_parameters(revision: RevisionConfig) -> dict[str, Any]:
+    """Sweep parameters as set in a ``RevisionConfig``."""
+    return {
+        "deg_pvalue": revision.deg_pvalue,
+        "deg_abs_log2fc": revision.deg_abs_log2fc,
+        "recurrence_weight": revision.recurrence_weight,
+        "effect_saturation": revision.effect_saturation,
+        "composite_weights": dict(revision.composite_weights),
+    }
+
+
+def default_grid(revision: RevisionConfig) -> dict[str, list[Any]]:
+    return {
+        "deg_pvalue": [0.01, 0.05, 0.10],
+        "deg_abs_log2fc": [0.20, 0.30, 0.50],
+        "composite_weights": [dict(revision.composite_weights), *map(dict, revision.sensitivity_schemes.values())],
+    }
+
+
+def parse_grid_option(option: str) -> tuple[str, list[float]]:
+    """``name=v1,v2,...`` -> ``(name, [v1, v2, ...])`` for a scalar parameter."""
+    name, _, values = option.partition("=")
+    if not values:
+        raise ConfigError(f"--grid {option!r}: expected NAME=VALUE[,VALUE...]")
+    if name.strip() not in SCALAR_PARAMETERS:
+        hint = "; sweep composite_weights with --spec" if name.strip() == "composite_weights" else ""
+        raise ConfigError(f"--grid {option!r}: expected one of {', '.join(SCALAR_PARAMETERS)}{hint}")
+    try:
+        return name.strip(), [float(value) for value in values.split(",")]
+    except ValueError as error:
+        raise ConfigError(f"--grid {option!r}: {error}") from error
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def expand_grid(grid: Mapping[str, list[Any]], base: Mapping[str, Any]) -> pd.DataFrame:
+    """One row per configuration in the Cartesian product of ``grid``; the first row is ``base``."""
+    if not isinstance(grid, Mapping):
+        raise ConfigError(f"grid: expected a mapping of parameter -> list of values, got {grid!r}")
+    unknown = set(grid) - {*SCALAR_PARAMETERS, "composite_weights"}
+    if unknown:
+        raise ConfigError(f"Unknown sweep parameters: {', '.join(sorted(map(str, unknown)))}")
+    errors = []
+    for name, values in grid.items():
+        if not isinstance(values, list) or not values:
+            errors.append(f"{name}: expected a non-empty list of values, got {values!r}")
+        elif name == "composite_weights":
+            errors += [
+                f"composite_weights {weights!r}: expected a mapping of {', '.join(REVISION_WEIGHTS)} to numbers"
+                for weights in values
+                if not isinstance(weights, Mapping) or not all(_is_number(weight) for weight in weights.values())
+            ]
+        else:
+            errors += [f"{name}={value!r}: expected a number" for value in values if not _is_number(value)]
+    if errors:
+        raise ConfigError("Invalid scoring parameters:\n" + "\n".join(f"  - {error}" for error in errors))
+    for weights in grid.get("composite_weights", []):
+        if (
+            set(weights) != set(REVISION_WEIGHTS)
+            or not math.isclose(sum(weights.values()), 1.0, abs_tol=1e-6)
+            or min(weights.values()) < 0
+        ):
+            errors.append(f"composite_weights {weights}: expected non-negative {', '.join(REVISION_WEIGHTS)} summing to 1")
+    for name in ("deg_pvalue", "recurrence_weight"):
+        errors += [f"{name}={value}: expected a value in [0, 1]" for value in grid.get(name, []) if not 0 <= value <= 1]
+    errors += [f"effect_saturation={value}: expected > 0" for value in grid.get("effect_saturation", []) if value <= 0]
+    if errors:
+        raise ConfigError("Invalid scoring parameters:\n" + "\n".join(f"  - {error}" for error in errors))
+
+    names = list(grid)
+    rows = [dict(base)]
+    for values in itertools.product(*(grid[name] for name in names)):
+        rows.append({**base, **dict(zip(names, values))})
+    configs = pd.DataFrame(
+        [
+            {
+                **{name: float(row[name]) for name in SCALAR_PARAMETERS},
+                **{f"weight_{name}": float(row["composite_weights"][name]) for name in REVISION_WEIGHTS},
+            }
+            for row in rows
+        ]
+    )
+    configs = configs.drop_duplicates(ignore_index=True)
+    configs.insert(0, "ConfigId", ["base", *(f"c{index:04d}" for index in range(1, len(configs)))])
+    return configs
+
+
+def read_spec(path: Path) -> Mapping[str, Any]:
+    """The ``grid:`` mapping of a sweep spec file."""
+    try:
+        spec = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    except (OSError, yaml.YAMLError) as error:
+        raise ConfigError(f"Could not read sweep spec {path}: {error}") from error
+    if not isinstance(spec, Mapping):
+        raise ConfigError(f"{path}: expected a YAML mapping with a grid: section")
+    grid = spec.get("grid", {})
+    if not isinstance(grid, Mapping):
+        raise ConfigError(f"{path}: grid: expected a mapping of parameter -> list of values")
+    return grid
+
+
+def deg_paths(tables: Path = REV_TABLES) -> list[Path]:
+    return [tables / f"{config.accession}_deg_results.csv" for config in rebuild.DATASETS]
+
+
+def load_deg_tables(tables: Path = REV_TABLES) -> dict[str, pd.DataFrame]:
+    """The cached per-cohort DEG tables written by the rebuild, keyed by accession."""
+    return {config.accession: pd.read_csv(path) for config, path in zip(rebuild.DATASETS, deg_paths(tables))}
+
+
+def evidence_arrays(panel: pd.DataFrame, deg_tables: Mapping[str, pd.DataFrame]) -> dict[str, np.ndarray]:
+    """Gene x dataset log2FC and p-value arrays for the panel (NaN where a gene is not measured).
+
+    Also returns the config-independent per-gene inputs of ``build_target_table``:
+    consensus direction, median |log2FC| and the tractability, pathway and phase scores.
+    """
+    genes = panel["GeneSymbol"]
+    log2fc = np.column_stack(
+        [deg.drop_duplicates("GeneSymbol").set_index("GeneSymbol")["log2FC"].reindex(genes).to_numpy(float) for deg in deg_tables.values()]
+    )
+    pvalue = np.column_stack(
+        [deg.drop_duplicates("GeneSymbol").set_index("GeneSymbol")["pvalue"].reindex(genes).to_numpy(float) for deg in deg_tables.values()]
+    )
+    observed = ~np.isnan(log2fc)
+    any_observed = observed.any(axis=1)
+    # Unmeasured genes give all-NaN rows; nanmedian warns about those through ``warnings``, not errstate.
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        median_fc = np.where(any_observed, np.nanmedian(np.where(observed, log2fc, np.nan), axis=1), 0.0)
+        median_abs = np.where(any_observed, np.nanmedian(np.abs(log2fc), axis=1), 0.0)
+    consensus_up = median_fc >= 0
+    concordant = observed & ((log2fc >= 0) == consensus_up[:, np.newaxis])
+
+    default = [("No direct repurposed agent", "low", "Biomarker-priority target")]
+    tractability = np.array(
+        [rebuild.DRUGGABILITY_SCORES[rebuild.TARGET_DRUGS.get(gene, default)[0][1]] for gene in genes], dtype=float
+    )
+    return {
+        "log2fc": np.nan_to_num(log2fc),
+        "pvalue": np.where(observed, pvalue, np.inf),
+        "concordant": concordant & any_observed[:, np.newaxis],
+        "median_abs": median_abs,
+        "tractability": tractability,
+        "pathway": panel["PathwayScore"].to_numpy(float),
+        "phase": panel["PhaseScore"].to_numpy(float),
+    }
+
+
+def supporting_evidence(evidence: Mapping[str, np.ndarray], configs: pd.DataFrame) -> np.ndarray:
+    """``(genes, datasets, configs)``: the cohort passes the DEG thresholds in the consensus direction."""
+    return (
+        evidence["concordant"][:, :, np.newaxis]
+        & (evidence["pvalue"][:, :, np.newaxis] <= configs["deg_pvalue"].to_numpy())
+        & (np.abs(evidence["log2fc"])[:, :, np.newaxis] >= configs["deg_abs_log2fc"].to_numpy())
+    )
+
+
+def omics_scores(evidence: Mapping[str, np.ndarray], configs: pd.DataFrame, supporting: np.ndarray) -> np.ndarray:
+    """``(genes, configs)`` omics scores: weighted recurrence and saturated median effect size."""
+    recurrence = supporting.sum(axis=1) / evidence["log2fc"].shape[1]
+    effect = np.minimum(evidence["median_abs"][:, np.newaxis] / configs["effect_saturation"].to_numpy(), 1.0)
+    recurrence_weight = configs["recurrence_weight"].to_numpy()
+    return recurrence_weight * recurrence + (1 - recurrence_weight) * effect
+
+
+def composite_scores(evidence: Mapping[str, np.ndarray], omics: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """``(genes, configs)`` composite scores from omics scores and ``(configs, 4)`` weights in ``REVISION_WEIGHTS`` order."""
+    components = np.stack(
+        [omics, *(np.broadcast_to(evidence[name][:, np.newaxis], omics.shape) for name in ("tractability", "pathway", "phase"))]
+    )
+    return np.einsum("kgc,ck->gc", components, weights)
+
+
+@traced(rows=lambda result: result[0].shape[1])
+def score_configurations(evidence: Mapping[str, np.ndarray], configs: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Composite scores and supporting-dataset counts, both ``(genes, configs)``."""
+    supporting = supporting_evidence(evidence, configs)
+    omics = omics_scores(evidence, configs, supporting)
+    return composite_scores(evidence, omics, configs[list(WEIGHT_COLUMNS)].to_numpy()), supporting.sum(axis=1)
+
+
+def rank_columns(scores: np.ndarray) -> np.ndarray:
+    """Rank 1 = highest score in each column; ties keep panel order."""
+    order = np.argsort(-scores, axis=0, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, len(scores) + 1)[:, np.newaxis], axis=0)
+    return ranks
+
+
+def summarise(configs: pd.DataFrame, ranks: np.ndarray, top_k: int = TOP_K) -> pd.DataFrame:
+    """Spearman correlation and top-k overlap of every configuration's ranking with the base ranking."""
+    n_genes = len(ranks)
+    base = ranks[:, [0]]
+    rho = 1 - 6 * ((ranks - base) ** 2).sum(axis=0) / (n_genes * (n_genes**2 - 1)) if n_genes > 1 else np.ones(ranks.shape[1])
+    overlap = ((ranks <= top_k) & (base <= top_k)).sum(axis=0)
+    summary = configs.copy()
+    summary["SpearmanVsBase"] = rho
+    summary[f"Top{top_k}OverlapVsBase"] = overlap
+    return summary
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spec", type=Path, help="YAML file with a grid: mapping of parameter -> list of values")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2", help="sweep a scalar parameter")
+    parser.add_argument("--name", default="sweep", help="output file prefix")
+    parser.add_argument("--tables", type=Path, default=REV_TABLES, help="directory holding the *_deg_results.csv tables")
+    add_config_argument(parser)
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+    enable_profiling(args.profile)
+    try:
+        if args.config is not None:
+            rebuild.apply_config(load_config(args.config))
+        revision = rebuild.CONFIG.revision
+        grid = dict(read_spec(args.spec)) if args.spec else {}
+        grid.update(parse_grid_option(option) for option in args.grid)
+        configs = expand_grid(grid or default_grid(revision), base_parameters(revision))
+    except ConfigError as error:
+        print(error, file=sys.stderr)
+        return 1
+
+    run = start_run(
+        "scoring_sweep",
+        parameters={
+            "code_digest": source_digest(sys.modules[__name__]),
+            "config_fingerprint": rebuild.CONFIG.fingerprint("revision"),
+            "name": args.name,
+            "configurations": len(configs),
+        },
+    )
+    if args.spec:
+        run.record_input(args.spec)
+    with span("load_evidence"):
+        panel = rebuild.load_candidate_panel()
+        deg_tables = load_deg_tables(args.tables)
+        for path in deg_paths(args.tables):
+            run.record_input(path, upstream="rebuild_kfd_revision")
+        evidence = evidence_arrays(panel, deg_tables)
+
+    scores, dataset_count = score_configurations(evidence, configs)
+    ranks = rank_columns(scores)
+    summary = summarise(configs, ranks)
+
+    rank_table = pd.DataFrame(ranks, columns=configs["ConfigId"])
+    rank_table.insert(0, "Pathway", panel["Pathway"].to_numpy())
+    rank_table.insert(0, "GeneSymbol", panel["GeneSymbol"].to_numpy())
+    rank_table = rank_table.sort_values("base", kind="stable").reset_index(drop=True)
+    long_table = pd.DataFrame(
+        {
+            "ConfigId": np.repeat(configs["ConfigId"].to_numpy(), len(panel)),
+            "GeneSymbol": np.tile(panel["GeneSymbol"].to_numpy(), len(configs)),
+            "CompositeScore": scores.T.ravel(),
+            "DatasetCount": dataset_count.T.ravel(),
+            "Rank": ranks.T.ravel(),
+        }
+    )
+
+    SWEEP_DIR.mkdir(parents=True, exist_ok=True)
+    with span("write_tables"):
+        for suffix, table in (("configs", summary), ("ranks", rank_table), ("scores", long_table)):
+            path = SWEEP_DIR / f"{args.name}_{suffix}.csv"
+            table.to_csv(path, index=False)
+            run.record_output(path)
+
+    print(f"Scored {len(panel)} genes x {len(deg_tables)} datasets x {len(configs)} configurations")
+    print(f"Spearman vs base: min {summary['SpearmanVsBase'].min():.3f}, median {summary['SpearmanVsBase'].median():.3f}")
+    stable = rank_table.loc[(rank_table[configs["ConfigId"]] <= TOP_K).all(axis=1), "GeneSymbol"].tolist()
+    print(f"In the top {TOP_K} under every configuration: {', '.join(stable) or 'none'}")
+    publish_run(run)
+    manifest_path = run.write()
+    report("scoring_sweep")
+    print(f"Run manifest written to {manifest_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""Synthetic GEO series matrices and platform annotations for offline runs.
+
+Writes gzipped ``*_series_matrix.txt.gz`` and ``GPL*.annot.gz`` files for the
+revision cohorts under the same paths as the NCBI GEO FTP site, and serves them
+over a local HTTP server so ``rebuild_kfd_revision.py`` can be run and
+load-tested without network access at any probe and sample count.
+
+    python scripts/synthetic_geo.py --probes 20000 --samples 60 --run
+    python scripts/synthetic_geo.py --serve --port 8765
+    KFD_GEO_BASE_URL=http://127.0.0.1:8765 python scripts/rebuild_kfd_revision.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+import rebuild_kfd_revision as rebuild
+import instrumentation
+import results_db
+import run_manifest
+from instrumentation import add_profile_argument
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MIRROR_DIR = BASE_DIR / "outputs" / "synthetic_geo"
+# The rebuild keys its download cache on host:port, so offline runs serve the
+# mirror on a fixed port to reuse the cache (and the DE results) across runs.
+MIRROR_PORT = 8765
+
+# Sample titles each cohort's group parser recognises as (severe, non-severe).
+SEVERITY_TITLES = {
+    "GSE18090": ("DHF", "DF"),
+    "GSE51808": ("Dengue Hemorrhagic Fever", "Dengue Fever"),
+}
+DEFAULT_TITLES = ("DHF", "DF")
+
+
+def synthetic_genes(n_genes: int) -> list[str]:
+    """Panel genes first, padded with placeholder symbols up to ``n_genes``."""
+    panel_genes = rebuild.load_candidate_panel()["GeneSymbol"].tolist()
+    n_genes = max(n_genes, len(panel_genes))
+    return panel_genes + [f"GENE{index}" for index in range(n_genes - len(panel_genes))]
+
+
+def synthetic_annotation(
+    n_probes: int,
+    genes: list[str],
+    rng: np.random.Generator,
+    multi_fraction: float = 0.05,
+    missing_fraction: float = 0.04,
+) -> pd.DataFrame:
+    """Return an ``ID``/``Gene symbol`` platform table.
+
+    Every gene gets at least one probe where ``n_probes`` allows; a fraction of
+    probes map to two symbols (``A///B``) and a fraction carry no symbol, half
+    blank and half ``---``.
+    """
+    probe_ids = [f"{index}_at" for index in range(n_probes)]
+    symbols = np.asarray(genes, dtype=object)[rng.integers(0, len(genes), n_probes)]
+    covered = min(n_probes, len(genes))
+    symbols[:covered] = genes[:covered]
+
+    multi = np.flatnonzero(rng.random(n_probes) < multi_fraction)
+    partners = np.asarray(genes, dtype=object)[rng.integers(0, len(genes), len(multi))]
+    symbols[multi] = [f"{symbol}///{partner}" for symbol, partner in zip(symbols[multi], partners)]
+    missing = np.flatnonzero(rng.random(n_probes) < missing_fraction)
+    missing = missing[missing >= covered]
+    symbols[missing[::2]] = ""
+    symbols[missing[1::2]] = "---"
+    return pd.DataFrame({"ID": probe_ids, "Gene symbol": symbols})
+
+
+def synthetic_expression(
+    annotation: pd.DataFrame,
+    sample_ids: list[str],
+    severe: np.ndarray,
+    rng: np.random.Generator,
+    missing_fraction: float = 0.001,
+    effect_genes: set[str] | None = None,
+) -> pd.DataFrame:
+    """Return a log2-scale ``ID_REF`` x sample matrix.
+
+    Probes for ``effect_genes`` are shifted up in severe samples so the
+    downstream contrasts have real signal to find.
+    """
+    n_probes = len(annotation)
+    baseline = rng.normal(7.0, 1.5, size=(n_probes, 1))
+    values = baseline + rng.normal(0.0, 0.6, size=(n_probes, len(sample_ids)))
+    if effect_genes:
+        first_symbol = annotation["Gene symbol"].astype(str).str.split("///").str[0]
+        shifted = first_symbol.isin(effect_genes).to_numpy()
+        values[np.ix_(shifted, severe)] += rng.uniform(0.3, 1.0, size=(int(shifted.sum()), 1))
+    values[rng.random(values.shape) < missing_fraction] = np.nan
+    expression = pd.DataFrame(values, columns=sample_ids)
+    expression.insert(0, "ID_REF", annotation["ID"].to_numpy())
+    return expression
+
+
+def _quote(values) -> str:
+    return "\t".join(f'"{value}"' for value in values)
+
+
+def write_series_matrix(
+    path: Path,
+    accession: str,
+    sample_ids: list[str],
+    titles: list[str],
+    characteristics: dict[str, list[str]],
+    expression: pd.DataFrame,
+) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6, newline="\n") as handle:
+        handle.write(f'!Series_title\t"Synthetic dengue severity cohort {accession}"\n')
+        handle.write(f'!Series_geo_accession\t"{accession}"\n')
+        handle.write(f"!Sample_title\t{_quote(titles)}\n")
+        handle.write(f"!Sample_geo_accession\t{_quote(sample_ids)}\n")
+        for label, values in characteristics.items():
+            handle.write(f"!Sample_characteristics_ch1\t{_quote(f'{label}: {value}' for value in values)}\n")
+        handle.write("!series_matrix_table_begin\n")
+        expression.to_csv(handle, sep="\t", index=False, na_rep="", float_format="%.4f", quoting=csv.QUOTE_NONNUMERIC)
+        handle.write("!series_matrix_table_end\n")
+
+
+def write_annotation(path: Path, platform: str, annotation: pd.DataFrame) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6, newline="\n") as handle:
+        handle.write(f"^Annotation\n!Annotation_platform = {platform}\n")
+        handle.write("!platform_table_begin\n")
+        annotation.to_csv(handle, sep="\t", index=False)
+        handle.write("!platform_table_end\n")
+
+
+def generate_mirror(
+    root: Path = MIRROR_DIR,
+    n_probes: int = 5000,
+    n_samples: int = 40,
+    seed: int = 0,
+    multi_fraction: float = 0.05,
+    missing_fraction: float = 0.001,
+    control_fraction: float = 0.1,
+    convalescent_fraction: float = 0.2,
+) -> Path:
+    """Write one series matrix per revision cohort and one annotation per platform under ``root``."""
+    rng = np.random.default_rng(seed)
+    genes = synthetic_genes(n_probes // 3)
+    effect_genes = set(rng.choice(genes[:50], size=15, replace=False))
+
+    annotations: dict[str, pd.DataFrame] = {}
+    for config in rebuild.DATASETS:
+        if config.platform not in annotations:
+            annotations[config.platform] = synthetic_annotation(n_probes, genes, rng, multi_fraction)
+            write_annotation(root / rebuild.annotation_path(config.platform), config.platform, annotations[config.platform])
+
+    for offset, config in enumerate(rebuild.DATASETS):
+        sample_ids = [f"GSM{offset + 1}{index:06d}" for index in range(n_samples)]
+        group = rng.choice(
+            ["severe", "non_severe", "control"],
+            size=n_samples,
+            p=[(1 - control_fraction) / 2, (1 - control_fraction) / 2, control_fraction],
+        )
+        group[:2] = ["severe", "non_severe"]
+        severe_title, non_severe_title = SEVERITY_TITLES.get(config.accession, DEFAULT_TITLES)
+        label = {"severe": severe_title, "non_severe": non_severe_title, "control": "Healthy control"}
+        titles = [f"{label[kind]} patient {index + 1}" for index, kind in enumerate(group)]
+        phase = np.where(rng.random(n_samples) < convalescent_fraction, "Convalescent", "Acute")
+        phase[:2] = "Acute"
+        severity = [{"severe": "DHF", "non_severe": "DF", "control": "ND"}[kind] for kind in group]
+
+        expression = synthetic_expression(
+            annotations[config.platform], sample_ids, group == "severe", rng, missing_fraction, effect_genes
+        )
+        write_series_matrix(
+            root / config.matrix_path,
+            config.accession,
+            sample_ids,
+            titles,
+            {"phase": list(phase), "severity": severity},
+            expression,
+        )
+    return root
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args) -> None:  # noqa: A002 - signature from BaseHTTPRequestHandler
+        pass
+
+
+@contextmanager
+def serve_mirror(root: Path = MIRROR_DIR, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """Serve ``root`` over HTTP in a background thread and yield its base URL."""
+    server = ThreadingHTTPServer((host, port), partial(_QuietHandler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_offline(root: Path, output_dir: Path, profile: list[str] | None = None, port: int = MIRROR_PORT) -> float:
+    """Run the revision rebuild against the mirror at ``root``, writing under ``output_dir``."""
+    saved = {name: getattr(rebuild, name) for name in ("GEO_BASE_URL", "DATA_DIR", "TABLE_DIR", "FIG_DIR", "BUILD_STATE")}
+    saved_run_dir = run_manifest.RUN_DIR
+    saved_db = results_db.DB_PATH
+    saved_trace_dirs = instrumentation.TRACE_DIR, instrumentation.PROFILE_DIR
+    redirected = {
+        "DATA_DIR": output_dir / "data",
+        "TABLE_DIR": output_dir / "revision_tables",
+        "FIG_DIR": output_dir / "revision_figures",
+    }
+    for directory in redirected.values():
+        directory.mkdir(parents=True, exist_ok=True)
+    try:
+        with serve_mirror(root, port=port) as url:
+            rebuild.GEO_BASE_URL = url
+            for name, directory in redirected.items():
+                setattr(rebuild, name, directory)
+            rebuild.BUILD_STATE = output_dir / "build_state.json"
+            run_manifest.RUN_DIR = output_dir / "runs"
+            results_db.DB_PATH = output_dir / "kfd_results.sqlite"
+            instrumentation.TRACE_DIR = output_dir / "traces"
+            instrumentation.PROFILE_DIR = output_dir / "profiles"
+            start = time.perf_counter()
+            rebuild.main([arg for stage in profile or [] for arg in ("--profile", stage)])
+            return time.perf_counter() - start
+    finally:
+        for name, value in saved.items():
+            setattr(rebuild, name, value)
+        run_manifest.RUN_DIR = saved_run_dir
+        results_db.DB_PATH = saved_db
+        instrumentation.TRACE_DIR, instrumentation.PROFILE_DIR = saved_trace_dirs
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, default=MIRROR_DIR, help="mirror root directory")
+    parser.add_argument("--probes", type=int, default=5000)
+    parser.add_argument("--samples", type=int, default=40, help="samples per cohort")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--multi-fraction", type=float, default=0.05, help="share of probes mapped to two symbols")
+    parser.add_argument("--missing-fraction", type=float, default=0.001, help="share of missing expression values")
+    parser.add_argument("--no-generate", action="store_true", help="reuse the files already under --out")
+    parser.add_argument("--serve", action="store_true", help="serve the mirror until interrupted")
+    parser.add_argument("--port", type=int, default=MIRROR_PORT, help="mirror port for --serve and --run")
+    parser.add_argument("--run", action="store_true", help="run the rebuild pipeline against the mirror")
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+
+    if not args.no_generate:
+        start = time.perf_counter()
+        generate_mirror(args.out, args.probes, args.samples, args.seed, args.multi_fraction, args.missing_fraction)
+        print(f"Wrote synthetic GEO mirror to {args.out} in {time.perf_counter() - start:.2f} s")
+
+    if args.run:
+        elapsed = run_offline(args.out, args.out / "outputs", args.profile, args.port)
+        print(f"Offline rebuild finished in {elapsed:.2f} s; tables in {args.out / 'outputs' / 'revision_tables'}")
+
+    if args.serve:
+        with serve_mirror(args.out, port=args.port) as url:
+            print(f"Serving {args.out} at {url}")
+            print(f"Run: KFD_GEO_BASE_URL={url} python scripts/rebuild_kfd_revision.py")
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Interactive what-if scoring of the revision target panel.
+
+Loads the cached DEG tables and the candidate panel once, keeps the
+per-gene evidence and component scores in memory, and recomputes composite
+scores, ranks, the drug candidate table and the pathway summary for any change
+of weights or thresholds in milliseconds, without rerunning the rebuild.
+
+Changing one composite weight rescales the others proportionally so the
+weights still sum to 1; pass all four to set them exactly.
+
+    python scripts/what_if.py                                 # interactive session
+    python scripts/what_if.py --set tractability=0.3 --top 15
+    python scripts/what_if.py --set deg_pvalue=0.01 deg_abs_log2fc=0.5
+
+From Python::
+
+    session = ScoringSession()
+    scenario = session.set(tractability=0.3)
+    scenario.rank_changes(session.base).head()
+"""
+
+from __future__ import annotations
+
+import argparse
+import cmd
+import shlex
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from kfd_config import REVISION_WEIGHTS, ConfigError, add_config_argument, load_config
+import rebuild_kfd_revision as rebuild
+from scoring_sweep import (
+    REV_TABLES,
+    SCALAR_PARAMETERS,
+    WEIGHT_COLUMNS,
+    base_parameters,
+    composite_scores,
+    evidence_arrays,
+    expand_grid,
+    load_deg_tables,
+    omics_scores,
+    supporting_evidence,
+)
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+WHAT_IF_DIR = BASE_DIR / "outputs" / "what_if"
+
+
+@dataclass
+class Scenario:
+    """Scoring outputs for one set of parameters."""
+
+    parameters: dict[str, Any]
+    targets: pd.DataFrame
+    drugs: pd.DataFrame
+    pathways: pd.DataFrame
+    elapsed: float = field(default=0.0, compare=False)
+
+    def rank_changes(self, reference: "Scenario") -> pd.DataFrame:
+        """Rank of every gene here and in ``reference``, largest moves first."""
+        ranks = self.targets.set_index("GeneSymbol")["Rank"]
+        before = reference.targets.set_index("GeneSymbol")["Rank"].reindex(ranks.index)
+        changes = pd.DataFrame({"GeneSymbol": ranks.index, "Before": before.to_numpy(), "After": ranks.to_numpy()})
+        changes["Shift"] = changes["Before"] - changes["After"]
+        order = np.argsort(-changes["Shift"].abs().to_numpy(), kind="stable")
+        return changes.iloc[order].reset_index(drop=True)
+
+
+class ScoringSession:
+    """The candidate panel and its evidence held in memory for fast re-scoring."""
+
+    def __init__(self, tables: Path = REV_TABLES) -> None:
+        self.panel = rebuild.load_candidate_panel()
+        self.deg_tables = load_deg_tables(tables)
+        self.accessions = np.array(list(self.deg_tables), dtype=object)
+        self.evidence = evidence_arrays(self.panel, self.deg_tables)
+        self._omics: dict[tuple[float, ...], tuple[np.ndarray, np.ndarray]] = {}
+        # Everything in the target table except the parameter-dependent columns, in panel order.
+        self._template = (
+            rebuild.build_target_table(self.panel, self.deg_tables)
+            .set_index("GeneSymbol")
+            .loc[self.panel["GeneSymbol"]]
+            .reset_index()
+            .drop(columns="Rank")
+        )
+        self.base = self.evaluate(base_parameters(rebuild.CONFIG.revision))
+        self.current = self.base
+
+    @property
+    def parameters(self) -> dict[str, Any]:
+        return self.current.parameters
+
+    def with_changes(self, **changes: Any) -> dict[str, Any]:
+        """Current parameters with ``changes`` applied; single weights rescale the unchanged ones."""
+        parameters = {**self.parameters, "composite_weights": dict(self.parameters["composite_weights"])}
+        weights = {name: float(changes.pop(name)) for name in REVISION_WEIGHTS if name in changes}
+        if "composite_weights" in changes:
+            parameters["composite_weights"] = {name: float(value) for name, value in changes.pop("composite_weights").items()}
+        unknown = set(changes) - set(SCALAR_PARAMETERS)
+        if unknown:
+            expected = ", ".join([*SCALAR_PARAMETERS, *REVISION_WEIGHTS])
+            raise ConfigError(f"Unknown parameters: {', '.join(sorted(unknown))}; expected {expected}")
+        parameters.update({name: float(value) for name, value in changes.items()})
+
+        if weights:
+            current = parameters["composite_weights"]
+            others = [name for name in REVISION_WEIGHTS if name not in weights]
+            remaining = 1.0 - sum(weights.values())
+            total = sum(current[name] for name in others)
+            for name in others:
+                weights[name] = remaining * current[name] / total if total > 0 else remaining / len(others)
+            parameters["composite_weights"] = {name: weights[name] for name in REVISION_WEIGHTS}
+        return parameters
+
+    def evaluate(self, parameters: dict[str, Any]) -> Scenario:
+        """Score the panel under ``parameters`` (validated as a one-point sweep)."""
+        start = time.perf_counter()
+        config = expand_grid({name: [value] for name, value in parameters.items()}, parameters).iloc[[0]]
+        key = tuple(float(config[name].iloc[0]) for name in SCALAR_PARAMETERS)
+        if key not in self._omics:
+            supporting = supporting_evidence(self.evidence, config)[:, :, 0]
+            self._omics[key] = (supporting, omics_scores(self.evidence, config, supporting[:, :, np.newaxis])[:, 0])
+        supporting, omics = self._omics[key]
+        scores = composite_scores(self.evidence, omics[:, np.newaxis], config[list(WEIGHT_COLUMNS)].to_numpy())[:, 0]
+
+        targets = self._template.copy()
+        targets["DatasetsSupporting"] = [",".join(self.accessions[row]) or "none" for row in supporting]
+        targets["DatasetCount"] = supporting.sum(axis=1)
+        targets["OmicsScore"] = omics
+        targets["CompositeScore"] = scores
+        targets = targets.iloc[np.argsort(-scores, kind="stable")].reset_index(drop=True)
+        targets["Rank"] = np.arange(1, len(targets) + 1)
+        return Scenario(
+            parameters=parameters,
+            targets=targets,
+            drugs=rebuild.build_drug_table(targets),
+            pathways=rebuild.summarise_pathways(targets),
+            elapsed=time.perf_counter() - start,
+        )
+
+    def set(self, **changes: Any) -> Scenario:
+        """Apply ``changes`` to the current parameters and make the result current."""
+        self.current = self.evaluate(self.with_changes(**changes))
+        return self.current
+
+    def reset(self) -> Scenario:
+        self.current = self.base
+        return self.current
+
+
+def parse_assignments(tokens: list[str]) -> dict[str, float]:
+    """``["name=value", ...]`` -> ``{name: value}``."""
+    changes = {}
+    for token in tokens:
+        name, _, value = token.partition("=")
+        try:
+            changes[name.strip()] = float(value)
+        except ValueError:
+            raise ConfigError(f"{token!r}: expected NAME=NUMBER") from None
+    return changes
+
+
+def describe_parameters(parameters: dict[str, Any]) -> str:
+    scalars = ", ".join(f"{name}={parameters[name]:g}" for name in SCALAR_PARAMETERS)
+    weights = ", ".join(f"{name}={parameters['composite_weights'][name]:.3f}" for name in REVISION_WEIGHTS)
+    return f"{scalars}\nweights: {weights}"
+
+
+def show(table: pd.DataFrame, columns: list[str], limit: int) -> None:
+    print(table.head(limit)[columns].to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+
+
+TARGET_COLUMNS = ["Rank", "GeneSymbol", "Pathway", "DatasetCount", "OmicsScore", "TractabilityScore", "CompositeScore"]
+
+
+class WhatIfShell(cmd.Cmd):
+    intro = "What-if scoring. Type help or ? to list commands; changes apply to the current scenario."
+    prompt = "what-if> "
+
+    def __init__(self, session: ScoringSession, top: int) -> None:
+        super().__init__()
+        self.session = session
+        self.top = top
+
+    def onecmd(self, line: str) -> bool:
+        try:
+            return super().onecmd(line)
+        except (ConfigError, ValueError, KeyError) as error:
+            print(f"error: {error}")
+            return False
+
+    def emptyline(self) -> bool:
+        return False
+
+    def do_set(self, arg: str) -> None:
+        """set NAME=VALUE [...]  change weights (omics, tractability, pathway, phase) or thresholds"""
+        scenario = self.session.set(**parse_assignments(shlex.split(arg)))
+        print(f"Rescored in {scenario.elapsed * 1000:.1f} ms")
+        print(describe_parameters(scenario.parameters))
+        moved = scenario.rank_changes(self.session.base)
+        moved = moved[moved["Shift"] != 0]
+        print(f"{len(moved)} genes changed rank vs base")
+        if len(moved):
+            show(moved, ["GeneSymbol", "Before", "After", "Shift"], self.top)
+
+    def do_top(self, arg: str) -> None:
+        """top [K]  ranked targets of the current scenario"""
+        show(self.session.current.targets, TARGET_COLUMNS, int(arg or self.top))
+
+    def do_diff(self, arg: str) -> None:
+        """diff [K]  largest rank changes vs the base configuration"""
+        show(self.session.current.rank_changes(self.session.base), ["GeneSymbol", "Before", "After", "Shift"], int(arg or self.top))
+
+    def do_gene(self, arg: str) -> None:
+        """gene SYMBOL  full target row for one gene"""
+        targets = self.session.current.targets
+        row = targets[targets["GeneSymbol"].str.upper() == arg.strip().upper()]
+        if row.empty:
+            print(f"{arg.strip()} is not in the candidate panel")
+        else:
+            print(row.iloc[0].to_string())
+
+    def do_drugs(self, arg: str) -> None:
+        """drugs [K]  drug candidate table of the current scenario"""
+        show(self.session.current.drugs, ["GeneSymbol", "PriorityRank", "Candidate", "EvidenceTier"], int(arg or self.top))
+
+    def do_pathways(self, arg: str) -> None:
+        """pathways  mean composite score per pathway"""
+        show(self.session.current.pathways, ["Pathway", "Targets", "MeanScore", "SD"], len(self.session.current.pathways))
+
+    def do_params(self, arg: str) -> None:
+        """params  current weights and thresholds"""
+        print(describe_parameters(self.session.parameters))
+
+    def do_reset(self, arg: str) -> None:
+        """reset  return to the configured weights and thresholds"""
+        self.session.reset()
+        print(describe_parameters(self.session.parameters))
+
+    def do_save(self, arg: str) -> None:
+        """save NAME  write the current targets, drugs and pathway summary to outputs/what_if/"""
+        name = arg.strip() or "scenario"
+        WHAT_IF_DIR.mkdir(parents=True, exist_ok=True)
+        scenario = self.session.current
+        for suffix, table in (("targets", scenario.targets), ("drug_candidates", scenario.drugs), ("pathway_summary", scenario.pathways)):
+            path = WHAT_IF_DIR / f"{name}_{suffix}.csv"
+            table.to_csv(path, index=False)
+            print(f"Wrote {path}")
+
+    def do_quit(self, arg: str) -> bool:
+        """quit  leave the session"""
+        return True
+
+    do_EOF = do_quit
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--set", nargs="+", default=[], metavar="NAME=VALUE", help="score one scenario and exit")
+    parser.add_argument("--top", type=int, default=10, help="rows to show")
+    parser.add_argument("--tables", type=Path, default=REV_TABLES, help="directory holding the *_deg_results.csv tables")
+    add_config_argument(parser)
+    args = parser.parse_args(argv)
+    if args.config is not None:
+        rebuild.apply_config(load_config(args.config))
+
+    start = time.perf_counter()
+    session = ScoringSession(args.tables)
+    print(f"Loaded {len(session.panel)} genes x {len(session.deg_tables)} datasets in {time.perf_counter() - start:.2f} s")
+    shell = WhatIfShell(session, args.top)
+    if args.set:
+        # Called directly rather than through onecmd, so a bad --set fails the run
+        # instead of printing the base ranking.
+        try:
+            shell.do_set(" ".join(args.set))
+        except (ConfigError, ValueError, KeyError) as error:
+            print(f"error: {error}", file=sys.stderr)
+            return 1
+        shell.onecmd("top")
+    else:
+        shell.cmdloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())